@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import dataset_builder
+import streaming_features
+import vibration_features
+
+# --- 振動特徵的線上異常評分 ---
+# 以健康基準 (Feature_healthy_vibration 或健康類別的視窗特徵) 建立統計量：
+#   平均值與共變異數反矩陣 (Mahalanobis 距離)、中位數與 MAD (穩健 z 分數)，
+#   門檻取基準資料本身距離的高分位數。
+# 執行時持續讀取特徵列 (直接串接 streaming_features，或重播特徵 CSV)，
+# 以 NumPy 陣列運算一次為整個視窗的所有通道評分，超過門檻時輸出警報 (JSON Lines)，
+# 並記錄每個視窗從產生到評分完成的延遲。
+# 用法：
+#   python anomaly_scorer.py baseline --features Feature_Healthy_Vibration.csv -o baseline.npz
+#   python anomaly_scorer.py baseline --dataset-dir data/dataset --label Healthy -o baseline.npz
+#   python anomaly_scorer.py run --baseline baseline.npz --replay Mar1.txt --realtime
+#   python anomaly_scorer.py run --baseline baseline.npz --features features.csv
+
+BASELINE_PATH = os.path.join(dataset_builder.DATASET_DIR, 'healthy_baseline.npz')
+THRESHOLD_QUANTILE = 0.995 # 基準資料中 Mahalanobis 距離的分位數作為門檻
+ROBUST_Z_LIMIT = 6.0 # 任一特徵的穩健 z 分數超過此值也視為異常
+MIN_CONSECUTIVE = 2 # 同一通道連續幾個視窗異常才發出警報 (避免單一雜訊視窗誤報)
+SHRINKAGE = 1e-3 # 共變異數對角線的正則化比例，避免基準資料少時矩陣不可逆
+MAD_SCALE = 1.4826 # 常態分佈下 MAD 與標準差的比例
+
+class HealthyBaseline:
+    """
+    健康基準的統計量與評分方法。
+    """
+
+    def __init__(self, mean, inv_cov, median, mad, threshold, feature_names=None):
+        self.mean = mean
+        self.inv_cov = inv_cov
+        self.median = median
+        self.mad = mad
+        self.threshold = float(threshold)
+        self.feature_names = list(feature_names or vibration_features.FEATURE_NAMES)
+
+    @classmethod
+    def fit(cls, X, quantile=THRESHOLD_QUANTILE, shrinkage=SHRINKAGE):
+        X = np.nan_to_num(np.asarray(X, dtype=np.float64))
+        if X.shape[0] < 2:
+            raise ValueError("建立基準至少需要兩列健康特徵")
+        mean = X.mean(axis=0)
+        cov = np.atleast_2d(np.cov(X, rowvar=False))
+        cov += np.eye(cov.shape[0]) * (shrinkage * max(np.trace(cov) / cov.shape[0], 1e-12))
+        inv_cov = np.linalg.pinv(cov)
+        median = np.median(X, axis=0)
+        mad = np.median(np.abs(X - median), axis=0) * MAD_SCALE
+        mad[mad == 0] = np.std(X, axis=0)[mad == 0]
+        mad[mad == 0] = 1.0
+        baseline = cls(mean, inv_cov, median, mad, np.inf)
+        baseline.threshold = float(np.quantile(baseline.mahalanobis(X), quantile))
+        return baseline
+
+    def mahalanobis(self, X):
+        d = X - self.mean
+        return np.sqrt(np.maximum(np.einsum('ij,jk,ik->i', d, self.inv_cov, d), 0.0))
+
+    def score(self, X):
+        """
+        為多列特徵評分，回傳 (Mahalanobis 距離, 最大穩健 z 分數, 該特徵索引, 是否異常)。
+        """
+        X = np.nan_to_num(np.asarray(X, dtype=np.float64))
+        distance = self.mahalanobis(X)
+        z = np.abs(X - self.median) / self.mad
+        top = z.argmax(axis=1)
+        z_max = z[np.arange(len(z)), top]
+        anomalous = (distance > self.threshold) | (z_max > ROBUST_Z_LIMIT)
+        return distance, z_max, top, anomalous
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(path, mean=self.mean, inv_cov=self.inv_cov, median=self.median, mad=self.mad,
+                 threshold=self.threshold, feature_names=np.array(self.feature_names))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['mean'], data['inv_cov'], data['median'], data['mad'], data['threshold'], data['feature_names'].tolist())
+
+class AnomalyScorer:
+    """
+    逐視窗評分並追蹤各通道連續異常的次數；警報以 dict 形式交給 emit。
+    """
+
+    def __init__(self, baseline, emit, min_consecutive=MIN_CONSECUTIVE):
+        self.baseline = baseline
+        self.emit = emit
+        self.min_consecutive = min_consecutive
+        self.streaks = {}
+        self.latencies = []
+        self.windows = 0
+        self.rows = 0
+        self.alerts = 0
+
+    def process(self, window, start_s, channels, features, produced_at):
+        """
+        為一個視窗的所有通道評分；produced_at 為特徵產生時的 perf_counter()，用於計算延遲。
+        """
+        distance, z_max, top, anomalous = self.baseline.score(features)
+        latency_ms = (time.perf_counter() - produced_at) * 1000
+        self.latencies.append(latency_ms)
+        self.windows += 1
+        self.rows += len(features)
+        for i, channel in enumerate(channels):
+            streak = self.streaks.get(channel, 0) + 1 if anomalous[i] else 0
+            self.streaks[channel] = streak
+            if streak == self.min_consecutive: # 每段連續異常只警報一次
+                self.alerts += 1
+                self.emit({
+                    'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                    'window': int(window),
+                    'start_s': float(start_s),
+                    'channel': int(channel),
+                    'mahalanobis': round(float(distance[i]), 3),
+                    'threshold': round(self.baseline.threshold, 3),
+                    'robust_z': round(float(z_max[i]), 2),
+                    'top_feature': self.baseline.feature_names[int(top[i])],
+                    'consecutive': streak,
+                    'latency_ms': round(latency_ms, 3),
+                })
+
+    def latency_summary(self):
+        if not self.latencies:
+            return "沒有評分任何視窗。"
+        lat = np.array(self.latencies)
+        return (f"{self.windows} 個視窗 / {self.rows} 列，警報 {self.alerts} 次；"
+                f"延遲 p50 {np.percentile(lat, 50):.3f} ms、p99 {np.percentile(lat, 99):.3f} ms、最大 {lat.max():.3f} ms")
+
+# --- 特徵來源 ---
+def stream_from_raw(blocks, fs=vibration_features.FS, window_seconds=streaming_features.DEFAULT_WINDOW_SECONDS,
+                    overlap=streaming_features.DEFAULT_OVERLAP):
+    """
+    由原始樣本即時計算視窗特徵，產生 (視窗編號, 起始秒數, 通道編號列表, 特徵矩陣, 產生時間)。
+    """
+    extractor = None
+    for block in blocks:
+        block = np.asarray(block)
+        if extractor is None:
+            window, hop = streaming_features.window_samples(window_seconds, overlap, fs)
+            extractor = streaming_features.StreamingFeatureExtractor(block.shape[1], fs, window, hop)
+            channels = list(range(1, block.shape[1] + 1))
+        for index, start, features in extractor.push(block):
+            yield index, start / fs, channels, features, time.perf_counter()
+
+def stream_from_csv(path, follow=False, poll_interval=0.5):
+    """
+    讀取 streaming_features 輸出的 CSV，將同一視窗的列合併後送出；follow 為 True 時持續等待新資料 (類似 tail -f)。
+    """
+    header = None
+    current, rows, channels = None, [], []
+    channel_count = None # 第一個完整視窗的通道數；等待新資料時，只送出已收齊所有通道的視窗
+    with open(path, 'rb') as f:
+        while True:
+            line = f.readline()
+            if not line or not line.endswith(b'\n'):
+                if line: # 寫到一半的行，退回重讀
+                    f.seek(-len(line), os.SEEK_CUR)
+                if not follow:
+                    break
+                if rows and channel_count is not None and len(rows) >= channel_count:
+                    yield current[0], current[1], channels, np.array(rows), time.perf_counter()
+                    current, rows, channels = None, [], []
+                time.sleep(poll_interval)
+                continue
+            parts = line.decode('utf-8').rstrip('\r\n').split(',')
+            if header is None:
+                header = parts
+                columns = [header.index(name) for name in vibration_features.FEATURE_NAMES]
+                continue
+            key = (int(parts[0]), float(parts[1]))
+            if current is not None and key != current:
+                if channel_count is None:
+                    channel_count = len(rows)
+                yield current[0], current[1], channels, np.array(rows), time.perf_counter()
+                rows, channels = [], []
+            current = key
+            channels.append(int(parts[2]))
+            rows.append([float(parts[i]) for i in columns])
+    if rows:
+        yield current[0], current[1], channels, np.array(rows), time.perf_counter()
+
+# --- 子命令 ---
+def cmd_baseline(args):
+    if args.features:
+        import pandas as pd
+        X = pd.read_csv(args.features)[vibration_features.FEATURE_NAMES].to_numpy()
+    else:
+        import vibration_classifier
+        X, _, _ = vibration_classifier.load_training_data(args.dataset_dir, windows=not args.whole, classes=[args.label])
+    baseline = HealthyBaseline.fit(X, args.quantile)
+    baseline.save(args.output)
+    print(f"健康基準：{len(X)} 列特徵，Mahalanobis 門檻 {baseline.threshold:.3f}，已保存到: {args.output}")
+
+def cmd_run(args):
+    baseline = HealthyBaseline.load(args.baseline)
+    out = open(args.alerts, 'a', encoding='utf-8') if args.alerts else sys.stdout
+
+    def emit(alert):
+        out.write(json.dumps(alert, ensure_ascii=False) + '\n')
+        out.flush()
+
+    if args.replay:
+        blocks = streaming_features.replay_text_file(args.replay)
+        if args.realtime:
+            blocks = streaming_features.paced(blocks, args.fs)
+        source = stream_from_raw(blocks, args.fs)
+    else:
+        source = stream_from_csv(args.features, follow=args.follow)
+
+    scorer = AnomalyScorer(baseline, emit, args.consecutive)
+    try:
+        for window in source:
+            scorer.process(*window)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if args.alerts:
+            out.close()
+    print(scorer.latency_summary(), file=sys.stderr)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="振動特徵線上異常評分")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('baseline', help='由健康資料建立基準')
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument('--features', help='健康特徵 CSV (例如 Feature_Healthy_Vibration.csv)')
+    group.add_argument('--dataset-dir', help='dataset_builder 的資料集')
+    p.add_argument('--label', default='Healthy', help='資料集中的健康類別名稱')
+    p.add_argument('--whole', action='store_true', help='以整段錄製 (每個通道一列) 而非視窗特徵建立基準')
+    p.add_argument('--quantile', type=float, default=THRESHOLD_QUANTILE)
+    p.add_argument('-o', '--output', default=BASELINE_PATH)
+    p.set_defaults(func=cmd_baseline)
+
+    p = sub.add_parser('run', help='持續評分並輸出警報')
+    p.add_argument('--baseline', default=BASELINE_PATH)
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument('--replay', metavar='TXT', help='原始資料檔，即時計算視窗特徵')
+    group.add_argument('--features', metavar='CSV', help='streaming_features 輸出的特徵 CSV')
+    p.add_argument('--follow', action='store_true', help='持續等待特徵 CSV 的新資料')
+    p.add_argument('--realtime', action='store_true', help='依取樣率即時重播原始資料')
+    p.add_argument('--fs', type=float, default=vibration_features.FS)
+    p.add_argument('--consecutive', type=int, default=MIN_CONSECUTIVE, help='連續幾個視窗異常才警報')
+    p.add_argument('--alerts', help='警報輸出檔 (JSON Lines，預設為標準輸出)')
+    p.set_defaults(func=cmd_run)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+import raw_data_store
+
+# --- Clean_data 的 Parquet 輸出 ---
+# 筆記本以 to_csv 把 Combined_Df_Healthy/Faulty/Testing 存成文字檔 (float64 完整位數)，
+# 檔案很大，之後的筆記本又要重新解析。這裡改存成 Parquet：
+#   - 每個通道一欄 float32，以 BYTE_STREAM_SPLIT 編碼 + zstd 壓縮 (浮點數的壓縮率明顯較好)；
+#   - 每個通道在檔案中是一段連續的 column chunk，讀取時只解碼指定的通道。
+# 用法：
+#   python clean_data_parquet.py --from-store                    (由 raw_data_store 的儲存區轉出)
+#   python clean_data_parquet.py --from-csv --benchmark          (轉換既有的 CSV 並比較大小與讀取時間)
+#   df = clean_data_parquet.read_clean_data('Healthy', channels=['Acceleration1', 'Acceleration5'])
+
+CLEAN_DATA_DIR = '/content/drive/MyDrive/ML_Exercise1_Rotary_machine/data/Clean_data'
+COMPRESSION = 'zstd'
+COMPRESSION_LEVEL = 3
+ROW_GROUP_SIZE = 1 << 22 # 約 400 萬列一個 row group：一般錄製長度下每個通道只有一段 column chunk
+
+def clean_data_path(name, clean_dir=CLEAN_DATA_DIR, ext='parquet'):
+    """
+    乾淨資料的檔案路徑 (與筆記本相同的檔名 Combined_Df_xxx)。
+    """
+    return os.path.join(clean_dir, f'Combined_Df_{name}.{ext}')
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("需要安裝 pyarrow 才能讀寫 Parquet：pip install pyarrow") from None
+    return pyarrow
+
+def write_clean_data(data, channel_names, path):
+    """
+    把 (資料點數, 通道數) 的陣列或 DataFrame 寫成 float32 Parquet 檔，回傳檔案大小 (bytes)。
+    """
+    pa = _pyarrow()
+    if hasattr(data, 'columns'): # DataFrame
+        channel_names = list(data.columns) if channel_names is None else channel_names
+        data = data.to_numpy()
+    columns = [pa.array(np.ascontiguousarray(data[:, i], dtype=np.float32)) for i in range(data.shape[1])]
+    table = pa.Table.from_arrays(columns, names=list(channel_names))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    pa.parquet.write_table(
+        table, tmp_path,
+        compression=COMPRESSION, compression_level=COMPRESSION_LEVEL,
+        use_byte_stream_split=True, use_dictionary=False,
+        row_group_size=ROW_GROUP_SIZE,
+    )
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+def read_clean_data(name, channels=None, clean_dir=CLEAN_DATA_DIR, as_numpy=False):
+    """
+    讀取乾淨資料，channels 為要讀取的通道名稱 (預設全部)，只有這些欄位會從檔案中解碼。
+    回傳 DataFrame (欄位為 Acceleration1..N)；as_numpy 為 True 時回傳 (float32 陣列 (資料點數, 通道數), 通道名稱)。
+    """
+    pa = _pyarrow()
+    table = pa.parquet.read_table(clean_data_path(name, clean_dir), columns=channels)
+    if as_numpy:
+        data = np.column_stack([col.to_numpy() for col in table.columns]) if table.num_columns else np.empty((table.num_rows, 0), np.float32)
+        return data, table.column_names
+    return table.to_pandas()
+
+def list_channels(name, clean_dir=CLEAN_DATA_DIR):
+    """
+    只讀取 Parquet 檔的結構描述，回傳通道名稱列表。
+    """
+    pa = _pyarrow()
+    return pa.parquet.read_schema(clean_data_path(name, clean_dir)).names
+
+def export_from_store(store_dir=None, clean_dir=CLEAN_DATA_DIR, sets=None):
+    """
+    由 raw_data_store 的儲存區 (已填補缺失值) 輸出各資料集的 Parquet 檔，回傳 {資料集: 檔案大小}。
+    """
+    sizes = {}
+    for name in sets or raw_data_store.DATA_SETS:
+        data, meta = raw_data_store.load_set(name, store_dir)
+        sizes[name] = write_clean_data(data, meta['channels'], clean_data_path(name, clean_dir))
+    return sizes
+
+def convert_csv(name, clean_dir=CLEAN_DATA_DIR):
+    """
+    把筆記本輸出的 Combined_Df_xxx.csv 轉成 Parquet，回傳檔案大小。
+    """
+    import pandas as pd
+
+    df = pd.read_csv(clean_data_path(name, clean_dir, 'csv'), dtype=np.float32, engine='c')
+    return write_clean_data(df, None, clean_data_path(name, clean_dir))
+
+def benchmark(name, clean_dir=CLEAN_DATA_DIR, channels=None):
+    """
+    比較 CSV 與 Parquet 的檔案大小與讀取時間。
+    """
+    import pandas as pd
+
+    csv_path = clean_data_path(name, clean_dir, 'csv')
+    parquet_path = clean_data_path(name, clean_dir)
+    started = time.perf_counter()
+    pd.read_csv(csv_path)
+    csv_time = time.perf_counter() - started
+    started = time.perf_counter()
+    read_clean_data(name, clean_dir=clean_dir)
+    parquet_time = time.perf_counter() - started
+    channels = channels or list_channels(name, clean_dir)[:1]
+    started = time.perf_counter()
+    read_clean_data(name, channels, clean_dir)
+    subset_time = time.perf_counter() - started
+
+    csv_size = os.path.getsize(csv_path)
+    parquet_size = os.path.getsize(parquet_path)
+    print(f"{name}: CSV {csv_size / 1e6:.1f} MB / {csv_time:.2f} 秒，"
+          f"Parquet {parquet_size / 1e6:.1f} MB / {parquet_time:.3f} 秒 (大小 1/{csv_size / parquet_size:.1f}，"
+          f"讀取快 {csv_time / parquet_time:.0f} 倍)，只讀 {len(channels)} 個通道 {subset_time:.3f} 秒")
+
+def main():
+    parser = argparse.ArgumentParser(description="以 Parquet (float32) 儲存 Clean_data")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--from-store', action='store_true', help='由 raw_data_store 的儲存區輸出')
+    group.add_argument('--from-csv', action='store_true', help='轉換 Clean_data 中既有的 CSV')
+    parser.add_argument('--data-root', default=raw_data_store.DATA_ROOT)
+    parser.add_argument('--store', default=None, help='儲存區資料夾 (預設為 data-root/store)')
+    parser.add_argument('--clean-dir', default=CLEAN_DATA_DIR)
+    parser.add_argument('--sets', nargs='+', choices=list(raw_data_store.DATA_SETS))
+    parser.add_argument('--benchmark', action='store_true', help='比較 CSV 與 Parquet (需要 CSV 檔)')
+    args = parser.parse_args()
+
+    sets = args.sets or list(raw_data_store.DATA_SETS)
+    if args.from_store:
+        store_dir = args.store or raw_data_store.default_store_dir(args.data_root)
+        sizes = export_from_store(store_dir, args.clean_dir, sets)
+    else:
+        sizes = {name: convert_csv(name, args.clean_dir) for name in sets}
+    for name, size in sizes.items():
+        print(f"'Combined_Df_{name}' 已保存到: {clean_data_path(name, args.clean_dir)} ({size / 1e6:.1f} MB)")
+
+    if args.benchmark:
+        for name in sets:
+            if os.path.exists(clean_data_path(name, args.clean_dir, 'csv')):
+                benchmark(name, args.clean_dir)
+
+if __name__ == '__main__':
+    main()
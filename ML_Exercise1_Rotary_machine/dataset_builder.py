@@ -0,0 +1,202 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import raw_data_store
+import vibration_features
+
+# --- 多類別故障資料集 ---
+# 筆記本把 Healthy/Normal*.txt、Faulty/Unbalance*.txt 的讀取流程各複製一次，新增故障類別就要再複製一份。
+# 這裡自動掃描訓練資料夾下的類別子資料夾，每個錄製檔轉成一個 float32 .npy (每列一個通道)，
+# 並以 manifest.json 記錄類別、來源檔指紋與通道數：
+#   - 新增類別資料夾或錄製檔時只解析新的檔案，既有檔案不會重新處理；
+#   - 來源檔有變動 (大小或修改時間) 時重新解析，來源檔刪除時從資料集移除。
+# 標籤預設為子資料夾名稱 (Healthy、Faulty...)；--label-by prefix 則使用檔名開頭的英文字
+# (Normal、Unbalance、Misalignment...)，同一資料夾中可以有多種故障。
+# 用法：
+#   python dataset_builder.py --training-dir /content/drive/MyDrive/ML_Exercise1_Rotary_machine/data/Training
+#   X, y, classes = dataset_builder.load_features(dataset_dir)     # 每個通道一列特徵
+
+TRAINING_DIR = os.path.join(raw_data_store.DATA_ROOT, 'Training')
+DATASET_DIR = os.path.join(raw_data_store.DATA_ROOT, 'dataset')
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+LABEL_MODES = ('dir', 'prefix')
+
+_PREFIX_RE = re.compile(r'^[A-Za-z]+')
+
+def label_for(path, training_dir, label_by='dir'):
+    """
+    依 label_by 取得錄製檔的類別名稱。
+    """
+    if label_by == 'prefix':
+        match = _PREFIX_RE.match(os.path.basename(path))
+        if match:
+            return match.group(0)
+    return os.path.relpath(os.path.dirname(path), training_dir).replace(os.sep, '/')
+
+def discover(training_dir=TRAINING_DIR, label_by='dir', pattern='*.txt'):
+    """
+    掃描 training_dir 下各類別子資料夾 (可多層) 中的錄製檔，回傳 {路徑: 類別}。
+    """
+    files = {}
+    for path in sorted(glob.glob(os.path.join(training_dir, '**', pattern), recursive=True)):
+        if os.path.dirname(os.path.abspath(path)) == os.path.abspath(training_dir):
+            continue # 直接放在 training_dir 下的檔案沒有類別
+        files[os.path.abspath(path)] = label_for(path, training_dir, label_by)
+    return files
+
+def read_manifest(dataset_dir):
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'version': MANIFEST_VERSION, 'recordings': []}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def write_manifest(dataset_dir, manifest):
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+def _convert(args):
+    """
+    在子行程中解析一個錄製檔並寫成 .npy (通道數, 資料點數)，缺失值以各通道平均值填補。
+    """
+    source, target = args
+    columns, data = raw_data_store.read_raw_file(source)
+    for channel in data:
+        missing = np.isnan(channel)
+        if missing.any():
+            channel[missing] = np.nanmean(channel) if not missing.all() else 0.0
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = target + '.tmp.npy'
+    np.save(tmp_path, data)
+    os.replace(tmp_path, target)
+    return columns, data.shape[1]
+
+def build(training_dir=TRAINING_DIR, dataset_dir=DATASET_DIR, label_by='dir', workers=None, force=False):
+    """
+    更新資料集：只解析新增或變動的錄製檔，移除已不存在的錄製檔。
+    回傳 (manifest, 新解析的檔案數, 移除的檔案數)。
+    """
+    if label_by not in LABEL_MODES:
+        raise ValueError(f"label_by 必須是 {LABEL_MODES} 之一")
+    os.makedirs(dataset_dir, exist_ok=True)
+    manifest = read_manifest(dataset_dir)
+    if manifest.get('label_by', label_by) != label_by or manifest.get('version') != MANIFEST_VERSION:
+        force = True # 標籤方式或格式改變時全部重建
+    previous = {r['source']['path']: r for r in manifest['recordings']}
+    existing = {} if force else previous
+
+    discovered = discover(training_dir, label_by)
+    keep, todo = [], []
+    for path, label in discovered.items():
+        fingerprint = raw_data_store.file_fingerprint(path)
+        record = existing.get(path)
+        if record is not None and record['source'] == fingerprint and record['label'] == label:
+            keep.append(record)
+            continue
+        stem = os.path.splitext(os.path.relpath(path, training_dir))[0].replace(os.sep, '__')
+        todo.append({'label': label, 'source': fingerprint, 'file': f'recordings/{stem}.npy'})
+
+    removed = [r for p, r in previous.items() if p not in discovered]
+    for record in removed:
+        target = os.path.join(dataset_dir, record['file'])
+        if os.path.exists(target):
+            os.remove(target)
+
+    if todo:
+        jobs = [(r['source']['path'], os.path.join(dataset_dir, r['file'])) for r in todo]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for record, (columns, samples) in zip(todo, executor.map(_convert, jobs)):
+                record['columns'] = columns
+                record['channels'] = len(columns)
+                record['samples'] = int(samples)
+
+    recordings = sorted(keep + todo, key=lambda r: (r['label'], r['source']['path']))
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'label_by': label_by,
+        'training_dir': os.path.abspath(training_dir),
+        'classes': sorted({r['label'] for r in recordings}),
+        'recordings': recordings,
+        'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    write_manifest(dataset_dir, manifest)
+    return manifest, len(todo), len(removed)
+
+def iter_recordings(dataset_dir=DATASET_DIR, classes=None):
+    """
+    依序產生 (類別, 錄製檔資訊, 資料 (資料點數, 通道數) 記憶體映射)。
+    """
+    manifest = read_manifest(dataset_dir)
+    for record in manifest['recordings']:
+        if classes is None or record['label'] in classes:
+            data = np.load(os.path.join(dataset_dir, record['file']), mmap_mode='r')
+            yield record['label'], record, data.T
+
+def load_channels(dataset_dir=DATASET_DIR, classes=None, length=None):
+    """
+    把所有錄製檔的通道合併成 (通道總數, length) 的 float32 陣列與對應標籤陣列。
+    length 預設為最短錄製檔的資料點數 (較長的錄製檔取前 length 點)。
+    """
+    recordings = list(iter_recordings(dataset_dir, classes))
+    if not recordings:
+        return np.empty((0, 0), np.float32), np.array([], dtype=object)
+    length = length or min(data.shape[0] for _, _, data in recordings)
+    total = sum(data.shape[1] for _, _, data in recordings)
+    X = np.empty((total, length), dtype=np.float32)
+    labels = []
+    row = 0
+    for label, _, data in recordings:
+        channels = data.shape[1]
+        X[row:row + channels] = data[:length].T
+        labels.extend([label] * channels)
+        row += channels
+    return X, np.array(labels)
+
+def load_features(dataset_dir=DATASET_DIR, classes=None, cache=None, **band_params):
+    """
+    對每個錄製檔計算 10 個特徵 (每個通道一列)，回傳 (特徵矩陣, 標籤陣列, 類別列表)。
+    cache 可傳入 spectrum_cache.SpectrumCache，重複計算時直接使用快取的頻譜。
+    """
+    rows, labels = [], []
+    for label, _, data in iter_recordings(dataset_dir, classes):
+        if cache is not None:
+            features = cache.extract_features(data, **band_params)
+        else:
+            features = vibration_features.extract_features(data, **band_params)
+        rows.append(features)
+        labels.extend([label] * features.shape[0])
+    if not rows:
+        return np.empty((0, len(vibration_features.FEATURE_NAMES))), np.array([], dtype=object), []
+    labels = np.array(labels)
+    return np.vstack(rows), labels, sorted(set(labels.tolist()))
+
+def main():
+    parser = argparse.ArgumentParser(description="建立 / 更新多類別振動資料集")
+    parser.add_argument('--training-dir', default=TRAINING_DIR, help='類別子資料夾所在的資料夾')
+    parser.add_argument('--dataset-dir', default=DATASET_DIR)
+    parser.add_argument('--label-by', choices=LABEL_MODES, default='dir', help='以子資料夾名稱或檔名開頭作為類別')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='全部重新解析')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest, converted, removed = build(args.training_dir, args.dataset_dir, args.label_by, args.workers, args.force)
+    elapsed = time.perf_counter() - started
+    print(f"資料集：{len(manifest['recordings'])} 個錄製檔，新解析 {converted} 個、移除 {removed} 個，耗時 {elapsed:.2f} 秒")
+    for label in manifest['classes']:
+        records = [r for r in manifest['recordings'] if r['label'] == label]
+        print(f"  {label:<20} {len(records):>4} 個錄製檔，{sum(r['channels'] for r in records):>5} 個通道")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import raw_data_store
+import vibration_features
+
+# --- 時域圖與頻域圖的平行輸出 ---
+# 筆記本對每個通道依序 plt.figure / plt.plot(50 萬點) / plt.savefig，繪圖時間主要花在大量資料點上。
+# 這裡：
+#   1. 先把每條曲線以 min-max 方式降採樣到圖片的像素寬度 (每個像素欄保留最小值與最大值，外觀與原圖相同)；
+#   2. 在行程池中以 Agg 畫布 (不經過 pyplot、不需要視窗環境) 平行繪圖，同時送出的工作數有上限，記憶體用量固定；
+#   3. 以原始資料與繪圖參數的雜湊值判斷圖是否需要重畫，資料沒變時直接略過。
+# 檔名與資料夾沿用筆記本的命名。
+# 用法：
+#   python figure_export.py --data-root /content/drive/MyDrive/ML_Exercise1_Rotary_machine/data \
+#       --fig-root /content/drive/MyDrive/ML_Exercise1_Rotary_machine/fig
+
+FIG_ROOT = '/content/drive/MyDrive/ML_Exercise1_Rotary_machine/fig'
+FIGURE_VERSION = 1 # 繪圖樣式改變時遞增，讓既有的圖全部重畫
+FIGSIZE = (15, 6)
+DPI = 100
+FFT_XLIM = (0, 120) # 頻域圖只顯示 0~120 Hz
+HASH_FILE = '.figure_hashes.json'
+
+def minmax_downsample(x, y, n_buckets):
+    """
+    把 (x, y) 分成 n_buckets 段，每段只保留最小值與最大值 (依原本順序)，回傳降採樣後的 (x, y)。
+    資料點數不多於 2 * n_buckets 時原樣回傳。
+    """
+    y = np.asarray(y)
+    n = y.size
+    if n <= 2 * n_buckets:
+        return np.asarray(x), y
+    size = n // n_buckets
+    usable = size * n_buckets
+    blocks = y[:usable].reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    imin = blocks.argmin(axis=1) + offsets
+    imax = blocks.argmax(axis=1) + offsets
+    index = np.column_stack([np.minimum(imin, imax), np.maximum(imin, imax)]).ravel()
+    if usable < n:
+        tail = y[usable:]
+        tail_index = np.array(sorted({usable + int(tail.argmin()), usable + int(tail.argmax())}))
+        index = np.concatenate([index, tail_index])
+    return np.asarray(x)[index], y[index]
+
+def _pixel_width(figsize=FIGSIZE, dpi=DPI):
+    return int(figsize[0] * dpi)
+
+def _render(job):
+    """
+    在子行程中繪製一張圖 (只使用 Figure 物件與 Agg 畫布)。
+    """
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=job['figsize'], dpi=job['dpi'])
+    ax = fig.subplots()
+    ax.plot(job['x'], job['y'], linewidth=0.8)
+    ax.set_title(job['title'], fontsize=job.get('title_size', 12))
+    ax.set_xlabel(job['xlabel'])
+    ax.set_ylabel(job['ylabel'])
+    if job.get('xlim'):
+        ax.set_xlim(job['xlim'])
+    ax.grid(True)
+    fig.savefig(job['path'])
+    return job['path']
+
+class FigureExporter:
+    """
+    管理繪圖工作：計算雜湊、降採樣、送入行程池並記錄各資料夾的雜湊檔。
+    """
+
+    def __init__(self, workers=None, max_pending=None, figsize=FIGSIZE, dpi=DPI, force=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2 # 同時在佇列中的工作數上限
+        self.figsize = figsize
+        self.dpi = dpi
+        self.force = force
+        self.hashes = {} # 資料夾 -> {檔名: 雜湊}
+        self.rendered = 0
+        self.skipped = 0
+
+    def _load_hashes(self, out_dir):
+        if out_dir not in self.hashes:
+            path = os.path.join(out_dir, HASH_FILE)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self.hashes[out_dir] = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self.hashes[out_dir] = {}
+        return self.hashes[out_dir]
+
+    def _save_hashes(self):
+        for out_dir, hashes in self.hashes.items():
+            with open(os.path.join(out_dir, HASH_FILE), 'w', encoding='utf-8') as f:
+                json.dump(hashes, f, ensure_ascii=False, indent=1)
+
+    def _fingerprint(self, series, params):
+        digest = hashlib.sha1(np.ascontiguousarray(series).view(np.uint8))
+        digest.update(json.dumps([FIGURE_VERSION, self.figsize, self.dpi, params], ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()
+
+    def iter_jobs(self, specs):
+        """
+        specs 產生 (out_dir, filename, x, y, params)；已是最新的圖會被略過，其餘轉成繪圖工作。
+        """
+        width = _pixel_width(self.figsize, self.dpi)
+        for out_dir, filename, x, y, params in specs:
+            hashes = self._load_hashes(out_dir)
+            path = os.path.join(out_dir, filename)
+            key = self._fingerprint(y, params)
+            if not self.force and hashes.get(filename) == key and os.path.exists(path):
+                self.skipped += 1
+                continue
+            x_small, y_small = minmax_downsample(x, y, width)
+            job = dict(params, x=x_small, y=np.asarray(y_small, dtype=np.float64), path=path, figsize=self.figsize, dpi=self.dpi)
+            yield job, out_dir, filename, key
+
+    def run(self, specs):
+        """
+        執行所有繪圖工作，回傳 (重畫張數, 略過張數)。
+        """
+        pending = {}
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for job, out_dir, filename, key in self.iter_jobs(specs):
+                os.makedirs(out_dir, exist_ok=True)
+                if len(pending) >= self.max_pending:
+                    self._collect(pending, wait(pending, return_when=FIRST_COMPLETED).done)
+                pending[executor.submit(_render, job)] = (out_dir, filename, key)
+            self._collect(pending, wait(pending).done)
+        self._save_hashes()
+        return self.rendered, self.skipped
+
+    def _collect(self, pending, done):
+        for future in done:
+            out_dir, filename, key = pending.pop(future)
+            future.result() # 繪圖失敗時在這裡拋出例外
+            self.hashes[out_dir][filename] = key
+            self.rendered += 1
+
+# --- 筆記本中的圖 ---
+def time_domain_specs(data, channel_names, label, out_dir, fs=vibration_features.FS):
+    """
+    各通道的時域振幅圖 (同筆記本的 Pic_xxx_ACC_TIME_AMP)。
+    時間軸為 資料點索引 / Fs。
+    """
+    n = data.shape[0]
+    t = np.arange(n) / fs
+    for i, col in enumerate(channel_names):
+        params = {'title': f'{col} Time Domain Amplitude for Combined_Df_{label}', 'xlabel': 'Time (s)', 'ylabel': 'Amplitude'}
+        yield out_dir, f'{col}_Time_Domain_Amplitude.png', t, data[:, i], params
+
+def fft_specs(data, label, out_dir, fs=vibration_features.FS, xlim=FFT_XLIM):
+    """
+    各通道的頻域圖 (同筆記本的 Pic_Healthy_FFT)；只繪製 xlim 範圍內的頻率。
+    """
+    n = data.shape[0]
+    freq = vibration_features.frequency_axis(n, fs)
+    visible = freq <= xlim[1]
+    spectrum = vibration_features.magnitude_spectrum(data)[visible]
+    for i in range(spectrum.shape[1]):
+        params = {'title': f'FFT of Vibration signal, {label.lower()}: {i + 1}', 'title_size': 10,
+                  'xlabel': 'Hz', 'ylabel': 'Amplitude', 'xlim': list(xlim)}
+        yield out_dir, f'{label}_Fft_Vibration_{i + 1}.png', freq[visible], spectrum[:, i], params
+
+def export_all(store_dir=None, fig_root=FIG_ROOT, sets=None, fft_sets=('Healthy',), workers=None, force=False):
+    """
+    從 raw_data_store 的儲存區讀取資料 (記憶體映射)，輸出所有時域圖與指定資料集的頻域圖。
+    """
+    sets = sets or list(raw_data_store.DATA_SETS)
+
+    def specs():
+        for label in sets:
+            data, meta = raw_data_store.load_set(label, store_dir)
+            yield from time_domain_specs(data, meta['channels'], label, os.path.join(fig_root, f'Pic_{label}_ACC_TIME_AMP'))
+            if label in fft_sets:
+                yield from fft_specs(data, label, os.path.join(fig_root, f'Pic_{label}_FFT'))
+
+    exporter = FigureExporter(workers=workers, force=force)
+    return exporter.run(specs())
+
+def main():
+    parser = argparse.ArgumentParser(description="平行輸出振動資料的時域圖與頻域圖")
+    parser.add_argument('--data-root', default=raw_data_store.DATA_ROOT)
+    parser.add_argument('--store', default=None, help='儲存區資料夾 (預設為 data-root/store)')
+    parser.add_argument('--fig-root', default=FIG_ROOT)
+    parser.add_argument('--sets', nargs='+', choices=list(raw_data_store.DATA_SETS), help='要輸出的資料集 (預設全部)')
+    parser.add_argument('--fft-sets', nargs='*', default=['Healthy'], help='同時輸出頻域圖的資料集')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='忽略雜湊，全部重畫')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    store_dir = args.store or raw_data_store.default_store_dir(args.data_root)
+    rendered, skipped = export_all(store_dir, args.fig_root, args.sets, args.fft_sets, args.workers, args.force)
+    print(f"已輸出 {rendered} 張圖，略過 {skipped} 張未變動的圖，耗時 {time.perf_counter() - started:.1f} 秒")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# --- 原始振動資料的二進位儲存 ---
+# 筆記本每次都以 pd.read_csv(sep='\t') 重新解析文字檔，再 pd.concat(axis=1) 與 fillna(mean())。
+# 這裡只在檔案有變動時平行解析一次，存成 float32 的 .npy (每列一個通道，通道資料在磁碟上連續)，
+# 並把通道與來源檔資訊寫入 .json；之後的步驟以記憶體映射 (mmap) 開啟，幾乎不需要載入時間。
+# 用法：
+#   python raw_data_store.py --data-root /content/drive/MyDrive/ML_Exercise1_Rotary_machine/data
+#   data, meta = raw_data_store.load_set("Healthy")   # data 形狀 (資料點數, 通道數)，同 DataFrame.values
+
+DATA_ROOT = '/content/drive/MyDrive/ML_Exercise1_Rotary_machine/data'
+STORE_FOLDER = 'store'
+STORE_VERSION = 1
+
+# 資料集名稱 -> 相對於 DATA_ROOT 的檔案模式 (與筆記本相同)
+DATA_SETS = {
+    'Healthy': 'Training/Healthy/Normal*.txt',
+    'Faulty': 'Training/Faulty/Unbalance*.txt',
+    'Testing': 'Testing/*.txt',
+}
+
+def default_store_dir(data_root=DATA_ROOT):
+    return os.path.join(data_root, STORE_FOLDER)
+
+def read_raw_file(path):
+    """
+    解析一個 tab 分隔的原始資料檔 (第一行為標題)，回傳 (欄位名稱, float32 陣列 (欄位數, 資料點數))。
+    在子行程中執行。
+    """
+    import pandas as pd
+
+    df = pd.read_csv(path, sep='\t', dtype=np.float32, engine='c')
+    return list(df.columns), np.ascontiguousarray(df.to_numpy(dtype=np.float32).T)
+
+def file_fingerprint(path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+def _store_paths(store_dir, name):
+    return os.path.join(store_dir, f'{name}.npy'), os.path.join(store_dir, f'{name}.json')
+
+def read_metadata(name, store_dir):
+    _, meta_path = _store_paths(store_dir, name)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        return json.load(f)
+
+def assemble(parts, out_path):
+    """
+    把各檔案解析結果依序水平合併 (同 pd.concat(axis=1)) 寫入 out_path (.npy，形狀 (通道數, 資料點數))。
+    長度不同的檔案以 NaN 補齊，再與筆記本相同用各通道平均值填補缺失值。
+    回傳 (通道數, 資料點數, 各通道填補的缺失值數量)。
+    """
+    channels = sum(arr.shape[0] for _, arr in parts)
+    samples = max(arr.shape[1] for _, arr in parts)
+    tmp_path = out_path + '.tmp.npy'
+    store = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(channels, samples))
+    filled = []
+    row = 0
+    for _, arr in parts:
+        for channel in arr:
+            target = store[row]
+            target[:channel.size] = channel
+            target[channel.size:] = np.nan
+            missing = np.isnan(target)
+            count = int(missing.sum())
+            if count:
+                target[missing] = np.nanmean(target) if count < samples else 0.0
+            filled.append(count)
+            row += 1
+    store.flush()
+    del store
+    os.replace(tmp_path, out_path)
+    return channels, samples, filled
+
+def ingest_set(name, pattern, data_root=DATA_ROOT, store_dir=None, workers=None, force=False):
+    """
+    解析一個資料集的所有原始檔並寫入儲存區；來源檔沒有變動 (大小與修改時間相同) 時直接略過。
+    回傳 metadata dict；找不到任何檔案時回傳 None。
+    """
+    store_dir = store_dir or default_store_dir(data_root)
+    file_paths = sorted(glob.glob(os.path.join(data_root, pattern))) # 排序讓通道順序固定
+    if not file_paths:
+        print(f"錯誤：在路徑 '{os.path.join(data_root, pattern)}' 下沒有找到任何文件。")
+        return None
+
+    fingerprints = [file_fingerprint(p) for p in file_paths]
+    meta = read_metadata(name, store_dir)
+    if not force and meta and meta.get('version') == STORE_VERSION and [f['file'] for f in meta['files']] == fingerprints:
+        print(f"{name}: {len(file_paths)} 個檔案沒有變動，沿用既有資料。")
+        return meta
+
+    os.makedirs(store_dir, exist_ok=True)
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parts = list(executor.map(read_raw_file, file_paths))
+
+    data_path, meta_path = _store_paths(store_dir, name)
+    channels, samples, filled = assemble(parts, data_path)
+
+    files = []
+    channel_names = []
+    row = 0
+    for fingerprint, (columns, arr) in zip(fingerprints, parts):
+        files.append({'file': fingerprint, 'columns': columns, 'samples': int(arr.shape[1]), 'first_channel': row})
+        row += arr.shape[0]
+    channel_names = [f'Acceleration{i + 1}' for i in range(channels)] # 與筆記本相同的欄位名稱
+    meta = {
+        'version': STORE_VERSION,
+        'name': name,
+        'pattern': pattern,
+        'dtype': 'float32',
+        'layout': 'channels_first',
+        'channels': channel_names,
+        'samples': samples,
+        'nan_filled': filled,
+        'files': files,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=1)
+    print(f"{name}: {len(file_paths)} 個檔案 -> {channels} 通道 x {samples} 點，耗時 {time.perf_counter() - started:.2f} 秒")
+    return meta
+
+def ingest_all(data_root=DATA_ROOT, store_dir=None, workers=None, force=False, data_sets=None):
+    """
+    依序處理 DATA_SETS 中的所有資料集 (每個資料集內的檔案平行解析)。
+    """
+    data_sets = data_sets or DATA_SETS
+    return {name: ingest_set(name, pattern, data_root, store_dir, workers, force) for name, pattern in data_sets.items()}
+
+def load_set(name, store_dir=None, channels=None, mmap=True):
+    """
+    以記憶體映射開啟資料集，回傳 (data, metadata)。
+    data 形狀為 (資料點數, 通道數)，與筆記本中 Combined_Df_xxx.values 相同；
+    channels 可指定通道名稱或索引列表，只取出這些通道。
+    """
+    store_dir = store_dir or default_store_dir()
+    data_path, _ = _store_paths(store_dir, name)
+    meta = read_metadata(name, store_dir)
+    if meta is None:
+        raise FileNotFoundError(f"找不到資料集 '{name}'，請先執行 raw_data_store.py 建立儲存區。")
+    store = np.load(data_path, mmap_mode='r' if mmap else None)
+    if channels is not None:
+        index = [meta['channels'].index(c) if isinstance(c, str) else c for c in channels]
+        store = store[index]
+        meta = dict(meta, channels=[meta['channels'][i] for i in index])
+    return store.T, meta
+
+def load_dataframe(name, store_dir=None, channels=None):
+    """
+    以 DataFrame 形式載入 (欄位為 Acceleration1..N)，方便沿用筆記本中的程式碼。
+    """
+    import pandas as pd
+
+    data, meta = load_set(name, store_dir, channels, mmap=False)
+    return pd.DataFrame(data, columns=meta['channels'])
+
+def main():
+    parser = argparse.ArgumentParser(description="將原始振動資料 (.txt) 轉存為 float32 .npy 儲存區")
+    parser.add_argument('--data-root', default=DATA_ROOT)
+    parser.add_argument('--store', default=None, help='儲存區資料夾 (預設為 data-root/store)')
+    parser.add_argument('--workers', type=int, default=None, help='平行解析的行程數')
+    parser.add_argument('--force', action='store_true', help='忽略既有資料，全部重新解析')
+    args = parser.parse_args()
+    ingest_all(args.data_root, args.store, args.workers, args.force)
+
+if __name__ == '__main__':
+    main()
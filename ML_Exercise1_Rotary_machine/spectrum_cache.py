@@ -0,0 +1,155 @@
+import argparse
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import vibration_features
+
+# --- 頻譜快取 ---
+# 振幅譜只與原始資料和 Fs 有關，與 baseFreq1、dFreq1、dFreq2 無關。
+# 以「原始通道資料 + Fs」的雜湊值為鍵，把每個通道的振幅譜與時域統計量存到快取資料夾 (.npy)，
+# 並在記憶體中保留最近使用的結果；只調整特徵頻率參數時，直接由快取的頻譜取 1X~5X 最大值，不必重做 FFT。
+# 用法：
+#   cache = spectrum_cache.SpectrumCache()
+#   features = cache.extract_features(data, base_freq=21)   # data 形狀 (資料點數, 通道數)
+
+CACHE_DIR = '/content/drive/MyDrive/ML_Exercise1_Rotary_machine/data/spectrum_cache'
+CACHE_VERSION = 1 # 頻譜或統計量的計算方式改變時遞增
+MEMORY_ENTRIES = 256 # 記憶體中保留的通道數上限 (LRU)
+
+def channel_key(channel, fs):
+    """
+    單一通道的快取鍵：資料內容 (保留原本的型別，不轉換) 的雜湊值加上型別、Fs 與資料點數。
+    """
+    channel = np.ascontiguousarray(channel)
+    digest = hashlib.blake2b(channel.view(np.uint8), digest_size=16)
+    digest.update(f'{CACHE_VERSION}|{channel.dtype.str}|{float(fs)!r}|{channel.size}'.encode('ascii'))
+    return digest.hexdigest()
+
+class SpectrumCache:
+    """
+    通道振幅譜與時域統計量的快取 (磁碟 + 記憶體 LRU)。cache_dir 為 None 時只使用記憶體。
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, memory_entries=MEMORY_ENTRIES):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict() # key -> (spectrum, time_features)
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        return os.path.join(self.cache_dir, f'{key}_spectrum.npy'), os.path.join(self.cache_dir, f'{key}_time.npy')
+
+    def _lookup(self, key):
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            return entry
+        if self.cache_dir:
+            spectrum_path, time_path = self._paths(key)
+            if os.path.exists(spectrum_path) and os.path.exists(time_path):
+                entry = (np.load(spectrum_path, mmap_mode='r'), np.load(time_path))
+                self._remember(key, entry)
+                return entry
+        return None
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _store(self, key, spectrum, time_features):
+        if self.cache_dir:
+            spectrum_path, time_path = self._paths(key)
+            for path, array in ((spectrum_path, spectrum), (time_path, time_features)):
+                tmp_path = path + '.tmp.npy'
+                np.save(tmp_path, array)
+                os.replace(tmp_path, path)
+        self._remember(key, (spectrum, time_features))
+
+    def get(self, data, fs=vibration_features.FS):
+        """
+        取得所有通道的振幅譜 (n//2, 通道數) 與時域特徵 (通道數, 5)。
+        只有快取中沒有的通道才計算 (一次批次 rfft)。
+        """
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data[:, None]
+        keys = [channel_key(data[:, i], fs) for i in range(data.shape[1])]
+        entries = [self._lookup(key) for key in keys]
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            subset = data[:, missing]
+            spectra = vibration_features.magnitude_spectrum(subset)
+            time_features = vibration_features.time_domain_features(subset)
+            for j, i in enumerate(missing):
+                entry = (np.ascontiguousarray(spectra[:, j]), time_features[j])
+                self._store(keys[i], *entry)
+                entries[i] = entry
+
+        spectrum = np.column_stack([entry[0] for entry in entries])
+        time_features = np.vstack([entry[1] for entry in entries])
+        return spectrum, time_features
+
+    def extract_features(self, data, fs=vibration_features.FS, base_freq=vibration_features.BASE_FREQ1,
+                         d_freq1=vibration_features.D_FREQ1, d_freq2=vibration_features.D_FREQ2):
+        """
+        與 vibration_features.extract_features 相同的 (通道數, 10) 特徵矩陣，但頻譜與時域統計量取自快取。
+        """
+        n = np.shape(data)[0]
+        spectrum, time_features = self.get(data, fs)
+        return np.hstack([time_features, vibration_features.band_maxima(spectrum, n, fs, base_freq, d_freq1, d_freq2)])
+
+    def feature_sweep(self, data, band_params, fs=vibration_features.FS):
+        """
+        對多組特徵頻率參數 [(base_freq, d_freq1, d_freq2), ...] 計算特徵矩陣。
+        原始資料只雜湊與查詢快取一次，之後每組參數只需在頻譜上取 5 段最大值 (數十微秒)。
+        """
+        n = np.shape(data)[0]
+        spectrum, time_features = self.get(data, fs)
+        return [np.hstack([time_features, vibration_features.band_maxima(spectrum, n, fs, *params)]) for params in band_params]
+
+    def clear(self):
+        """
+        清除記憶體與磁碟上的快取。
+        """
+        self.memory.clear()
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.npy'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+def main():
+    import raw_data_store
+
+    parser = argparse.ArgumentParser(description="示範：以頻譜快取調整特徵頻率參數")
+    parser.add_argument('set', nargs='?', default='Healthy', help='資料集名稱')
+    parser.add_argument('--store', default=None, help='raw_data_store 儲存區資料夾')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--base-freqs', type=float, nargs='+', default=[20, 21, 19.5], help='要比較的 baseFreq1')
+    args = parser.parse_args()
+
+    data, meta = raw_data_store.load_set(args.set, args.store)
+    cache = SpectrumCache(args.cache_dir)
+    started = time.perf_counter()
+    cache.get(data)
+    print(f"{args.set}: {data.shape[1]} 通道，讀取/計算頻譜 {(time.perf_counter() - started) * 1000:.1f} ms (快取命中 {cache.hits}、未命中 {cache.misses})")
+
+    band_params = [(base_freq, vibration_features.D_FREQ1, vibration_features.D_FREQ2) for base_freq in args.base_freqs]
+    started = time.perf_counter()
+    results = cache.feature_sweep(data, band_params)
+    elapsed = time.perf_counter() - started
+    print(f"{len(results)} 組 baseFreq1 的特徵矩陣共耗時 {elapsed * 1000:.2f} ms (含一次資料雜湊)")
+
+if __name__ == '__main__':
+    main()
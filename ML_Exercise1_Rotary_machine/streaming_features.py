@@ -0,0 +1,271 @@
+import argparse
+import csv
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+import vibration_features
+
+# --- 串流 (分窗) 特徵擷取 ---
+# 筆記本一次把整個通道載入記憶體並保存完整的複數頻譜；長時間錄製或即時感測器無法這樣處理。
+# 這裡以固定長度、可重疊的視窗 (類似 Welch/STFT) 逐段處理樣本：
+#   - 每一段新樣本 (hop) 先計算一階到四階中心動差，再以可合併的動差累加器 (Pébay 公式)
+#     合併成視窗統計量 (RMS、Mean、Kurtosis、StdDev、Skewness) 與整段錄製的累計統計量；
+#   - 視窗資料做 rfft 取得 1X~5X 範圍內的最大振幅；
+#   - 每個視窗輸出一列特徵，記憶體用量只與視窗長度和通道數有關，與錄製長度無關。
+# 用法：
+#   python streaming_features.py --replay Normal1.txt -o features.csv           (以最快速度重播)
+#   python streaming_features.py --replay Normal1.txt --realtime                (依取樣率即時重播)
+#   python streaming_features.py --store Healthy --window 1 --overlap 0.5
+
+DEFAULT_WINDOW_SECONDS = 1.0
+DEFAULT_OVERLAP = 0.5
+MIN_WINDOW = 4 # 視窗最少的樣本數 (單邊頻譜至少 2 個頻率點)
+REPLAY_BLOCK = 1024 # 重播時每次送入的樣本數
+
+class MomentAccumulator:
+    """
+    各通道的樣本數、平均值與二到四階中心動差和 (M2、M3、M4)。
+    兩個累加器可以合併 (merge)，結果與把兩段資料合在一起計算相同。
+    """
+
+    def __init__(self, channels):
+        self.n = 0
+        self.mean = np.zeros(channels)
+        self.m2 = np.zeros(channels)
+        self.m3 = np.zeros(channels)
+        self.m4 = np.zeros(channels)
+
+    @classmethod
+    def from_block(cls, block):
+        """
+        由一段資料 (通道數, 樣本數) 建立累加器。
+        """
+        acc = cls(block.shape[0])
+        acc.n = block.shape[1]
+        acc.mean = block.mean(axis=1, dtype=np.float64)
+        centered = block - acc.mean[:, None]
+        sq = centered * centered
+        acc.m2 = sq.sum(axis=1, dtype=np.float64)
+        acc.m3 = (sq * centered).sum(axis=1, dtype=np.float64)
+        acc.m4 = (sq * sq).sum(axis=1, dtype=np.float64)
+        return acc
+
+    def merge(self, other):
+        """
+        把 other 合併進目前的累加器 (就地更新)，回傳 self。
+        """
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.m3, self.m4 = other.n, other.mean.copy(), other.m2.copy(), other.m3.copy(), other.m4.copy()
+            return self
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        d_n = delta / n
+        d_n2 = d_n * d_n
+        m4 = (self.m4 + other.m4 + delta * d_n2 * d_n * na * nb * (na * na - na * nb + nb * nb)
+              + 6 * d_n2 * (na * na * other.m2 + nb * nb * self.m2) + 4 * d_n * (na * other.m3 - nb * self.m3))
+        m3 = (self.m3 + other.m3 + delta * d_n2 * na * nb * (na - nb)
+              + 3 * d_n * (na * other.m2 - nb * self.m2))
+        m2 = self.m2 + other.m2 + delta * d_n * na * nb
+        self.n = n
+        self.mean = self.mean + d_n * nb
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        return self
+
+    def features(self):
+        """
+        回傳 (通道數, 5)：RMS、Mean、Kurtosis、StdDev、Skewness (與 vibration_features.time_domain_features 相同定義)。
+        """
+        var = self.m2 / self.n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            skew = (self.m3 / self.n) / var ** 1.5
+            kurtosis = (self.m4 / self.n) / (var * var) - 3.0
+        return np.column_stack([np.sqrt(var + self.mean * self.mean), self.mean, kurtosis, np.sqrt(var), skew])
+
+def window_samples(window_seconds=DEFAULT_WINDOW_SECONDS, overlap=DEFAULT_OVERLAP, fs=vibration_features.FS):
+    """
+    把視窗長度 (秒) 與重疊比例換算成 (視窗樣本數, 步進樣本數)。
+    步進必須整除視窗長度，因此取最接近 window * (1 - overlap) 的視窗長度因數
+    (例如 2560 點、重疊 0.3 時步進為 1280，實際重疊 0.5)。
+    """
+    if not 0 <= overlap < 1:
+        raise ValueError(f"重疊比例必須介於 0 (含) 與 1 之間：{overlap}")
+    window = int(round(window_seconds * fs))
+    if window < MIN_WINDOW:
+        raise ValueError(f"視窗太短：{window_seconds} 秒只有 {window} 點，至少需要 {MIN_WINDOW} 點")
+    target = window * (1 - overlap)
+    divisors = set()
+    for d in range(1, int(window ** 0.5) + 1):
+        if window % d == 0:
+            divisors.update((d, window // d))
+    hop = min(divisors, key=lambda d: (abs(d - target), -d))
+    return window, hop
+
+class StreamingFeatureExtractor:
+    """
+    以固定視窗長度 window 與步進 hop (樣本數) 處理連續樣本。
+    window 必須是 hop 的整數倍：每個 hop 的動差只計算一次，視窗統計量由最近 window/hop 段合併而得。
+    """
+
+    def __init__(self, channels, fs=vibration_features.FS, window=None, hop=None,
+                 base_freq=vibration_features.BASE_FREQ1, d_freq1=vibration_features.D_FREQ1, d_freq2=vibration_features.D_FREQ2):
+        self.channels = channels
+        self.fs = fs
+        self.window = window or int(fs * DEFAULT_WINDOW_SECONDS)
+        self.hop = hop or int(self.window * (1 - DEFAULT_OVERLAP))
+        if self.hop <= 0 or self.window % self.hop:
+            raise ValueError("視窗長度必須是步進的整數倍 (可用 window_samples 換算)")
+        if self.window < MIN_WINDOW:
+            raise ValueError(f"視窗至少需要 {MIN_WINDOW} 點")
+        self.band_params = (fs, base_freq, d_freq1, d_freq2)
+
+        self.buffer = np.zeros((channels, self.window)) # 最近一個視窗的樣本 (環形緩衝區)
+        self.blocks = deque(maxlen=self.window // self.hop) # 最近幾段 hop 的動差
+        self.total = MomentAccumulator(channels) # 整段錄製的累計動差
+        self.pending = np.empty((channels, 0))
+        self.samples = 0
+        self.windows = 0
+
+    def push(self, block):
+        """
+        送入一段新樣本 (樣本數, 通道數)，長度不限；產生這段資料完成的每個視窗的
+        (視窗編號, 起始樣本, 特徵矩陣 (通道數, 10))。
+        """
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim == 1:
+            block = block[:, None]
+        self.pending = np.concatenate([self.pending, block.T], axis=1) if self.pending.size else np.ascontiguousarray(block.T)
+        while self.pending.shape[1] >= self.hop:
+            hop_data, self.pending = self.pending[:, :self.hop], self.pending[:, self.hop:]
+            result = self._process_hop(hop_data)
+            if result is not None:
+                yield result
+
+    def _process_hop(self, hop_data):
+        missing = np.isnan(hop_data)
+        if missing.any():
+            # 缺失值以目前的累計平均值填補 (還沒有累計資料時用這段資料的平均值)
+            fill = self.total.mean if self.total.n else np.nan_to_num(np.nanmean(np.where(missing.all(axis=1, keepdims=True), 0.0, hop_data), axis=1))
+            hop_data = np.where(missing, fill[:, None], hop_data)
+
+        block = MomentAccumulator.from_block(hop_data)
+        self.total.merge(block)
+        self.blocks.append(block)
+        self.buffer[:, :-self.hop] = self.buffer[:, self.hop:]
+        self.buffer[:, -self.hop:] = hop_data
+        self.samples += self.hop
+        if self.samples < self.window:
+            return None
+
+        window_moments = MomentAccumulator(self.channels)
+        for b in self.blocks:
+            window_moments.merge(b)
+        spectrum = vibration_features.magnitude_spectrum(self.buffer.T)
+        features = np.hstack([
+            window_moments.features(),
+            vibration_features.band_maxima(spectrum, self.window, *self.band_params),
+        ])
+        index = self.windows
+        self.windows += 1
+        return index, self.samples - self.window, features
+
+    def summary(self):
+        """
+        到目前為止整段錄製的時域統計量 (通道數, 5)。
+        """
+        return self.total.features()
+
+# --- 樣本來源 ---
+def replay_text_file(path, block_size=REPLAY_BLOCK):
+    """
+    以分塊方式讀取 tab 分隔的原始資料檔 (不一次載入整個檔案)。
+    """
+    import pandas as pd
+
+    for chunk in pd.read_csv(path, sep='\t', dtype=np.float64, chunksize=block_size):
+        yield chunk.to_numpy()
+
+def replay_store(name, store_dir=None, block_size=REPLAY_BLOCK):
+    """
+    從 raw_data_store 的儲存區 (記憶體映射) 依序讀出樣本。
+    """
+    import raw_data_store
+
+    data, _ = raw_data_store.load_set(name, store_dir)
+    for start in range(0, data.shape[0], block_size):
+        yield data[start:start + block_size]
+
+def paced(blocks, fs):
+    """
+    依取樣率控制送出速度，模擬即時感測器。
+    """
+    started = time.perf_counter()
+    sent = 0
+    for block in blocks:
+        sent += len(block)
+        delay = started + sent / fs - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield block
+
+def run(blocks, out, fs=vibration_features.FS, window_seconds=DEFAULT_WINDOW_SECONDS, overlap=DEFAULT_OVERLAP):
+    """
+    處理樣本來源並以 CSV 串流輸出每個視窗、每個通道的特徵列，回傳 (extractor, 處理秒數)。
+    """
+    writer = csv.writer(out)
+    writer.writerow(['window', 'start_s', 'channel'] + vibration_features.FEATURE_NAMES)
+    extractor = None
+    started = time.perf_counter()
+    for block in blocks:
+        block = np.asarray(block)
+        if extractor is None:
+            window, hop = window_samples(window_seconds, overlap, fs)
+            extractor = StreamingFeatureExtractor(block.shape[1] if block.ndim > 1 else 1, fs, window, hop)
+        for index, start, features in extractor.push(block):
+            start_s = f"{start / fs:.3f}"
+            for channel, row in enumerate(features, start=1):
+                writer.writerow([index, start_s, channel] + [f"{v:.6g}" for v in row])
+    return extractor, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="振動資料的串流 (分窗) 特徵擷取")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--replay', metavar='TXT', help='重播原始資料檔 (tab 分隔)')
+    group.add_argument('--store', metavar='SET', help='從 raw_data_store 儲存區讀取資料集 (例如 Healthy)')
+    parser.add_argument('--store-dir', default=None)
+    parser.add_argument('--fs', type=float, default=vibration_features.FS)
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW_SECONDS, help='視窗長度 (秒)')
+    parser.add_argument('--overlap', type=float, default=DEFAULT_OVERLAP, help='視窗重疊比例 (0~1)')
+    parser.add_argument('--realtime', action='store_true', help='依取樣率即時重播')
+    parser.add_argument('-o', '--output', help='輸出 CSV (預設為標準輸出)')
+    args = parser.parse_args()
+    try:
+        window, hop = window_samples(args.window, args.overlap, args.fs)
+    except ValueError as e:
+        parser.error(str(e))
+    if abs(hop - window * (1 - args.overlap)) > 0.5:
+        print(f"步進需整除視窗長度 ({window} 點)，實際重疊比例為 {1 - hop / window:.3f}", file=sys.stderr)
+
+    blocks = replay_text_file(args.replay) if args.replay else replay_store(args.store, args.store_dir)
+    if args.realtime:
+        blocks = paced(blocks, args.fs)
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        extractor, elapsed = run(blocks, out, args.fs, args.window, args.overlap)
+    finally:
+        if args.output:
+            out.close()
+    if extractor is None:
+        print("沒有讀到任何資料。", file=sys.stderr)
+        return
+    seconds = extractor.samples / args.fs
+    print(f"已處理 {extractor.samples} 點 x {extractor.channels} 通道 ({seconds:.1f} 秒資料)，"
+          f"輸出 {extractor.windows} 個視窗，耗時 {elapsed:.2f} 秒 ({seconds / elapsed if elapsed else 0:.0f} 倍即時速度)", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+import dataset_builder
+import streaming_features
+import vibration_features
+
+# --- 振動特徵分類模型 ---
+# 在 10 個振動特徵之上訓練分類模型 (scikit-learn Pipeline：標準化 + 模型)：
+#   - 訓練資料可以是每個通道一列 (同筆記本的 Feature_healthy_vibration)，
+#     或把每個錄製檔切成視窗，每個視窗一列 (樣本數多很多，較適合訓練)；
+#   - 交叉驗證依錄製檔分組 (同一錄製檔的視窗彼此重疊、高度相似，不可同時出現在訓練與測試折)，
+#     各折在多個 CPU 核心上平行執行；
+#   - predict_batch 以整批陣列運算為大量測試視窗評分。
+# 用法：
+#   python vibration_classifier.py train --dataset-dir data/dataset --windows -o model.joblib
+#   python vibration_classifier.py score --model model.joblib --features features.csv   (streaming_features 的輸出)
+#   python vibration_classifier.py benchmark --dataset-dir data/dataset
+
+MODEL_PATH = os.path.join(dataset_builder.DATASET_DIR, 'vibration_model.joblib')
+DEFAULT_MODEL = 'logistic'
+CV_FOLDS = 5
+PREDICT_BATCH = 65536
+
+def _make_estimator(name, n_jobs=None, random_state=0):
+    from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+
+    if name == 'logistic':
+        return LogisticRegression(max_iter=1000)
+    if name == 'random_forest':
+        return RandomForestClassifier(n_estimators=100, n_jobs=n_jobs, random_state=random_state)
+    if name == 'hist_gb':
+        return HistGradientBoostingClassifier(random_state=random_state)
+    raise ValueError(f"未知的模型：{name}")
+
+MODELS = ('logistic', 'random_forest', 'hist_gb')
+
+def build_pipeline(model=DEFAULT_MODEL, n_jobs=None):
+    """
+    標準化 + 分類模型的 Pipeline。
+    """
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return make_pipeline(StandardScaler(), _make_estimator(model, n_jobs))
+
+def _clean(X):
+    # 常數通道的 Kurtosis/Skewness 為 NaN，以 0 代替
+    return np.nan_to_num(np.asarray(X, dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+
+def window_features(data, fs=vibration_features.FS, window_seconds=streaming_features.DEFAULT_WINDOW_SECONDS,
+                    overlap=streaming_features.DEFAULT_OVERLAP):
+    """
+    把一個錄製檔 (資料點數, 通道數) 切成視窗計算特徵，回傳 (視窗數 * 通道數, 10)。
+    """
+    window, hop = streaming_features.window_samples(window_seconds, overlap, fs)
+    extractor = streaming_features.StreamingFeatureExtractor(data.shape[1], fs, window, hop)
+    rows = [features for _, _, features in extractor.push(data)]
+    if not rows:
+        return np.empty((0, len(vibration_features.FEATURE_NAMES)))
+    return np.vstack(rows)
+
+def load_training_data(dataset_dir=dataset_builder.DATASET_DIR, windows=False, classes=None, **window_params):
+    """
+    由 dataset_builder 的資料集取得 (X, y, groups)，groups 為每列所屬錄製檔的編號 (交叉驗證分組用)。
+    windows 為 False 時每個通道一列 (整段錄製)；為 True 時每個視窗、每個通道一列。
+    """
+    if not windows:
+        X, y, _ = dataset_builder.load_features(dataset_dir, classes)
+        channels = [r['channels'] for r in dataset_builder.read_manifest(dataset_dir)['recordings']
+                    if classes is None or r['label'] in classes]
+        return _clean(X), y, np.repeat(np.arange(len(channels)), channels)
+    rows, labels, groups = [], [], []
+    for recording, (label, _, data) in enumerate(dataset_builder.iter_recordings(dataset_dir, classes)):
+        features = window_features(np.asarray(data), **window_params)
+        rows.append(features)
+        labels.extend([label] * len(features))
+        groups.append(np.full(len(features), recording))
+    if not rows:
+        return np.empty((0, len(vibration_features.FEATURE_NAMES))), np.array([], dtype=object), np.array([], dtype=int)
+    return _clean(np.vstack(rows)), np.array(labels), np.concatenate(groups)
+
+def cross_validate_model(X, y, groups, model=DEFAULT_MODEL, folds=CV_FOLDS, n_jobs=-1):
+    """
+    依錄製檔分組的分層 K 折交叉驗證 (同一錄製檔的所有列只會落在同一折)，
+    各折平行執行 (n_jobs=-1 使用所有核心)，回傳 sklearn 的 cross_validate 結果。
+    """
+    from sklearn.model_selection import StratifiedGroupKFold, cross_validate
+
+    # 折數不能超過任一類別的錄製檔數
+    recordings_per_class = min(len(np.unique(groups[y == label])) for label in np.unique(y))
+    if recordings_per_class < 2:
+        raise ValueError("每個類別至少需要兩個錄製檔才能依錄製檔分組做交叉驗證")
+    folds = min(folds, recordings_per_class)
+    cv = StratifiedGroupKFold(n_splits=folds, shuffle=True, random_state=0)
+    # 平行化放在交叉驗證的各折上，模型本身不再開多執行緒，避免超額使用核心
+    return cross_validate(build_pipeline(model, n_jobs=1), X, y, groups=groups, cv=cv, n_jobs=n_jobs,
+                          scoring=('accuracy', 'f1_macro'))
+
+def train(X, y, model=DEFAULT_MODEL, n_jobs=-1):
+    pipeline = build_pipeline(model, n_jobs)
+    pipeline.fit(X, y)
+    return pipeline
+
+def save_model(pipeline, path=MODEL_PATH, **metadata):
+    import joblib
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    joblib.dump({'pipeline': pipeline, 'feature_names': vibration_features.FEATURE_NAMES, **metadata}, path)
+
+def load_model(path=MODEL_PATH):
+    import joblib
+
+    bundle = joblib.load(path)
+    return bundle['pipeline'], bundle
+
+def predict_batch(pipeline, X, batch_size=PREDICT_BATCH):
+    """
+    以批次方式評分，回傳 (預測類別, 各類別機率 (樣本數, 類別數))。
+    """
+    X = _clean(X)
+    labels, probabilities = [], []
+    for start in range(0, len(X), batch_size):
+        batch = X[start:start + batch_size]
+        proba = pipeline.predict_proba(batch)
+        probabilities.append(proba)
+        labels.append(pipeline.classes_[proba.argmax(axis=1)])
+    if not labels:
+        return np.array([], dtype=object), np.empty((0, len(pipeline.classes_)))
+    return np.concatenate(labels), np.vstack(probabilities)
+
+def read_feature_csv(path):
+    """
+    讀取 streaming_features 輸出的 CSV，回傳 (識別欄位列表 [(window, start_s, channel)], 特徵矩陣)。
+    """
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    keys = list(df[['window', 'start_s', 'channel']].itertuples(index=False, name=None))
+    return keys, df[vibration_features.FEATURE_NAMES].to_numpy()
+
+# --- 子命令 ---
+def cmd_train(args):
+    X, y, groups = load_training_data(args.dataset_dir, args.windows)
+    print(f"訓練資料：{X.shape[0]} 列 ({len(np.unique(groups))} 個錄製檔)，類別 {sorted(set(y.tolist()))}")
+    if args.cv:
+        scores = cross_validate_model(X, y, groups, args.model, args.folds)
+        print(f"交叉驗證 ({len(scores['test_accuracy'])} 折)：accuracy {scores['test_accuracy'].mean():.3f}，"
+              f"F1 {scores['test_f1_macro'].mean():.3f}")
+    pipeline = train(X, y, args.model)
+    save_model(pipeline, args.output, model=args.model, windows=args.windows)
+    print(f"模型已保存到: {args.output}")
+
+def cmd_score(args):
+    pipeline, _ = load_model(args.model)
+    keys, X = read_feature_csv(args.features)
+    started = time.perf_counter()
+    labels, proba = predict_batch(pipeline, X)
+    elapsed = time.perf_counter() - started
+    out_path = args.output or os.path.splitext(args.features)[0] + '_scored.csv'
+    with open(out_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['window', 'start_s', 'channel', 'predicted'] + [f'p_{c}' for c in pipeline.classes_])
+        for key, label, p in zip(keys, labels, proba):
+            writer.writerow(list(key) + [label] + [f'{v:.4f}' for v in p])
+    print(f"已評分 {len(labels)} 列 ({len(labels) / elapsed if elapsed else 0:,.0f} 列/秒)，結果保存到: {out_path}")
+
+def cmd_benchmark(args):
+    started = time.perf_counter()
+    X, y, groups = load_training_data(args.dataset_dir, windows=True)
+    print(f"視窗特徵：{X.shape[0]} 列，耗時 {time.perf_counter() - started:.2f} 秒")
+    for model in args.models:
+        started = time.perf_counter()
+        scores = cross_validate_model(X, y, groups, model, args.folds)
+        cv_time = time.perf_counter() - started
+        pipeline = train(X, y, model)
+        test = np.tile(X, (max(1, args.predict_rows // len(X)), 1))
+        started = time.perf_counter()
+        predict_batch(pipeline, test)
+        rate = len(test) / (time.perf_counter() - started)
+        print(f"{model:<14} 交叉驗證 {cv_time:6.2f} 秒 (accuracy {scores['test_accuracy'].mean():.3f})，"
+              f"批次評分 {rate:,.0f} 列/秒")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="振動特徵分類模型")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('train', help='訓練並保存模型')
+    p.add_argument('--dataset-dir', default=dataset_builder.DATASET_DIR)
+    p.add_argument('--model', choices=MODELS, default=DEFAULT_MODEL)
+    p.add_argument('--windows', action='store_true', help='以視窗特徵訓練 (每個視窗一列)')
+    p.add_argument('--cv', action='store_true', help='先做交叉驗證')
+    p.add_argument('--folds', type=int, default=CV_FOLDS)
+    p.add_argument('-o', '--output', default=MODEL_PATH)
+    p.set_defaults(func=cmd_train)
+
+    p = sub.add_parser('score', help='為特徵 CSV 評分')
+    p.add_argument('--model', default=MODEL_PATH)
+    p.add_argument('--features', required=True, help='streaming_features 輸出的 CSV')
+    p.add_argument('-o', '--output')
+    p.set_defaults(func=cmd_score)
+
+    p = sub.add_parser('benchmark', help='比較各模型的交叉驗證時間與評分速度')
+    p.add_argument('--dataset-dir', default=dataset_builder.DATASET_DIR)
+    p.add_argument('--models', nargs='+', choices=MODELS, default=list(MODELS))
+    p.add_argument('--folds', type=int, default=CV_FOLDS)
+    p.add_argument('--predict-rows', type=int, default=100000)
+    p.set_defaults(func=cmd_benchmark)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
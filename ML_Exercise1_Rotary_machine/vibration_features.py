@@ -0,0 +1,155 @@
+import numpy as np
+
+# --- 旋轉機械振動特徵擷取 ---
+# 對應 ML_Exercise1_Rotary_machine_Step1_Data_Preprocessing.ipynb 的 Step 2：
+# 每個通道 (Acceleration1..N) 計算 10 個特徵：
+#   RMS、Mean、Kurtosis、StdDev、Skewness、1X~5X 特徵頻率範圍內的最大振幅。
+# 筆記本以 for count1_idx in range(len1) 逐通道做 np.fft.fft；這裡把所有通道放在同一個
+# 2-D 陣列中做一次 rfft，統計量也以陣列運算一次算完，結果與逐通道版本一致。
+# 用法：
+#   import vibration_features
+#   features = vibration_features.extract_features(Combined_Df_Healthy.values)  # (通道數, 10)
+
+# 主軸的運轉條件 (與筆記本相同)
+FS = 2560 # Sampling rate
+BASE_FREQ1 = 20 # 1X 特徵頻率 (rpm=1200)
+D_FREQ1 = 5 # 1X~4X 特徵頻率的範圍
+D_FREQ2 = 8 # 5X 特徵頻率的範圍
+HARMONICS = 5
+
+FEATURE_NAMES = [
+    'RMS', 'Mean', 'Kurtosis', 'StdDev', 'Skewness',
+    'Max_1X_Freq', 'Max_2X_Freq', 'Max_3X_Freq', 'Max_4X_Freq', 'Max_5X_Freq'
+]
+
+def band_bounds(n, fs=FS, base_freq=BASE_FREQ1, d_freq1=D_FREQ1, d_freq2=D_FREQ2):
+    """
+    計算 1X~5X 特徵頻率在單邊頻譜 (長度 n//2) 中的索引範圍 [(lower, upper), ...]。
+    與筆記本相同：lower 取 floor、upper 取 ceil，並限制在頻譜範圍內；5X 使用 d_freq2。
+    視窗很短 (或頻帶超過 Nyquist 頻率) 時，範圍至少保留一個頻率點，不會是空的。
+    """
+    dF = fs / n
+    n_half = n // 2
+    bounds = []
+    for k in range(1, HARMONICS + 1):
+        d_freq = d_freq2 if k == HARMONICS else d_freq1
+        lower = max(0, int(np.floor((base_freq * k - d_freq) / dF)))
+        upper = min(n_half, int(np.ceil((base_freq * k + d_freq) / dF)))
+        if n_half > 0 and upper <= lower:
+            lower = min(lower, n_half - 1)
+            upper = lower + 1
+        bounds.append((lower, upper))
+    return bounds
+
+def band_masks(n, fs=FS, base_freq=BASE_FREQ1, d_freq1=D_FREQ1, d_freq2=D_FREQ2):
+    """
+    以布林遮罩表示各特徵頻率範圍，形狀 (5, n//2)；方便檢視或與其他頻譜運算組合。
+    """
+    masks = np.zeros((HARMONICS, n // 2), dtype=bool)
+    for k, (lower, upper) in enumerate(band_bounds(n, fs, base_freq, d_freq1, d_freq2)):
+        masks[k, lower:upper] = True
+    return masks
+
+def _as_channels(data):
+    """
+    把 (資料點數, 通道數) 的輸入 (與 DataFrame.values 相同的排列) 轉成每列一個通道的連續陣列，
+    讓 FFT 與統計量都沿著連續記憶體計算。一維輸入視為單一通道。
+    """
+    data = np.asarray(data)
+    if not np.issubdtype(data.dtype, np.floating):
+        data = data.astype(np.float64)
+    if data.ndim == 1:
+        data = data[:, None]
+    return np.ascontiguousarray(data.T)
+
+def magnitude_spectrum(data):
+    """
+    一次計算所有通道的正規化單邊振幅譜 abs(fft[:n//2] * 2 / n)，回傳 (n//2, 通道數)。
+    實數訊號使用 rfft，只計算需要的一半頻譜。
+    """
+    channels = _as_channels(data)
+    n = channels.shape[1]
+    spectrum = np.abs(np.fft.rfft(channels, axis=1)[:, :n // 2])
+    spectrum *= 2 / n
+    return spectrum.T
+
+def band_maxima(spectrum, n, fs=FS, base_freq=BASE_FREQ1, d_freq1=D_FREQ1, d_freq2=D_FREQ2):
+    """
+    由振幅譜 (n//2, 通道數) 取得每個通道 1X~5X 範圍內的最大振幅，回傳 (通道數, 5)。
+    n 為原始訊號的資料點數 (決定頻率解析度 dF)。
+    """
+    bounds = band_bounds(n, fs, base_freq, d_freq1, d_freq2)
+    result = np.empty((spectrum.shape[1], HARMONICS), dtype=np.float64)
+    for k, (lower, upper) in enumerate(bounds):
+        result[:, k] = spectrum[lower:upper].max(axis=0)
+    return result
+
+def time_domain_features(data):
+    """
+    以陣列運算計算每個通道的 RMS、Mean、Kurtosis、StdDev、Skewness，回傳 (通道數, 5)。
+    Kurtosis 與 Skewness 與 scipy.stats 的預設值相同 (Fisher 定義、未做偏差修正)。
+    """
+    channels = _as_channels(data)
+    mean = channels.mean(axis=1, dtype=np.float64)
+    centered = channels - mean[:, None]
+    sq = centered * centered
+    m2 = sq.mean(axis=1, dtype=np.float64)
+    m3 = (sq * centered).mean(axis=1, dtype=np.float64)
+    m4 = (sq * sq).mean(axis=1, dtype=np.float64)
+    std = np.sqrt(m2)
+    rms = np.sqrt(m2 + mean * mean)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skew = m3 / m2 ** 1.5
+        kurtosis = m4 / (m2 * m2) - 3.0
+    return np.column_stack([rms, mean, kurtosis, std, skew])
+
+def extract_features(data, fs=FS, base_freq=BASE_FREQ1, d_freq1=D_FREQ1, d_freq2=D_FREQ2, return_spectrum=False):
+    """
+    計算所有通道的 10 個特徵，回傳 (通道數, 10) 的特徵矩陣，欄位順序同 FEATURE_NAMES。
+    return_spectrum 為 True 時一併回傳振幅譜 (n//2, 通道數)，可用於繪製頻域圖。
+    """
+    n = np.shape(data)[0]
+    spectrum = magnitude_spectrum(data)
+    features = np.hstack([
+        time_domain_features(data),
+        band_maxima(spectrum, n, fs, base_freq, d_freq1, d_freq2),
+    ])
+    if return_spectrum:
+        return features, spectrum
+    return features
+
+def frequency_axis(n, fs=FS):
+    """
+    振幅譜對應的頻率向量 (長度 n//2)。
+    """
+    return np.arange(n // 2) * (fs / n)
+
+def extract_features_loop(data, fs=FS, base_freq=BASE_FREQ1, d_freq1=D_FREQ1, d_freq2=D_FREQ2):
+    """
+    筆記本原本的逐通道寫法 (不含繪圖)，作為正確性與效能比較的基準。
+    """
+    import scipy.stats
+
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim == 1:
+        data = data[:, None]
+    n, len1 = data.shape
+    dF = fs / n
+    n_half = n // 2
+    Hamp = np.zeros((len1, 10))
+    Hfeat = np.zeros((n_half, len1))
+    for count1_idx in range(len1):
+        data_column = data[:, count1_idx]
+        fft_result = np.fft.fft(data_column)
+        Hfeat[:, count1_idx] = np.abs(fft_result[:n // 2] * 2 / n)
+        Hamp[count1_idx, 0] = np.sqrt(np.mean(data_column ** 2))
+        Hamp[count1_idx, 1] = np.mean(data_column)
+        Hamp[count1_idx, 2] = scipy.stats.kurtosis(data_column)
+        Hamp[count1_idx, 3] = np.std(data_column)
+        Hamp[count1_idx, 4] = scipy.stats.skew(data_column)
+        for k in range(1, HARMONICS + 1):
+            d_freq = d_freq2 if k == HARMONICS else d_freq1
+            lower = max(0, int(np.floor((base_freq * k - d_freq) / dF)))
+            upper = min(n_half, int(np.ceil((base_freq * k + d_freq) / dF)))
+            Hamp[count1_idx, 4 + k] = np.max(Hfeat[lower:upper, count1_idx])
+    return Hamp
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import statistics
+import time
+import urllib.parse
+
+# --- 策略 API 壓力測試 ---
+# 以多個 keep-alive 連線對本機的 strategy_api_server 持續送出 GET 請求，
+# 統計每秒請求數與延遲分佈。只使用標準函式庫。
+# 用法：
+#   python strategy_api_server.py --port 8080 &
+#   python api_load_test.py --port 8080 --connections 32 --duration 10 --etag
+
+# 請求行中保留 URL 的保留字元與已編碼的 %XX，其餘 (例如中文) 以 UTF-8 百分比編碼；
+# 伺服器以 latin-1 解碼請求行，未編碼的中文會變成亂碼查詢
+URL_SAFE_CHARS = "/?#[]@!$&'()*+,;=:%~"
+
+def quote_path(path):
+    return urllib.parse.quote(path, safe=URL_SAFE_CHARS)
+
+async def _request(reader, writer, host, path, etag=None):
+    headers = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+    if etag:
+        headers += f"If-None-Match: {etag}\r\n"
+    writer.write((headers + "\r\n").encode("utf-8"))
+    await writer.drain()
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    response_headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            response_headers[key.strip().lower()] = value.strip()
+    length = int(response_headers.get("content-length", 0))
+    if length:
+        await reader.readexactly(length)
+    return status, response_headers.get("etag")
+
+async def _worker(host, port, paths, deadline, use_etag, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            status, etag = await _request(reader, writer, host, path, etags.get(path) if use_etag else None)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            if etag:
+                etags[path] = etag
+    finally:
+        writer.close()
+
+async def run_load_test(host, port, paths, connections, duration, use_etag):
+    latencies = []
+    statuses = {}
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker(host, port, paths, deadline, use_etag, latencies, statuses) for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="策略 API 壓力測試")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=16, help="同時連線數")
+    parser.add_argument("--duration", type=float, default=10, help="測試秒數")
+    parser.add_argument("--etag", action="store_true", help="帶上 If-None-Match (測試 304 快取路徑)")
+    parser.add_argument("--path", action="append", help="要請求的路徑，可重複指定 (預設為列表與搜尋)")
+    args = parser.parse_args()
+
+    paths = [quote_path(path) for path in args.path] if args.path else [
+        "/strategies", "/strategies?limit=50", "/strategies/search?q=" + urllib.parse.quote("突破")]
+    latencies, statuses, elapsed = asyncio.run(run_load_test(args.host, args.port, paths, args.connections, args.duration, args.etag))
+    if not latencies:
+        print("沒有完成任何請求。")
+        return
+
+    latencies.sort()
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    print(f"請求數：{len(latencies)}，耗時 {elapsed:.1f} 秒，{len(latencies) / elapsed:.0f} 次/秒")
+    print(f"延遲 (ms)：平均 {statistics.mean(latencies) * 1000:.2f}，p50 {p(0.5):.2f}，p99 {p(0.99):.2f}，最大 {latencies[-1] * 1000:.2f}")
+    print("狀態碼：" + ", ".join(f"{k}: {v}" for k, v in sorted(statuses.items())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import json
+
+import numpy as np
+
+import indicator_cache
+
+# --- 回測引擎 ---
+# 價格以 (交易日 x 股票) 的 NumPy 矩陣表示，所有標的同時向量化計算，
+# 不在 Python 迴圈中逐日、逐檔處理。
+
+# 台股一次完整交易的成本：買賣手續費 0.1425% x 2 + 證交稅 0.3%
+DEFAULT_TRADE_COST = 0.001425 * 2 + 0.003
+
+# 單次 SQL IN (...) 查詢的最大參數數量，避免超過 SQLite 的變數上限
+SQL_CHUNK_SIZE = 500
+
+# --- 價格載入 ---
+def load_price_matrix(conn, stock_ids=None, start_date=None, end_date=None):
+    """
+    從 stock_prices 載入收盤價，回傳 (dates, stock_ids, close)：
+    close 為 float64 矩陣 (交易日 x 股票)，缺少報價的位置為 NaN。
+    stock_ids 為 None 時載入全部股票。
+    """
+    query = "SELECT stock_id, trade_date, close FROM stock_prices WHERE 1=1"
+    params = []
+    if start_date:
+        query += " AND trade_date >= ?"
+        params.append(start_date)
+    if end_date:
+        query += " AND trade_date <= ?"
+        params.append(end_date)
+
+    cursor = conn.cursor()
+    rows = []
+    if stock_ids is None:
+        cursor.execute(query, tuple(params))
+        rows = cursor.fetchall()
+    else:
+        stock_ids = list(stock_ids)
+        for i in range(0, len(stock_ids), SQL_CHUNK_SIZE):
+            chunk = stock_ids[i:i + SQL_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(query + f" AND stock_id IN ({placeholders})", tuple(params) + tuple(chunk))
+            rows.extend(cursor.fetchall())
+
+    if not rows:
+        return np.array([], dtype=object), np.array([], dtype=object), np.empty((0, 0))
+
+    ids, dates, closes = zip(*rows)
+    stock_index, ids_inverse = np.unique(np.array(ids, dtype=object), return_inverse=True)
+    date_index, dates_inverse = np.unique(np.array(dates, dtype=object), return_inverse=True)
+
+    close = np.full((len(date_index), len(stock_index)), np.nan)
+    close[dates_inverse, ids_inverse] = np.array(closes, dtype=np.float64)
+    return date_index, stock_index, close
+
+def load_indicator_matrix(conn, indicator, params, dates, stock_ids, refresh=True):
+    """
+    從 indicator_values 快取載入技術指標，排成與價格矩陣相同的 (交易日 x 股票) 矩陣，缺少的位置為 NaN。
+    refresh 為 True 時先把這些股票的快取增量更新到最新價格 (會 commit)。
+    快取以每檔股票完整的歷史計算，回測區間的第一天就有指標值，不必先累積 window 天。
+    """
+    stock_ids = list(stock_ids)
+    out = np.full((len(dates), len(stock_ids)), np.nan)
+    if not len(dates) or not stock_ids:
+        return out
+    if refresh:
+        indicator_cache.refresh_all(conn, stock_ids, {indicator: params})
+
+    row_of = {date: i for i, date in enumerate(dates)}
+    col_of = {stock_id: i for i, stock_id in enumerate(stock_ids)}
+    query = ("SELECT stock_id, trade_date, value FROM indicator_values "
+             "WHERE indicator = ? AND params_key = ? AND trade_date BETWEEN ? AND ?")
+    params = (indicator, indicator_cache.params_key(params), dates[0], dates[-1])
+    cursor = conn.cursor()
+    for i in range(0, len(stock_ids), SQL_CHUNK_SIZE):
+        chunk = stock_ids[i:i + SQL_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor.execute(query + f" AND stock_id IN ({placeholders})", params + tuple(chunk))
+        rows = [(row_of[date], col_of[stock_id], value) for stock_id, date, value in cursor.fetchall() if date in row_of]
+        if rows:
+            r, c, v = zip(*rows)
+            out[list(r), list(c)] = np.array(v, dtype=np.float64)
+    return out
+
+def forward_fill(values):
+    """
+    沿時間軸 (axis 0) 以前一個有效值填補 NaN (例如停牌日)。
+    """
+    mask = np.isnan(values)
+    idx = np.where(~mask, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return values[idx, np.arange(values.shape[1])]
+
+# --- 技術指標 ---
+def rolling_mean(values, window):
+    """
+    以累積和計算移動平均；視窗內含 NaN (例如尚未上市) 的位置為 NaN。
+    """
+    out = np.full(values.shape, np.nan)
+    if window > values.shape[0]:
+        return out
+    valid = ~np.isnan(values)
+    csum = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    count = np.cumsum(valid, axis=0)
+    window_sum = csum[window - 1:].copy()
+    window_sum[1:] -= csum[:-window]
+    window_count = count[window - 1:].copy()
+    window_count[1:] -= count[:-window]
+    out[window - 1:] = np.where(window_count == window, window_sum / window, np.nan)
+    return out
+
+def rolling_extreme(values, window, func):
+    """
+    計算前 window 日 (不含當日) 的滾動最大/最小值，func 為 np.max 或 np.min。
+    """
+    out = np.full(values.shape, np.nan)
+    if window >= values.shape[0]:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+    out[window:] = func(windows[:-1], axis=-1)
+    return out
+
+def hold_between(entries, exits):
+    """
+    將進場/出場事件轉成持倉矩陣：進場後持續持有直到出場事件 (向量化的狀態機)。
+    """
+    events = np.where(entries, 1, np.where(exits, 0, -1)).astype(np.int8)
+    has_event = events >= 0
+    idx = np.where(has_event, np.arange(events.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    state = events[idx, np.arange(events.shape[1])] # 第一個事件之前為 -1 (未持有)
+    return state == 1
+
+# --- 訊號規則 ---
+# 每個規則回傳布林持倉矩陣：position[t] 為 True 表示在第 t 日收盤持有，賺取 t 到 t+1 的報酬。
+
+def ma_cross_positions(close, short=5, long=20, short_ma=None, long_ma=None):
+    """
+    均線交叉：短均線在長均線之上時持有。
+    short_ma/long_ma 可傳入已計算的均線矩陣 (例如指標快取)，未提供時由 close 計算。
+    """
+    if short_ma is None:
+        short_ma = rolling_mean(close, int(short))
+    if long_ma is None:
+        long_ma = rolling_mean(close, int(long))
+    with np.errstate(invalid="ignore"):
+        return short_ma > long_ma
+
+def breakout_positions(close, lookback=20, exit_lookback=10):
+    """
+    通道突破：收盤價突破前 lookback 日高點時進場，跌破前 exit_lookback 日低點時出場。
+    """
+    upper = rolling_extreme(close, int(lookback), np.max)
+    lower = rolling_extreme(close, int(exit_lookback), np.min)
+    with np.errstate(invalid="ignore"):
+        return hold_between(close > upper, close < lower)
+
+RULES = {
+    "ma_cross": ma_cross_positions,
+    "breakout": breakout_positions,
+}
+
+def cached_inputs(rule_type, params=None):
+    """
+    回傳規則可改由指標快取提供的輸入 {規則參數名: (指標, 指標參數)}。
+    """
+    params = params or {}
+    if rule_type == "ma_cross":
+        return {
+            "short_ma": ("MA", {"window": int(params.get("short", 5))}),
+            "long_ma": ("MA", {"window": int(params.get("long", 20))}),
+        }
+    return {}
+
+# --- 績效計算 ---
+def trade_returns(close, positions, trade_cost=DEFAULT_TRADE_COST):
+    """
+    找出每筆交易的進出場位置並計算報酬率 (已扣交易成本)。
+    進出場只由 positions 決定；停牌日 (NaN) 不會結束持倉，價格以前一個有效收盤價計算，
+    因此停牌前後不會被拆成兩筆交易、重複扣交易成本。
+    回傳 (stock_col, trade_return)，皆為一維陣列，順序為依股票、再依時間。
+    """
+    n_days, n_stocks = close.shape
+    filled = forward_fill(close)
+    held = positions & ~np.isnan(filled) # 只排除尚未上市 (之前沒有任何報價) 的位置
+    padded = np.zeros((n_days + 2, n_stocks), dtype=np.int8)
+    padded[1:-1] = held
+    changes = np.diff(padded, axis=0).T # 轉置後 nonzero 會依股票排序
+
+    entry_col, entry_row = np.nonzero(changes == 1)
+    exit_col, exit_row = np.nonzero(changes == -1)
+    exit_row = np.minimum(exit_row, n_days - 1) # 持有到最後一天則以最後收盤價結算
+
+    returns = filled[exit_row, exit_col] / filled[entry_row, entry_col] - 1 - trade_cost
+    keep = exit_row > entry_row # 最後一天才進場的交易沒有報酬
+    return entry_col[keep], returns[keep]
+
+def backtest(close, rule_type, params=None, trade_cost=DEFAULT_TRADE_COST, inputs=None):
+    """
+    對價格矩陣執行單一規則的回測，回傳績效字典：
+    win_rate 為獲利交易比例 (0-1)，avg_profit_loss 為平均單筆報酬 (%)。
+    inputs 為已計算好的指標矩陣 (見 cached_inputs)，與 close 形狀相同。
+    """
+    if rule_type not in RULES:
+        raise ValueError(f"未知的回測規則：{rule_type}")
+    positions = RULES[rule_type](forward_fill(close), **(params or {}), **(inputs or {}))
+    _, returns = trade_returns(close, positions, trade_cost)
+    if returns.size == 0:
+        return {"trades": 0, "win_rate": None, "avg_profit_loss": None}
+    return {
+        "trades": int(returns.size),
+        "win_rate": float(np.mean(returns > 0)),
+        "avg_profit_loss": float(np.mean(returns) * 100),
+    }
+
+# --- 與資料庫整合 ---
+def load_strategy_rule(conn, strategy_id):
+    """
+    讀取策略的規則類型、參數與標的股票；尚未設定規則時回傳 None。
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT rule_type, params FROM strategy_rules WHERE strategy_id = ?", (strategy_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    cursor.execute("SELECT stock_id FROM strategy_targets WHERE strategy_id = ?", (strategy_id,))
+    targets = [r[0] for r in cursor.fetchall()] or None
+    return row[0], json.loads(row[1] or "{}"), targets
+
+def save_strategy_rule(conn, strategy_id, rule_type, params=None, targets=None):
+    """
+    設定 (或覆寫) 策略的回測規則與標的股票，不自動 commit。
+    """
+    if rule_type not in RULES:
+        raise ValueError(f"未知的回測規則：{rule_type}")
+    conn.execute(
+        "INSERT OR REPLACE INTO strategy_rules (strategy_id, rule_type, params) VALUES (?, ?, ?)",
+        (strategy_id, rule_type, json.dumps(params or {}))
+    )
+    conn.execute("DELETE FROM strategy_targets WHERE strategy_id = ?", (strategy_id,))
+    if targets:
+        conn.executemany(
+            "INSERT INTO strategy_targets (strategy_id, stock_id) VALUES (?, ?)",
+            [(strategy_id, stock_id) for stock_id in targets]
+        )
+
+def run_strategy_backtests(conn, strategy_ids=None, start_date=None, end_date=None, trade_cost=DEFAULT_TRADE_COST):
+    """
+    對有設定規則的策略執行回測，並將 win_rate 與 avg_profit_loss 寫回 strategies。
+    價格矩陣只載入一次，各策略再從中取出自己的標的欄位；
+    規則用到的技術指標 (例如均線) 從指標快取載入，相同指標與參數只載入一次。
+    回傳 {strategy_id: 績效字典}。
+    """
+    cursor = conn.cursor()
+    query = "SELECT strategy_id FROM strategy_rules"
+    if strategy_ids is not None:
+        strategy_ids = list(strategy_ids)
+        if not strategy_ids:
+            return {}
+        query += f" WHERE strategy_id IN ({', '.join('?' * len(strategy_ids))})"
+    cursor.execute(query, tuple(strategy_ids or ()))
+    rules = {sid: load_strategy_rule(conn, sid) for (sid,) in cursor.fetchall()}
+    if not rules:
+        return {}
+
+    dates, stock_index, close = load_price_matrix(conn, start_date=start_date, end_date=end_date)
+    column_of = {stock_id: i for i, stock_id in enumerate(stock_index)}
+
+    results = {}
+    loaded = {} # (指標, 參數鍵) -> 指標矩陣 (停牌日沿用前一日的值，與 close 的處理一致)
+    for strategy_id, (rule_type, params, targets) in rules.items():
+        if targets is None:
+            columns = slice(None)
+        else:
+            columns = [column_of[t] for t in targets if t in column_of]
+        inputs = {}
+        for name, (indicator, indicator_params) in cached_inputs(rule_type, params).items():
+            key = (indicator, indicator_cache.params_key(indicator_params))
+            if key not in loaded:
+                loaded[key] = forward_fill(load_indicator_matrix(conn, indicator, indicator_params, dates, stock_index))
+            inputs[name] = loaded[key][:, columns]
+        metrics = backtest(close[:, columns], rule_type, params, trade_cost, inputs)
+        results[strategy_id] = metrics
+        cursor.execute(
+            "UPDATE strategies SET win_rate = ?, avg_profit_loss = ? WHERE strategy_id = ?",
+            (metrics["win_rate"], metrics["avg_profit_loss"], strategy_id)
+        )
+    conn.commit()
+    return results
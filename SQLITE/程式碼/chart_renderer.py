@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import re
+
+import database_operations
+
+# --- 策略圖表的非互動式繪製 ---
+# 使用 matplotlib 的物件導向 API 與 Agg 畫布直接輸出 PNG/SVG，
+# 不需要視窗環境 (可在無螢幕的伺服器上執行)，也不會阻塞在 plt.show()。
+# 圖檔以該圖表本身所用資料的雜湊值命名，資料沒變時直接沿用已繪製的圖檔
+# (只改盈利率時，平均盈虧圖不需要重畫)。
+
+CHART_FOLDER = os.path.join(database_operations.db_folder, "charts")
+CHART_VERSION = 2 # 繪圖樣式改變時遞增，讓舊的快取圖檔失效
+HASH_LENGTH = 16 # 圖檔名稱中資料雜湊值的長度
+HISTOGRAM_BINS = database_operations.STATS_BUCKETS # 盈利率 0-1 的區間數
+
+BAR_QUERY = '''
+    SELECT name, win_rate, avg_profit_loss
+    FROM strategies
+    WHERE win_rate IS NOT NULL AND avg_profit_loss IS NOT NULL
+    ORDER BY strategy_id
+'''
+
+def fetch_chart_data(conn):
+    """
+    讀取繪圖所需資料：直方圖區間計數 (來自觸發器維護的彙總表) 與各策略的盈利率/平均盈虧。
+    """
+    cursor = conn.cursor()
+    cursor.execute(BAR_QUERY)
+    return {"histogram": database_operations.get_win_rate_histogram(conn), "bars": cursor.fetchall()}
+
+def _data_hash(chart_name, chart_data, fmt):
+    payload = json.dumps([CHART_VERSION, chart_name, fmt, chart_data], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+
+def _histogram_data(data):
+    return data["histogram"]
+
+def _win_rate_data(data):
+    return [(name, win_rate) for name, win_rate, _ in data["bars"]]
+
+def _profit_loss_data(data):
+    return [(name, avg_profit_loss) for name, _, avg_profit_loss in data["bars"]]
+
+def _set_category_labels(ax, names):
+    # 旋轉 45 度並靠右對齊，標籤的結尾對準長條
+    ax.set_xticks(range(len(names)), labels=names, rotation=45, ha="right")
+
+def _draw_histogram(ax, counts):
+    edges = [i / HISTOGRAM_BINS for i in range(HISTOGRAM_BINS + 1)]
+    ax.bar(edges[:-1], counts, width=1 / HISTOGRAM_BINS, align="edge", edgecolor="black", color="lightgreen", alpha=0.7)
+    ax.set_xlabel("回測盈利率 (0-1之間)")
+    ax.set_ylabel("策略數量")
+    ax.set_title("策略回測盈利率分佈直方圖")
+    ax.grid(axis="y", alpha=0.75)
+    ax.set_xticks(edges)
+
+def _draw_win_rates(ax, rows):
+    names = [name for name, _ in rows]
+    ax.bar(range(len(rows)), [win_rate for _, win_rate in rows], color="teal")
+    ax.set_xlabel("策略名稱")
+    ax.set_ylabel("回測盈利率")
+    ax.set_title("各策略回測盈利率")
+    _set_category_labels(ax, names)
+
+def _draw_profit_loss(ax, rows):
+    names = [name for name, _ in rows]
+    values = [value for _, value in rows]
+    ax.bar(range(len(rows)), values, color=["green" if v >= 0 else "red" for v in values])
+    ax.set_xlabel("策略名稱")
+    ax.set_ylabel("平均單筆盈虧 (%)")
+    ax.set_title("各策略平均單筆盈虧")
+    _set_category_labels(ax, names)
+    ax.axhline(0, color="grey", linestyle="--", linewidth=0.8)
+
+# 圖表名稱 -> (取出該圖表所需資料的函式, 繪圖函式, 圖片尺寸)
+CHARTS = {
+    "win_rate_histogram": (_histogram_data, _draw_histogram, (10, 6)),
+    "win_rate_by_strategy": (_win_rate_data, _draw_win_rates, (12, 7)),
+    "profit_loss_by_strategy": (_profit_loss_data, _draw_profit_loss, (12, 7)),
+}
+
+def render_charts(conn, output_dir=CHART_FOLDER, fmt="png"):
+    """
+    繪製所有策略圖表並寫入 output_dir，回傳 [(圖表名稱, 檔案路徑, 是否使用快取)]。
+    沒有可繪製的資料時回傳空列表。
+    """
+    data = fetch_chart_data(conn)
+    if not data["bars"]:
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    for chart_name, (select, draw, figsize) in CHARTS.items():
+        chart_data = select(data)
+        path = os.path.join(output_dir, f"{chart_name}_{_data_hash(chart_name, chart_data, fmt)}.{fmt}")
+        if os.path.exists(path):
+            results.append((chart_name, path, True))
+            continue
+
+        # 需要繪圖時才載入 matplotlib；Figure 物件不經過 pyplot，不影響全域後端設定
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=figsize)
+        draw(fig.subplots(), chart_data)
+        fig.tight_layout()
+        fig.savefig(path, format=fmt)
+
+        # 清除同一張圖表、同一種格式的舊快取檔 (另一種格式的快取保留，切換 png/svg 時不必重畫)
+        stale = re.compile(re.escape(chart_name) + f"_[0-9a-f]{{{HASH_LENGTH}}}" + re.escape("." + fmt))
+        for old_file in os.listdir(output_dir):
+            if stale.fullmatch(old_file) and os.path.join(output_dir, old_file) != path:
+                os.remove(os.path.join(output_dir, old_file))
+        results.append((chart_name, path, False))
+    return results
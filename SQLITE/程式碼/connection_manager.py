@@ -0,0 +1,98 @@
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import database_operations
+
+# --- 資料庫連線管理 ---
+# 單一寫入連線 + 少量唯讀連線池：
+# 所有寫入經由同一條連線並以鎖序列化 (SQLite 同時只允許一個寫入者)，
+# 報表、查詢與回測則從唯讀連線池取得連線；在 WAL 模式下讀取不會被寫入阻塞。
+
+DEFAULT_POOL_SIZE = 4
+POOL_TIMEOUT = 30 # 等待可用唯讀連線的秒數
+
+class ConnectionManager:
+    """
+    管理策略資料庫的寫入連線與唯讀連線池，可在多執行緒中共用。
+
+    用法：
+        manager = ConnectionManager()
+        with manager.read() as conn:
+            conn.execute("SELECT ...")
+        with manager.write() as conn:
+            conn.execute("INSERT ...") # 離開區塊時自動 commit，發生例外則 rollback
+        manager.close()
+    """
+
+    def __init__(self, db_path=None, pool_size=DEFAULT_POOL_SIZE):
+        self.db_path = db_path or database_operations.DB_PATH
+        # 寫入連線負責建立資料表並開啟 WAL，之後才建立唯讀連線
+        self.writer = database_operations.initialize_database(self.db_path, check_same_thread=False)
+        if self.writer is None:
+            raise sqlite3.OperationalError(f"無法開啟資料庫：{self.db_path}")
+        self._write_lock = threading.RLock()
+        self._readers = queue.Queue()
+        self._all_readers = []
+        try:
+            for _ in range(pool_size):
+                conn = self._open_reader()
+                self._all_readers.append(conn)
+                self._readers.put(conn)
+        except Exception:
+            # 唯讀連線開啟失敗時關閉已開啟的連線，不留下未關閉的寫入連線
+            for conn in self._all_readers:
+                conn.close()
+            self.writer.close()
+            raise
+
+    def _open_reader(self):
+        # as_uri() 會對路徑中的 ?、#、% 等字元做百分比編碼，避免被當成 URI 參數而開錯檔案
+        uri = pathlib.Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        database_operations.configure_connection(conn, readonly=True)
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def read(self, timeout=POOL_TIMEOUT):
+        """
+        從連線池借出一條唯讀連線，離開區塊時歸還。
+        """
+        try:
+            conn = self._readers.get(timeout=timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("等待唯讀連線逾時，連線池已滿。") from None
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback() # 結束讀取交易，讓 WAL 檢查點可以推進
+            self._readers.put(conn)
+
+    @contextmanager
+    def write(self):
+        """
+        取得寫入連線 (同一時間只有一個執行緒可寫入)，
+        區塊正常結束時 commit，發生例外時 rollback。
+        """
+        with self._write_lock:
+            try:
+                yield self.writer
+                self.writer.commit()
+            except Exception:
+                self.writer.rollback()
+                raise
+
+    def close(self):
+        """
+        關閉寫入連線與所有唯讀連線。
+        """
+        for conn in self._all_readers:
+            conn.close()
+        self._all_readers = []
+        with self._write_lock:
+            self.writer.close()
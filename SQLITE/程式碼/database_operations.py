@@ -7,24 +7,357 @@ db_folder = os.path.join(desktop_path, "python", "SQLITE")
 db_name = "stock_strategy.db"
 DB_PATH = os.path.join(db_folder, db_name) # 將路徑設為全域常數，方便其他模組使用
 
-# 確保資料庫資料夾存在
-if not os.path.exists(db_folder):
-    os.makedirs(db_folder)
-    print(f"資料夾 '{db_folder}' 已創建。")
+# 確保資料庫資料夾存在 (由 initialize_database 呼叫，匯入模組時不建立任何資料夾)
+def ensure_db_folder():
+    if not os.path.exists(db_folder):
+        os.makedirs(db_folder)
+        print(f"資料夾 '{db_folder}' 已創建。")
+
+# --- 策略搜尋用索引與全文檢索 (FTS5) ---
+# 全文檢索表名稱；若 SQLite 未編譯 FTS5，查詢端會退回 LIKE 搜尋
+FTS_TABLE = "strategies_fts"
+
+def create_search_schema(cursor):
+    """
+    建立策略搜尋所需的索引、FTS5 全文檢索表與同步觸發器。
+    回傳 True 表示 FTS5 可用，False 表示只建立了一般索引。
+    """
+    # (status, created_date) 索引：狀態篩選 + 依日期排序的分頁查詢 (附帶 name 讓排序完全走索引)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_strategies_status_date ON strategies (status, created_date DESC, name ASC)")
+    # 不篩選狀態時的列表排序 (created_date DESC, name ASC) 也能直接走索引
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_strategies_date_name ON strategies (created_date DESC, name ASC)")
+
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,))
+    fts_exists = cursor.fetchone() is not None
+    try:
+        # trigram 分詞器可處理中文子字串搜尋 (不需要空白斷詞)
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                name, description,
+                content='strategies', content_rowid='strategy_id',
+                tokenize='trigram'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        print(f"全文檢索 (FTS5) 無法使用，將改用一般搜尋：{e}")
+        return False
+
+    # 觸發器：strategies 新增/刪除/修改時同步更新全文檢索表
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS strategies_fts_ai AFTER INSERT ON strategies BEGIN
+            INSERT INTO {FTS_TABLE} (rowid, name, description)
+            VALUES (new.strategy_id, new.name, new.description);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS strategies_fts_ad AFTER DELETE ON strategies BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.strategy_id, old.name, old.description);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS strategies_fts_au AFTER UPDATE OF name, description ON strategies BEGIN
+            INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.strategy_id, old.name, old.description);
+            INSERT INTO {FTS_TABLE} (rowid, name, description)
+            VALUES (new.strategy_id, new.name, new.description);
+        END
+    ''')
+
+    if not fts_exists:
+        # 第一次建立時，把既有的策略資料匯入全文檢索表
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+        print(f"全文檢索表 '{FTS_TABLE}' 已建立並完成索引。")
+    return True
+
+def has_fts(conn):
+    """
+    檢查資料庫中是否存在策略全文檢索表。
+    """
+    cursor = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,))
+    return cursor.fetchone() is not None
+
+# --- 股價與回測規則資料表 ---
+def create_backtest_schema(cursor):
+    """
+    建立回測所需的資料表：
+    stock_prices 存放日線價格，stock_bars_1m 存放 1 分鐘 K 棒；strategy_rules 記錄策略的訊號規則與參數 (JSON)；
+    strategy_targets 記錄策略的標的股票 (未設定時回測全部股票)；
+    strategy_runs 記錄參數掃描中每一次回測的參數與績效；stocks 為上市櫃股票清單 (代碼、簡稱、產業)。
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stocks (
+            stock_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            market TEXT,
+            industry TEXT
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_prices (
+            stock_id TEXT NOT NULL,
+            trade_date TEXT NOT NULL,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL NOT NULL,
+            volume INTEGER,
+            PRIMARY KEY (stock_id, trade_date)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stock_prices_date ON stock_prices (trade_date)")
+    # 1 分鐘 K 棒 (由即時報價彙整而來，bar_time 格式為 YYYY-MM-DD HH:MM)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stock_bars_1m (
+            stock_id TEXT NOT NULL,
+            bar_time TEXT NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (stock_id, bar_time)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS strategy_rules (
+            strategy_id INTEGER PRIMARY KEY REFERENCES strategies (strategy_id) ON DELETE CASCADE,
+            rule_type TEXT NOT NULL,
+            params TEXT NOT NULL DEFAULT '{}'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS strategy_targets (
+            strategy_id INTEGER NOT NULL REFERENCES strategies (strategy_id) ON DELETE CASCADE,
+            stock_id TEXT NOT NULL,
+            PRIMARY KEY (strategy_id, stock_id)
+        )
+    ''')
+    # 參數掃描的每一次回測紀錄
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS strategy_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            strategy_id INTEGER REFERENCES strategies (strategy_id) ON DELETE CASCADE,
+            sweep_id TEXT NOT NULL,
+            rule_type TEXT NOT NULL,
+            params TEXT NOT NULL,
+            trades INTEGER,
+            win_rate REAL,
+            avg_profit_loss REAL,
+            run_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_strategy_runs_strategy ON strategy_runs (strategy_id, sweep_id)")
+
+# --- 技術指標快取 ---
+def create_indicator_schema(cursor):
+    """
+    建立技術指標快取表 indicator_values：以 (股票, 指標, 參數, 日期) 為鍵，
+    aux1/aux2 保存遞迴指標 (RSI、ATR) 接續計算所需的狀態。
+    並建立 stock_prices 的觸發器：價格新增、修正或刪除時，
+    清除該股票自該日期起的快取，下次更新時從前一筆快取接續重算。
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS indicator_values (
+            stock_id TEXT NOT NULL,
+            indicator TEXT NOT NULL,
+            params_key TEXT NOT NULL,
+            trade_date TEXT NOT NULL,
+            value REAL,
+            aux1 REAL,
+            aux2 REAL,
+            PRIMARY KEY (stock_id, indicator, params_key, trade_date)
+        ) WITHOUT ROWID
+    ''')
+    # 觸發器依 (stock_id, trade_date) 刪除，需要對應的索引才不會掃描整檔股票的快取
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_indicator_values_stock_date ON indicator_values (stock_id, trade_date)")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS stock_prices_invalidate_ai AFTER INSERT ON stock_prices BEGIN
+            DELETE FROM indicator_values WHERE stock_id = new.stock_id AND trade_date >= new.trade_date;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS stock_prices_invalidate_au AFTER UPDATE ON stock_prices BEGIN
+            DELETE FROM indicator_values WHERE stock_id = old.stock_id AND trade_date >= MIN(old.trade_date, new.trade_date);
+            DELETE FROM indicator_values WHERE stock_id = new.stock_id AND trade_date >= MIN(old.trade_date, new.trade_date);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS stock_prices_invalidate_ad AFTER DELETE ON stock_prices BEGIN
+            DELETE FROM indicator_values WHERE stock_id = old.stock_id AND trade_date >= old.trade_date;
+        END
+    ''')
+
+# --- 策略統計彙總表 ---
+STATS_BUCKETS = 10 # 盈利率直方圖的區間數 (0-1 等分)
+# 盈利率所屬的直方圖區間；沒有盈利率的策略歸在 -1
+_BUCKET_SQL = f"CASE WHEN {{row}}.win_rate IS NULL THEN -1 ELSE MAX(0, MIN(CAST({{row}}.win_rate * {STATS_BUCKETS} AS INTEGER), {STATS_BUCKETS - 1})) END"
+
+def _stats_delta_sql(row, sign):
+    """
+    產生「把一筆策略加入/移出彙總表」的 UPSERT 語句，row 為 new 或 old，sign 為 +1 或 -1。
+    """
+    bucket = _BUCKET_SQL.format(row=row)
+    charted = f"({row}.win_rate IS NOT NULL AND {row}.avg_profit_loss IS NOT NULL)"
+    return f'''
+        INSERT INTO strategy_stats (status, bucket, strategy_count, charted_count, win_rate_sum, profit_loss_sum, profit_loss_count)
+        VALUES ({row}.status, {bucket}, {sign}, {sign} * {charted}, {sign} * COALESCE({row}.win_rate, 0),
+                {sign} * COALESCE({row}.avg_profit_loss, 0), {sign} * ({row}.avg_profit_loss IS NOT NULL))
+        ON CONFLICT (status, bucket) DO UPDATE SET
+            strategy_count = strategy_count + excluded.strategy_count,
+            charted_count = charted_count + excluded.charted_count,
+            win_rate_sum = win_rate_sum + excluded.win_rate_sum,
+            profit_loss_sum = profit_loss_sum + excluded.profit_loss_sum,
+            profit_loss_count = profit_loss_count + excluded.profit_loss_count;
+    '''
+
+def create_stats_schema(cursor):
+    """
+    建立策略統計彙總表 strategy_stats：依 (狀態, 盈利率區間) 累計策略數量與總和，
+    由 strategies 的新增/修改/刪除觸發器即時維護。
+    摘要畫面與圖表只需讀取數十筆彙總資料，不必掃描整個 strategies。
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'strategy_stats'")
+    stats_exists = cursor.fetchone() is not None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS strategy_stats (
+            status TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            strategy_count INTEGER NOT NULL DEFAULT 0,
+            charted_count INTEGER NOT NULL DEFAULT 0,
+            win_rate_sum REAL NOT NULL DEFAULT 0,
+            profit_loss_sum REAL NOT NULL DEFAULT 0,
+            profit_loss_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (status, bucket)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS strategies_stats_ai AFTER INSERT ON strategies BEGIN {_stats_delta_sql('new', 1)} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS strategies_stats_ad AFTER DELETE ON strategies BEGIN {_stats_delta_sql('old', -1)} END")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS strategies_stats_au AFTER UPDATE OF status, win_rate, avg_profit_loss ON strategies BEGIN
+            {_stats_delta_sql('old', -1)}
+            {_stats_delta_sql('new', 1)}
+        END
+    ''')
+
+    if not stats_exists:
+        # 第一次建立時，從既有策略計算初始彙總值
+        cursor.execute(f'''
+            INSERT INTO strategy_stats (status, bucket, strategy_count, charted_count, win_rate_sum, profit_loss_sum, profit_loss_count)
+            SELECT status, {_BUCKET_SQL.format(row="s")} AS bucket, COUNT(*),
+                   SUM(s.win_rate IS NOT NULL AND s.avg_profit_loss IS NOT NULL),
+                   COALESCE(SUM(s.win_rate), 0), COALESCE(SUM(s.avg_profit_loss), 0), COUNT(s.avg_profit_loss)
+            FROM strategies AS s
+            GROUP BY status, bucket
+        ''')
+
+def get_strategy_summary(conn):
+    """
+    從彙總表讀取各狀態的策略數量、平均盈利率與平均單筆盈虧，
+    回傳 [(狀態, 數量, 平均盈利率或 None, 平均盈虧或 None)]。
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT status, SUM(strategy_count),
+               SUM(CASE WHEN bucket >= 0 THEN win_rate_sum END) / NULLIF(SUM(CASE WHEN bucket >= 0 THEN strategy_count END), 0),
+               SUM(profit_loss_sum) / NULLIF(SUM(profit_loss_count), 0)
+        FROM strategy_stats
+        GROUP BY status
+        HAVING SUM(strategy_count) > 0
+        ORDER BY status
+    ''')
+    return cursor.fetchall()
+
+def get_win_rate_histogram(conn):
+    """
+    從彙總表讀取盈利率直方圖 (只計入同時有盈利率與平均盈虧的策略)，回傳長度為 STATS_BUCKETS 的列表。
+    """
+    counts = [0] * STATS_BUCKETS
+    cursor = conn.cursor()
+    cursor.execute("SELECT bucket, SUM(charted_count) FROM strategy_stats WHERE bucket >= 0 GROUP BY bucket")
+    for bucket, count in cursor.fetchall():
+        counts[bucket] = count
+    return counts
+
+# --- 資料版本 ---
+def create_version_schema(cursor):
+    """
+    建立資料版本表 data_versions：strategies 每次新增/修改/刪除時由觸發器把版本號加 1；
+    stock_list 在 stocks 異動、或 stock_prices 出現新的股票代碼時加 1 (個股代碼索引據此重建)。
+    版本號存在資料庫中，所有連線讀到的值一致，不受 WAL 檢查點或檔案修改時間精度影響，
+    可用來判斷快取的查詢結果是否仍有效。
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('strategies', 0), ('stock_list', 0)")
+    for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS strategies_version_{suffix} AFTER {event} ON strategies BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = 'strategies';
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS stocks_version_{suffix} AFTER {event} ON stocks BEGIN
+                UPDATE data_versions SET version = version + 1 WHERE name = 'stock_list';
+            END
+        ''')
+    # 只有該代碼的第一筆價格才加 1 (UPSERT 更新既有的日 K 棒不會觸發 INSERT 觸發器)
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS stock_prices_version_ai AFTER INSERT ON stock_prices
+        WHEN NOT EXISTS (SELECT 1 FROM stock_prices WHERE stock_id = new.stock_id AND trade_date <> new.trade_date) BEGIN
+            UPDATE data_versions SET version = version + 1 WHERE name = 'stock_list';
+        END
+    ''')
+
+def get_data_version(conn, name="strategies"):
+    """
+    讀取資料版本號；沒有對應的列時回傳 None。
+    """
+    row = conn.execute("SELECT version FROM data_versions WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+# --- 連線效能設定 ---
+MMAP_SIZE = 256 * 1024 * 1024 # 以記憶體映射讀取資料庫檔案 (256 MB)
+CACHE_SIZE_KB = 64 * 1024 # 每個連線的頁面快取 (64 MB)
+BUSY_TIMEOUT_MS = 5000 # 遇到寫入鎖時最多等待 5 秒
+
+def configure_connection(conn, readonly=False):
+    """
+    套用連線層級的 PRAGMA 設定。
+    WAL 模式讓讀取與寫入可以同時進行 (讀取不會被寫入阻塞)，
+    搭配 synchronous=NORMAL 減少每次 commit 的 fsync。
+    """
+    if not readonly:
+        conn.execute("PRAGMA journal_mode=WAL") # WAL 設定會保存在資料庫檔案中
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
 
 # --- SQLite 資料庫初始化函式 ---
-def initialize_database():
+def initialize_database(db_path=None, check_same_thread=True):
     """
     初始化資料庫，如果資料庫檔案不存在則創建，並建立台股策略資料表。
+    db_path 預設為 DB_PATH；連線會套用 WAL 等效能設定 (見 configure_connection)。
     """
     conn = None
+    db_path = db_path or DB_PATH
     try:
-        conn = sqlite3.connect(DB_PATH)
+        if db_path == DB_PATH:
+            ensure_db_folder()
+        conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+        configure_connection(conn)
         cursor = conn.cursor()
 
-        print(f"成功連線到資料庫：{DB_PATH}")
+        print(f"成功連線到資料庫：{db_path}")
 
         # 建立台股策略資料表
+        # win_rate 為盈利交易比例 (0-1)；avg_profit_loss 為平均單筆報酬 (%)，回測引擎也以此單位寫回
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS strategies (
                 strategy_id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -36,6 +369,11 @@ def initialize_database():
                 avg_profit_loss REAL
             )
         ''')
+        create_search_schema(cursor)
+        create_backtest_schema(cursor)
+        create_indicator_schema(cursor)
+        create_stats_schema(cursor)
+        create_version_schema(cursor)
         conn.commit()
         print("資料表 'strategies' 已成功建立或已存在。")
         return conn
@@ -0,0 +1,198 @@
+import json
+from collections import deque
+
+# --- 技術指標增量快取 ---
+# 指標值存放在 indicator_values，每次更新只讀取快取最後一天之後的新 K 棒，
+# 從快取中保存的狀態接續計算，成本為 O(新 K 棒數) 而非 O(全部歷史)。
+# 價格被修正時，stock_prices 的觸發器會刪除受影響日期之後的快取 (見 database_operations)。
+
+# 支援的指標與預設參數
+DEFAULT_PARAMS = {
+    "MA": {"window": 20},
+    "RSI": {"period": 14},
+    "ATR": {"period": 14},
+}
+
+def params_key(params):
+    """
+    將參數字典轉成固定格式的字串鍵 (鍵值排序)。
+    """
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+def _last_cached(cursor, stock_id, indicator, key):
+    cursor.execute(
+        "SELECT trade_date, value, aux1, aux2 FROM indicator_values WHERE stock_id = ? AND indicator = ? AND params_key = ? ORDER BY trade_date DESC LIMIT 1",
+        (stock_id, indicator, key)
+    )
+    return cursor.fetchone()
+
+def _new_bars(cursor, stock_id, after_date, columns="trade_date, close"):
+    if after_date is None:
+        cursor.execute(f"SELECT {columns} FROM stock_prices WHERE stock_id = ? ORDER BY trade_date", (stock_id,))
+    else:
+        cursor.execute(f"SELECT {columns} FROM stock_prices WHERE stock_id = ? AND trade_date > ? ORDER BY trade_date", (stock_id, after_date))
+    return cursor.fetchall()
+
+# --- 各指標的增量計算 ---
+# 每個函式回傳要寫入的 (trade_date, value, aux1, aux2) 列表。
+
+def _update_ma(cursor, stock_id, last, window):
+    """
+    簡單移動平均：只需要最後 window-1 筆收盤價作為接續的起點。
+    """
+    last_date = last[0] if last else None
+    history = []
+    if last_date is not None and window > 1:
+        cursor.execute(
+            "SELECT close FROM stock_prices WHERE stock_id = ? AND trade_date <= ? ORDER BY trade_date DESC LIMIT ?",
+            (stock_id, last_date, window - 1)
+        )
+        history = [r[0] for r in reversed(cursor.fetchall())]
+
+    closes = deque(history, maxlen=window)
+    running = sum(closes)
+    rows = []
+    for trade_date, close in _new_bars(cursor, stock_id, last_date):
+        if len(closes) == window:
+            running -= closes[0]
+        closes.append(close)
+        running += close
+        if len(closes) == window:
+            rows.append((trade_date, running / window, None, None))
+    return rows
+
+def _update_rsi(cursor, stock_id, last, period):
+    """
+    Wilder RSI：aux1/aux2 保存平均漲幅與平均跌幅，接續時再取前一日收盤價即可。
+    """
+    rows = []
+    if last is not None:
+        last_date, _, avg_gain, avg_loss = last
+        cursor.execute("SELECT close FROM stock_prices WHERE stock_id = ? AND trade_date = ?", (stock_id, last_date))
+        prev_row = cursor.fetchone()
+        if prev_row is None:
+            return rows
+        prev_close = prev_row[0]
+        bars = _new_bars(cursor, stock_id, last_date)
+    else:
+        # 沒有快取：前 period 個變動以簡單平均初始化
+        bars = _new_bars(cursor, stock_id, None)
+        if len(bars) <= period:
+            return rows
+        gains = losses = 0.0
+        for (_, prev), (_, close) in zip(bars[:period], bars[1:period + 1]):
+            change = close - prev
+            gains += max(change, 0.0)
+            losses += max(-change, 0.0)
+        avg_gain, avg_loss = gains / period, losses / period
+        rows.append((bars[period][0], _rsi(avg_gain, avg_loss), avg_gain, avg_loss))
+        prev_close = bars[period][1]
+        bars = bars[period + 1:]
+
+    for trade_date, close in bars:
+        change = close - prev_close
+        avg_gain = (avg_gain * (period - 1) + max(change, 0.0)) / period
+        avg_loss = (avg_loss * (period - 1) + max(-change, 0.0)) / period
+        rows.append((trade_date, _rsi(avg_gain, avg_loss), avg_gain, avg_loss))
+        prev_close = close
+    return rows
+
+def _rsi(avg_gain, avg_loss):
+    if avg_loss == 0:
+        return 100.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+def _update_atr(cursor, stock_id, last, period):
+    """
+    Wilder ATR：value 即上一日 ATR，aux1 保存前一日收盤價。
+    缺少最高/最低價時以收盤價代替。
+    """
+    columns = "trade_date, COALESCE(high, close), COALESCE(low, close), close"
+    rows = []
+    if last is not None:
+        last_date, atr, prev_close, _ = last
+        bars = _new_bars(cursor, stock_id, last_date, columns)
+    else:
+        bars = _new_bars(cursor, stock_id, None, columns)
+        if len(bars) <= period:
+            return rows
+        true_ranges = [
+            max(high - low, abs(high - prev[3]), abs(low - prev[3]))
+            for prev, (_, high, low, _) in zip(bars[:period], bars[1:period + 1])
+        ]
+        atr = sum(true_ranges) / period
+        rows.append((bars[period][0], atr, bars[period][3], None))
+        prev_close = bars[period][3]
+        bars = bars[period + 1:]
+
+    for trade_date, high, low, close in bars:
+        true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        atr = (atr * (period - 1) + true_range) / period
+        rows.append((trade_date, atr, close, None))
+        prev_close = close
+    return rows
+
+_UPDATERS = {
+    "MA": lambda cursor, stock_id, last, p: _update_ma(cursor, stock_id, last, int(p["window"])),
+    "RSI": lambda cursor, stock_id, last, p: _update_rsi(cursor, stock_id, last, int(p["period"])),
+    "ATR": lambda cursor, stock_id, last, p: _update_atr(cursor, stock_id, last, int(p["period"])),
+}
+
+# --- 對外介面 ---
+def refresh_indicator(conn, stock_id, indicator, params=None):
+    """
+    將單一股票、單一指標的快取更新到最新價格，不自動 commit。
+    回傳新寫入的筆數。
+    """
+    if indicator not in _UPDATERS:
+        raise ValueError(f"未知的技術指標：{indicator}")
+    params = params or DEFAULT_PARAMS[indicator]
+    key = params_key(params)
+    cursor = conn.cursor()
+    last = _last_cached(cursor, stock_id, indicator, key)
+    rows = _UPDATERS[indicator](cursor, stock_id, last, params)
+    cursor.executemany(
+        "INSERT OR REPLACE INTO indicator_values (stock_id, indicator, params_key, trade_date, value, aux1, aux2) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(stock_id, indicator, key) + row for row in rows]
+    )
+    return len(rows)
+
+def refresh_all(conn, stock_ids=None, indicators=None):
+    """
+    更新多檔股票、多個指標的快取 (預設為全部股票與全部預設指標)，
+    在單一交易中完成。indicators 為 {指標: 參數} 字典。
+    回傳新寫入的總筆數。
+    """
+    indicators = indicators or DEFAULT_PARAMS
+    cursor = conn.cursor()
+    if stock_ids is None:
+        cursor.execute("SELECT DISTINCT stock_id FROM stock_prices")
+        stock_ids = [r[0] for r in cursor.fetchall()]
+
+    written = 0
+    with conn:
+        for stock_id in stock_ids:
+            for indicator, params in indicators.items():
+                written += refresh_indicator(conn, stock_id, indicator, params)
+    return written
+
+def get_indicator(conn, stock_id, indicator, params=None, start_date=None, end_date=None, refresh=True):
+    """
+    取得指標序列 [(trade_date, value), ...]；refresh 為 True 時會先做增量更新。
+    """
+    params = params or DEFAULT_PARAMS[indicator]
+    if refresh:
+        with conn:
+            refresh_indicator(conn, stock_id, indicator, params)
+    query = "SELECT trade_date, value FROM indicator_values WHERE stock_id = ? AND indicator = ? AND params_key = ?"
+    query_params = [stock_id, indicator, params_key(params)]
+    if start_date:
+        query += " AND trade_date >= ?"
+        query_params.append(start_date)
+    if end_date:
+        query += " AND trade_date <= ?"
+        query_params.append(end_date)
+    query += " ORDER BY trade_date"
+    cursor = conn.cursor()
+    cursor.execute(query, tuple(query_params))
+    return cursor.fetchall()
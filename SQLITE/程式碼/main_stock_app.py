@@ -2,13 +2,12 @@ import os
 import sys
 
 # 為了確保能找到自定義模組，將當前目錄添加到 Python 路徑
-# 這是確保 import database_operations 和 import strategy_functions 能成功的關鍵
-current_dir = os.path.dirname(__file__)
-if current_dir not in sys.path:
-    sys.path.append(current_dir)
-
-import database_operations # 匯入資料庫操作模組
-import strategy_functions # 匯入策略功能模組
+# 這是確保 import database_operations 和 import strategy_functions 能成功的關鍵；
+# 在 main() 啟動時才執行，匯入本模組不會修改 sys.path
+def setup_module_path():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    if current_dir not in sys.path:
+        sys.path.append(current_dir)
 
 # --- BBS 風格相關定義 (保留主程式必要的顏色和邊界字符) ---
 COLOR_RESET = "\033[0m"
@@ -39,13 +38,34 @@ def print_bbs_box(title, content_lines, width=60, title_color=COLOR_YELLOW, cont
 
 # --- 主程式 ---
 def main():
-    # 嘗試初始化資料庫並獲取連線物件
-    conn = database_operations.initialize_database()
-    if conn is None:
+    # 自定義模組在這裡才匯入；pandas、numpy、matplotlib 等較重的套件
+    # 只在使用到的功能 (圖表、回測) 中載入，選單可以立即出現
+    setup_module_path()
+    import connection_manager # 匯入資料庫連線管理模組
+    import strategy_functions # 匯入策略功能模組
+
+    # 嘗試初始化資料庫並建立連線管理 (一條寫入連線 + 唯讀連線池)
+    try:
+        manager = connection_manager.ConnectionManager()
+    except Exception as e:
         # 如果資料庫連線失敗，則在終端機中列印錯誤訊息並終止程式
+        print(f"{COLOR_RED}資料庫錯誤：{e}{COLOR_RESET}")
         print(f"{COLOR_WHITE_BG_RED_TEXT}{COLOR_BOLD}!!! 程式啟動失敗，請檢查上述資料庫錯誤訊息 !!!{COLOR_RESET}")
         return # 終止 main 函式執行
 
+    # 只讀取資料的功能使用唯讀連線池；新增策略、個股查詢 (會更新技術指標快取) 與回測 (會寫回結果) 使用寫入連線
+    read_actions = {
+        "1": strategy_functions.view_all_strategies,
+        "3": strategy_functions.strategy_common_targets,
+        "5": strategy_functions.query_data,
+        "6": strategy_functions.show_charts,
+    }
+    write_actions = {
+        "2": strategy_functions.add_new_strategy,
+        "4": strategy_functions.stock_individual_query,
+        "7": strategy_functions.backtest_strategies,
+    }
+
     while True:
         menu_content = [
             "1. 查看所有策略",
@@ -54,36 +74,30 @@ def main():
             "4. 個股查詢",
             "5. 資料查詢",
             "6. 顯示圖表",
-            "7. 離開",
+            "7. 策略回測",
+            "8. 離開",
             "", # 空行
-            f"{COLOR_BOLD}{COLOR_YELLOW}請選擇功能 (1-7):{COLOR_RESET}"
+            f"{COLOR_BOLD}{COLOR_YELLOW}請選擇功能 (1-8):{COLOR_RESET}"
         ]
         print_bbs_box("《台股策略資料庫》(BBS Style)", menu_content)
 
         choice = input("").strip()
 
-        if choice == "1":
-            strategy_functions.view_all_strategies(conn)
-        elif choice == "2":
-            strategy_functions.add_new_strategy(conn)
-        elif choice == "3":
-            strategy_functions.strategy_common_targets(conn)
-        elif choice == "4":
-            strategy_functions.stock_individual_query(conn)
-        elif choice == "5":
-            strategy_functions.query_data(conn)
-        elif choice == "6":
-            strategy_functions.show_charts(conn) # 呼叫更新後的函式名
-        elif choice == "7":
+        if choice in read_actions:
+            with manager.read() as conn:
+                read_actions[choice](conn)
+        elif choice in write_actions:
+            with manager.write() as conn:
+                write_actions[choice](conn)
+        elif choice == "8":
             print(COLOR_YELLOW + "\n" + BORDER_TOP_LEFT + BORDER_HORIZONTAL * 30 + BORDER_TOP_RIGHT + COLOR_RESET)
             print(COLOR_YELLOW + BORDER_VERTICAL + COLOR_BOLD + " 感謝使用台股策略資料庫！ ".center(28) + COLOR_RESET + COLOR_YELLOW + BORDER_VERTICAL + COLOR_RESET)
             print(COLOR_YELLOW + BORDER_BOTTOM_LEFT + BORDER_HORIZONTAL * 30 + BORDER_BOTTOM_RIGHT + COLOR_RESET)
-            if conn: # 確保連線物件存在才關閉
-                conn.close()
-                print(COLOR_GREEN + "資料庫連線已關閉。" + COLOR_RESET)
+            manager.close()
+            print(COLOR_GREEN + "資料庫連線已關閉。" + COLOR_RESET)
             break
         else:
-            print(COLOR_RED + "⚠️ 無效選擇，請輸入 1-7。" + COLOR_RESET)
+            print(COLOR_RED + "⚠️ 無效選擇，請輸入 1-8。" + COLOR_RESET)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
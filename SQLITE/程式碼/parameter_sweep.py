@@ -0,0 +1,167 @@
+import argparse
+import datetime
+import itertools
+import json
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import backtest_engine
+import database_operations
+
+# --- 參數掃描 (Parameter Sweep) ---
+# 價格矩陣只放一份在共享記憶體中，工作行程以名稱附加 (attach) 後直接讀取，
+# 每個任務只傳遞規則名稱與參數，不需要為每次回測重新 pickle 價格資料。
+
+# 各規則的預設網格
+DEFAULT_GRIDS = {
+    "ma_cross": {"short": [3, 5, 10, 20], "long": [20, 40, 60, 120]},
+    "breakout": {"lookback": [10, 20, 40, 60], "exit_lookback": [5, 10, 20]},
+}
+
+# 參數的合理性檢查 (例如短均線必須小於長均線)
+PARAM_CONSTRAINTS = {
+    "ma_cross": lambda p: p["short"] < p["long"],
+}
+
+# 工作行程中的共享價格矩陣 (由 _init_worker 設定)
+_worker_shm = None
+_worker_close = None
+
+def _attach_shared_memory(name):
+    """
+    附加到既有的共享記憶體，但不交給 resource_tracker 追蹤：
+    共享記憶體由主行程建立並負責 unlink；Python 3.13 之前附加時也會登記追蹤，
+    工作行程結束時會誤報洩漏，甚至提早 unlink 主行程仍在使用的區段。
+    (不能在附加後 unregister：fork 啟動的工作行程與主行程共用同一個 resource_tracker，
+    會把主行程自己的登記一起移除。)
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) # Python 3.13+
+    except TypeError:
+        pass
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None # 工作行程初始化時只有單一執行緒
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+def _init_worker(shm_name, shape, dtype):
+    """
+    工作行程初始化：附加到主行程建立的共享記憶體，建立唯讀的 NumPy 檢視。
+    """
+    global _worker_shm, _worker_close
+    _worker_shm = _attach_shared_memory(shm_name)
+    _worker_close = np.ndarray(shape, dtype=dtype, buffer=_worker_shm.buf)
+    _worker_close.flags.writeable = False
+
+def _run_one(task):
+    """
+    在工作行程中執行單次回測。
+    """
+    rule_type, params, trade_cost = task
+    return params, backtest_engine.backtest(_worker_close, rule_type, params, trade_cost)
+
+def grid_params(grid, rule_type=None):
+    """
+    展開參數網格為參數字典列表，並套用規則的合理性檢查。
+    """
+    keys = list(grid)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    check = PARAM_CONSTRAINTS.get(rule_type)
+    return [p for p in combos if check is None or check(p)]
+
+def random_params(grid, n_samples, rule_type=None, seed=None):
+    """
+    隨機搜尋：從網格中不重複地抽出 n_samples 組參數。
+    """
+    combos = grid_params(grid, rule_type)
+    rng = random.Random(seed)
+    return rng.sample(combos, min(n_samples, len(combos)))
+
+def run_parameter_sweep(conn, strategy_id, rule_type, param_list, workers=None, trade_cost=backtest_engine.DEFAULT_TRADE_COST, start_date=None, end_date=None):
+    """
+    以行程池平行執行多組參數的回測，結果寫入 strategy_runs。
+    回傳 (sweep_id, results, 每秒回測數)，results 依 avg_profit_loss 由高到低排序。
+    """
+    if rule_type not in backtest_engine.RULES:
+        raise ValueError(f"未知的回測規則：{rule_type}")
+    if not param_list:
+        return None, [], 0.0
+
+    rule = backtest_engine.load_strategy_rule(conn, strategy_id)
+    targets = rule[2] if rule else None
+    _, _, close = backtest_engine.load_price_matrix(conn, targets, start_date, end_date)
+    if close.size == 0:
+        raise ValueError("沒有可用的價格資料，請先匯入 stock_prices。")
+
+    workers = workers or os.cpu_count() or 1
+    shm = shared_memory.SharedMemory(create=True, size=close.nbytes)
+    try:
+        shared_close = np.ndarray(close.shape, dtype=close.dtype, buffer=shm.buf)
+        shared_close[:] = close
+        del close
+
+        tasks = [(rule_type, params, trade_cost) for params in param_list]
+        chunksize = max(1, len(tasks) // (workers * 4))
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shm.name, shared_close.shape, shared_close.dtype)) as pool:
+            results = list(pool.map(_run_one, tasks, chunksize=chunksize))
+        elapsed = time.perf_counter() - started
+        del shared_close
+    finally:
+        shm.close()
+        shm.unlink()
+
+    sweep_id = uuid.uuid4().hex[:12]
+    run_at = datetime.datetime.now().isoformat(timespec="seconds")
+    conn.executemany(
+        "INSERT INTO strategy_runs (strategy_id, sweep_id, rule_type, params, trades, win_rate, avg_profit_loss, run_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(strategy_id, sweep_id, rule_type, json.dumps(params), m["trades"], m["win_rate"], m["avg_profit_loss"], run_at) for params, m in results]
+    )
+    conn.commit()
+
+    results.sort(key=lambda r: r[1]["avg_profit_loss"] if r[1]["avg_profit_loss"] is not None else float("-inf"), reverse=True)
+    throughput = len(results) / elapsed if elapsed > 0 else float("inf")
+    return sweep_id, results, throughput
+
+def main():
+    parser = argparse.ArgumentParser(description="策略回測參數掃描 (多核心)")
+    parser.add_argument("strategy_id", type=int, help="策略 ID")
+    parser.add_argument("--rule", choices=sorted(backtest_engine.RULES), default="ma_cross", help="回測規則")
+    parser.add_argument("--grid", help='參數網格 JSON，例如 \'{"short": [5, 10], "long": [20, 60]}\'')
+    parser.add_argument("--random", type=int, default=0, help="隨機搜尋的組數 (0 表示完整網格)")
+    parser.add_argument("--workers", type=int, default=None, help="工作行程數 (預設為 CPU 核心數)")
+    parser.add_argument("--top", type=int, default=10, help="顯示前幾名結果")
+    args = parser.parse_args()
+
+    grid = json.loads(args.grid) if args.grid else DEFAULT_GRIDS[args.rule]
+    if args.random:
+        param_list = random_params(grid, args.random, args.rule)
+    else:
+        param_list = grid_params(grid, args.rule)
+
+    conn = database_operations.initialize_database()
+    if conn is None:
+        return
+    try:
+        sweep_id, results, throughput = run_parameter_sweep(conn, args.strategy_id, args.rule, param_list, args.workers)
+    finally:
+        conn.close()
+
+    print(f"掃描編號 {sweep_id}：共 {len(results)} 組參數，{throughput:.1f} 次回測/秒")
+    for params, metrics in results[:args.top]:
+        win_rate_str = f"{metrics['win_rate']*100:.2f}%" if metrics["win_rate"] is not None else "N/A"
+        avg_str = f"{metrics['avg_profit_loss']:.2f}%" if metrics["avg_profit_loss"] is not None else "N/A"
+        print(f"  {json.dumps(params)}  交易 {metrics['trades']} 筆, 盈利率 {win_rate_str}, 平均單筆報酬 {avg_str}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# --- 啟動時間量測 ---
+# 以 `python -X importtime` 在全新的直譯器中匯入主程式需要的模組，
+# 統計匯入耗時，並確認 pandas/numpy/matplotlib 等重量級套件沒有在啟動時被載入。
+# 用法：python startup_benchmark.py --runs 10 --budget-ms 150
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 顯示主選單前需要的模組 (main_stock_app 在 main() 中才匯入其餘模組，需逐一列出)
+STARTUP_MODULES = ["main_stock_app", "database_operations", "connection_manager", "strategy_functions"]
+
+# 啟動時不應出現的重量級套件
+HEAVY_MODULES = {"pandas", "numpy", "matplotlib", "scipy", "sklearn"}
+
+# 冷啟動的預設時間預算 (毫秒，含直譯器本身的啟動時間)
+DEFAULT_BUDGET_MS = 150
+
+def parse_importtime(stderr_text):
+    """
+    解析 -X importtime 的輸出，回傳 [(模組名稱, 巢狀深度, 自身微秒, 累計微秒)]。
+    """
+    entries = []
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_part, cumulative_part, name = line.split("|", 2)
+        self_us = int(self_part.split(":", 1)[1])
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, self_us, int(cumulative_part)))
+    return entries
+
+def measure_once():
+    """
+    在新的直譯器中匯入啟動模組一次，回傳 (牆鐘時間秒數, importtime 解析結果)。
+    """
+    code = f"import sys; sys.path.insert(0, {CURRENT_DIR!r}); " + "; ".join(f"import {m}" for m in STARTUP_MODULES)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"匯入失敗：\n{result.stderr}")
+    return elapsed, parse_importtime(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="主程式冷啟動時間量測")
+    parser.add_argument("--runs", type=int, default=10, help="量測次數 (取中位數)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="冷啟動時間預算 (毫秒)")
+    parser.add_argument("--top", type=int, default=10, help="列出最慢的幾個模組")
+    args = parser.parse_args()
+
+    wall_times = []
+    entries = []
+    for _ in range(args.runs):
+        elapsed, entries = measure_once()
+        wall_times.append(elapsed * 1000)
+    median_ms = statistics.median(wall_times)
+
+    print(f"冷啟動 (中位數，{args.runs} 次)：{median_ms:.1f} ms，預算 {args.budget_ms:.0f} ms")
+    print(f"最慢的 {args.top} 個模組 (最後一次量測，自身耗時)：")
+    for name, depth, self_us, cumulative_us in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"  {name:<40} 自身 {self_us / 1000:7.2f} ms  累計 {cumulative_us / 1000:7.2f} ms")
+
+    loaded_heavy = sorted({name.split(".")[0] for name, *_ in entries} & HEAVY_MODULES)
+    failed = False
+    if loaded_heavy:
+        print(f"❌ 啟動時載入了重量級套件：{', '.join(loaded_heavy)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"❌ 冷啟動時間超過預算 ({median_ms:.1f} ms > {args.budget_ms:.0f} ms)")
+        failed = True
+    if not failed:
+        print("✅ 冷啟動時間在預算內，且未載入重量級套件。")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
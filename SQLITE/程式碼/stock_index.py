@@ -0,0 +1,257 @@
+import argparse
+import bisect
+import csv
+import json
+import os
+import time
+import urllib.request
+
+import database_operations
+import indicator_cache
+
+# --- 個股代碼索引 ---
+# 啟動後第一次查詢時把股票清單 (代碼、簡稱) 載入記憶體，之後的代碼前綴、名稱前綴與
+# 模糊搜尋都只在記憶體中進行；找到股票後再以單一 SQL 取出最新價格與技術指標快照。
+# 股票清單來源依序為：資料庫 stocks 表 -> 快照檔 stock_list.json (與資料庫檔案在同一資料夾) -> stock_prices 中出現的代碼。
+# 用法：
+#   python stock_index.py --update                (從證交所 OpenAPI 下載上市公司清單)
+#   python stock_index.py --import stocks.csv     (CSV 欄位：stock_id,name[,market,industry])
+#   python stock_index.py 台積                    (搜尋並顯示耗時)
+
+TWSE_LIST_URL = "https://openapi.twse.com.tw/v1/opendata/t187ap03_L" # 上市公司基本資料
+SNAPSHOT_NAME = "stock_list.json"
+DEFAULT_LIMIT = 10
+
+class StockIndex:
+    """
+    記憶體中的股票代碼/名稱索引。
+    代碼與名稱各保存一份排序後的列表，前綴搜尋以 bisect 在 O(log n) 內找到範圍；
+    模糊搜尋使用「字元 -> 股票」的反向索引，只比對含有查詢字元的候選股票。
+    """
+
+    def __init__(self, records):
+        self.names = {} # stock_id -> name
+        self.by_name = {} # name -> stock_id
+        chars = {}
+        for stock_id, name in records:
+            stock_id = str(stock_id).strip()
+            name = (name or "").strip()
+            if not stock_id:
+                continue
+            self.names[stock_id] = name
+            if name:
+                self.by_name.setdefault(name, stock_id)
+            for ch in set(name.lower()):
+                chars.setdefault(ch, set()).add(stock_id)
+        self.chars = chars
+        self.sorted_codes = sorted(self.names)
+        self.sorted_names = sorted(self.by_name)
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _prefix_range(sorted_list, prefix):
+        start = bisect.bisect_left(sorted_list, prefix)
+        end = bisect.bisect_left(sorted_list, prefix + "\uffff")
+        return sorted_list[start:end]
+
+    def prefix_codes(self, prefix, limit=DEFAULT_LIMIT):
+        return self._prefix_range(self.sorted_codes, prefix)[:limit]
+
+    def prefix_names(self, prefix, limit=DEFAULT_LIMIT):
+        return [self.by_name[name] for name in self._prefix_range(self.sorted_names, prefix)[:limit]]
+
+    def fuzzy(self, query, limit=DEFAULT_LIMIT):
+        """
+        模糊名稱搜尋：依「名稱含有的查詢字元數」排序，字元依序出現 (例如「台電」對「台達電」) 者優先，
+        同分時名稱較短者優先。
+        """
+        query = query.lower()
+        candidates = {}
+        for ch in set(query):
+            for stock_id in self.chars.get(ch, ()):
+                candidates[stock_id] = candidates.get(stock_id, 0) + 1
+        if not candidates:
+            return []
+        best = max(candidates.values())
+        if best < max(1, (len(set(query)) + 1) // 2):
+            return [] # 相符字元不到一半，視為沒有結果
+        # 只排序相符字元數最多的候選，常見字 (例如「台」) 不會讓排序成本隨清單變大
+        scored = []
+        for stock_id, hits in candidates.items():
+            if hits == best:
+                name = self.names[stock_id]
+                scored.append((not _is_subsequence(query, name.lower()), len(name), stock_id))
+        scored.sort()
+        return [item[2] for item in scored[:limit]]
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        依序嘗試：代碼完全相符 -> 代碼前綴 -> 名稱完全相符 -> 名稱前綴，都沒有結果時才做模糊名稱搜尋，
+        回傳不重複的 [(stock_id, name), ...]。
+        """
+        query = query.strip()
+        if not query:
+            return []
+        results = []
+        if query in self.names:
+            results.append(query)
+        if query.isascii():
+            results.extend(self.prefix_codes(query.upper(), limit))
+        if query in self.by_name:
+            results.append(self.by_name[query])
+        results.extend(self.prefix_names(query, limit))
+        if not results and not query.isdigit():
+            results.extend(self.fuzzy(query, limit))
+
+        unique = list(dict.fromkeys(results))[:limit]
+        return [(stock_id, self.names[stock_id]) for stock_id in unique]
+
+def _is_subsequence(query, text):
+    it = iter(text)
+    return all(ch in it for ch in query)
+
+# --- 股票清單的載入與更新 ---
+def default_snapshot_path(conn):
+    """
+    回傳與連線的資料庫檔案放在同一資料夾的快照檔路徑；記憶體資料庫回傳 None (不使用快照檔)。
+    """
+    db_file = conn.execute("PRAGMA database_list").fetchone()[2]
+    if not db_file:
+        return None
+    return os.path.join(os.path.dirname(db_file), SNAPSHOT_NAME)
+
+def load_stock_records(conn, snapshot_path=None):
+    """
+    依序從 stocks 表、快照檔、stock_prices 取得股票清單 [(stock_id, name), ...]。
+    stock_prices 中有價格但不在清單裡的代碼也會加入 (名稱留空)，確保有資料的股票都查得到。
+    snapshot_path 預設為資料庫檔案旁的 stock_list.json (見 default_snapshot_path)。
+    """
+    snapshot_path = snapshot_path or default_snapshot_path(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT stock_id, name FROM stocks")
+    records = cursor.fetchall()
+    if not records and snapshot_path and os.path.exists(snapshot_path):
+        with open(snapshot_path, encoding="utf-8") as f:
+            records = [tuple(r) for r in json.load(f)]
+    known = {r[0] for r in records}
+    cursor.execute("SELECT DISTINCT stock_id FROM stock_prices")
+    records.extend((r[0], "") for r in cursor.fetchall() if r[0] not in known)
+    return records
+
+def save_stock_records(conn, records, snapshot_path=None):
+    """
+    寫入 stocks 表 (已存在的代碼會更新名稱) 並更新快照檔，回傳筆數。
+    records 為 [(stock_id, name, market, industry), ...]；snapshot_path 預設同 load_stock_records。
+    """
+    with conn:
+        conn.executemany(
+            "INSERT INTO stocks (stock_id, name, market, industry) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (stock_id) DO UPDATE SET name = excluded.name, market = excluded.market, industry = excluded.industry",
+            records
+        )
+    snapshot_path = snapshot_path or default_snapshot_path(conn)
+    if snapshot_path:
+        cursor = conn.cursor()
+        cursor.execute("SELECT stock_id, name FROM stocks ORDER BY stock_id")
+        with open(snapshot_path, "w", encoding="utf-8") as f:
+            json.dump(cursor.fetchall(), f, ensure_ascii=False)
+    _reset_index()
+    return len(records)
+
+def fetch_twse_list(url=TWSE_LIST_URL, timeout=30):
+    """
+    從證交所 OpenAPI 下載上市公司清單，回傳 [(stock_id, name, market, industry), ...]。
+    """
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        data = json.load(response)
+    return [(item["公司代號"].strip(), item["公司簡稱"].strip(), "上市", item.get("產業別", "").strip()) for item in data]
+
+def read_stock_csv(path):
+    """
+    讀取 CSV 股票清單 (需有 stock_id、name 欄位，market、industry 可省略)。
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return [(row["stock_id"].strip(), row["name"].strip(), row.get("market") or None, row.get("industry") or None)
+                for row in csv.DictReader(f) if row.get("stock_id")]
+
+# 索引建立後由之後的查詢共用；股票清單的資料版本 (data_versions 的 stock_list) 改變時重建，
+# 其他程序 (例如 tick_ingestion) 寫入新代碼的價格後，下一次查詢就會看到
+_index = None
+_index_version = None
+
+def get_index(conn):
+    global _index, _index_version
+    version = database_operations.get_data_version(conn, "stock_list")
+    if _index is None or version != _index_version:
+        _index = StockIndex(load_stock_records(conn))
+        _index_version = version
+    return _index
+
+def _reset_index():
+    global _index, _index_version
+    _index = None
+    _index_version = None
+
+# --- 最新價格與指標快照 ---
+# 只取與最新價格同一天的指標值：快取尚未更新到最新價格時回傳 NULL，不把舊日期的值當成最新值
+_INDICATOR_SUBQUERY = (
+    "(SELECT value FROM indicator_values WHERE stock_id = p.stock_id AND indicator = '{indicator}' "
+    "AND params_key = '{key}' AND trade_date = p.trade_date)"
+)
+SNAPSHOT_INDICATORS = list(indicator_cache.DEFAULT_PARAMS)
+SNAPSHOT_FIELDS = ["trade_date", "open", "high", "low", "close", "volume", "prev_close"] + SNAPSHOT_INDICATORS
+SNAPSHOT_SQL = (
+    "SELECT p.trade_date, p.open, p.high, p.low, p.close, p.volume, "
+    "(SELECT close FROM stock_prices WHERE stock_id = p.stock_id AND trade_date < p.trade_date ORDER BY trade_date DESC LIMIT 1), "
+    + ", ".join(_INDICATOR_SUBQUERY.format(indicator=name, key=indicator_cache.params_key(params))
+                for name, params in indicator_cache.DEFAULT_PARAMS.items())
+    + " FROM stock_prices AS p WHERE p.stock_id = ? ORDER BY p.trade_date DESC LIMIT 1"
+)
+
+def get_snapshot(conn, stock_id, refresh=False):
+    """
+    以一次查詢取得最新一日的價格、前一日收盤價與預設參數的技術指標 (讀取 indicator_values 快取)，
+    回傳 dict；沒有價格資料時回傳 None。快取落後於最新價格的指標為 None。
+    refresh 為 True 時先把這檔股票的指標快取增量更新到最新價格 (需要可寫入的連線)。
+    """
+    if refresh:
+        indicator_cache.refresh_all(conn, [stock_id])
+    cursor = conn.cursor()
+    cursor.execute(SNAPSHOT_SQL, (stock_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip(SNAPSHOT_FIELDS, row))
+
+def main():
+    parser = argparse.ArgumentParser(description="個股代碼索引")
+    parser.add_argument("query", nargs="?", help="要搜尋的代碼或名稱")
+    parser.add_argument("--db", default=None, help="資料庫路徑")
+    parser.add_argument("--update", action="store_true", help="從證交所 OpenAPI 更新上市公司清單")
+    parser.add_argument("--import", dest="import_file", metavar="CSV", help="從 CSV 匯入股票清單")
+    args = parser.parse_args()
+
+    conn = database_operations.initialize_database(args.db)
+    if conn is None:
+        return
+    try:
+        if args.update:
+            print(f"已更新 {save_stock_records(conn, fetch_twse_list())} 檔股票。")
+        if args.import_file:
+            print(f"已匯入 {save_stock_records(conn, read_stock_csv(args.import_file))} 檔股票。")
+        if args.query:
+            started = time.perf_counter()
+            index = get_index(conn)
+            loaded = time.perf_counter()
+            results = index.search(args.query)
+            searched = time.perf_counter()
+            print(f"索引 {len(index)} 檔股票，載入 {(loaded - started) * 1000:.1f} ms，搜尋 {(searched - loaded) * 1e6:.0f} µs")
+            for stock_id, name in results:
+                print(f"  {stock_id:<8} {name}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import connection_manager
+import database_operations
+import strategy_functions
+
+# --- 策略資料庫 HTTP/JSON API ---
+# 以 asyncio 實作的輕量 HTTP/1.1 伺服器 (支援 keep-alive)，只提供唯讀查詢：
+#   GET /health
+#   GET /strategies?status=運行中&limit=20&after_date=2024-05-01&after_name=xxx
+#   GET /strategies/search?q=突破&status=運行中&limit=20
+#   GET /strategies/{id}
+#   GET /strategies/stats            (各狀態摘要與盈利率直方圖，讀取彙總表)
+# SQLite 查詢在執行緒池中使用唯讀連線池執行，不阻塞事件迴圈。
+# 列表回應附帶 ETag；strategies 的資料版本號 (觸發器維護) 沒有改變時直接回傳快取內容，
+# 用戶端帶 If-None-Match 時回 304。
+# 用法：python strategy_api_server.py --port 8080
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+MAX_PAGE_SIZE = 200
+RESPONSE_CACHE_SIZE = 256 # 快取的回應數量上限 (LRU)
+MAX_HEADER_BYTES = 16 * 1024
+
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+class StrategyApi:
+    """
+    處理 API 請求：查詢資料庫並管理回應快取。
+    """
+
+    def __init__(self, manager, executor):
+        self.manager = manager
+        self.executor = executor
+        self.cache = OrderedDict() # 請求路徑 -> (資料版本, etag, body)
+
+    def data_version(self):
+        """
+        讀取 strategies 的資料版本號 (data_versions 表，每次新增/修改/刪除由觸發器加 1)。
+        只是一次主鍵查詢；與檔案修改時間不同，不受 WAL 檢查點或檔案系統時間精度影響。
+        """
+        return self._query(database_operations.get_data_version)
+
+    def _query(self, func, *args):
+        with self.manager.read() as conn:
+            return func(conn, *args)
+
+    async def handle(self, method, target, headers):
+        """
+        回傳 (狀態碼, 額外標頭 dict, body bytes)。
+        """
+        if method != "GET":
+            return self._json(405, {"error": "只支援 GET"})
+
+        parts = urlsplit(target)
+        path = parts.path.rstrip("/") or "/"
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+
+        if path == "/health":
+            return self._json(200, {"status": "ok"})
+
+        if path == "/strategies/stats":
+            summary = await asyncio.get_running_loop().run_in_executor(self.executor, self._query, database_operations.get_strategy_summary)
+            histogram = await asyncio.get_running_loop().run_in_executor(self.executor, self._query, database_operations.get_win_rate_histogram)
+            return self._json(200, {
+                "by_status": [dict(zip(["status", "count", "avg_win_rate", "avg_profit_loss"], row)) for row in summary],
+                "win_rate_histogram": histogram,
+            })
+
+        if path in ("/strategies", "/strategies/search"):
+            cache_key = target
+            version = await asyncio.get_running_loop().run_in_executor(self.executor, self.data_version)
+            cached = self.cache.get(cache_key)
+            if cached is None or cached[0] != version:
+                try:
+                    limit = min(max(int(query.get("limit", strategy_functions.PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+                except ValueError:
+                    return self._json(400, {"error": "limit 必須是整數"})
+                search_term = query.get("q", "") if path == "/strategies/search" else ""
+                after = None
+                if "after_date" in query:
+                    after = (query["after_date"], query.get("after_name", ""))
+                records = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self._query, strategy_functions.search_strategies,
+                    search_term, query.get("status", ""), after, limit
+                )
+                body = self._page_body(records, limit)
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                cached = (version, etag, body)
+                self.cache[cache_key] = cached
+                if len(self.cache) > RESPONSE_CACHE_SIZE:
+                    self.cache.popitem(last=False)
+            self.cache.move_to_end(cache_key)
+
+            _, etag, body = cached
+            response_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+            if headers.get("if-none-match") == etag:
+                return 304, response_headers, b""
+            return 200, dict(response_headers, **{"Content-Type": "application/json; charset=utf-8"}), body
+
+        if path.startswith("/strategies/"):
+            try:
+                strategy_id = int(path.rsplit("/", 1)[1])
+            except ValueError:
+                return self._json(404, {"error": "找不到此路徑"})
+            record = await asyncio.get_running_loop().run_in_executor(self.executor, self._query, _get_strategy, strategy_id)
+            if record is None:
+                return self._json(404, {"error": "找不到此策略"})
+            return self._json(200, dict(zip(strategy_functions.STRATEGY_FIELDS, record)))
+
+        return self._json(404, {"error": "找不到此路徑"})
+
+    @staticmethod
+    def _page_body(records, limit):
+        items = [dict(zip(strategy_functions.STRATEGY_FIELDS, r)) for r in records]
+        next_page = None
+        if len(records) == limit:
+            next_page = {"after_date": records[-1][3], "after_name": records[-1][1]}
+        return json.dumps({"items": items, "next": next_page}, ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    def _json(status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return status, {"Content-Type": "application/json; charset=utf-8"}, body
+
+def _get_strategy(conn, strategy_id):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {strategy_functions.STRATEGY_COLUMNS} FROM strategies AS s WHERE s.strategy_id = ?", (strategy_id,))
+    return cursor.fetchone()
+
+async def _read_request(reader):
+    """
+    讀取一個 HTTP 請求的起始行與標頭；連線關閉時回傳 None。
+    """
+    try:
+        raw = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise ValueError("標頭過長")
+    lines = raw.decode("latin-1").split("\r\n")
+    method, target, version = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    # 只支援 GET，若有 body 則讀掉以保持連線同步
+    length = int(headers.get("content-length", 0) or 0)
+    if length:
+        await reader.readexactly(length)
+    return method, target, version, headers
+
+def make_handler(api):
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError:
+                    request = None
+                    status, headers, body = api._json(400, {"error": "無效的請求"})
+                    writer.write(_format_response(status, headers, body, keep_alive=False))
+                if request is None:
+                    break
+                method, target, version, req_headers = request
+                try:
+                    status, headers, body = await api.handle(method, target, req_headers)
+                except Exception as e:
+                    status, headers, body = api._json(500, {"error": str(e)})
+                keep_alive = req_headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                writer.write(_format_response(status, headers, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    return handle_connection
+
+def _format_response(status, headers, body, keep_alive):
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}"]
+    headers = dict(headers, **{"Content-Length": str(len(body)), "Connection": "keep-alive" if keep_alive else "close"})
+    lines.extend(f"{k}: {v}" for k, v in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8") + body
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, db_path=None, pool_size=connection_manager.DEFAULT_POOL_SIZE):
+    manager = connection_manager.ConnectionManager(db_path, pool_size)
+    executor = ThreadPoolExecutor(max_workers=pool_size)
+    api = StrategyApi(manager, executor)
+    server = await asyncio.start_server(make_handler(api), host, port, limit=MAX_HEADER_BYTES)
+    print(f"策略 API 伺服器已啟動：http://{host}:{port}/strategies")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(wait=True)
+        manager.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="台股策略資料庫 HTTP/JSON API (唯讀)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default=None, help="資料庫路徑")
+    parser.add_argument("--pool-size", type=int, default=connection_manager.DEFAULT_POOL_SIZE, help="唯讀連線數量")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.db, args.pool_size))
+    except KeyboardInterrupt:
+        print("伺服器已停止。")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import argparse
+import contextlib
+import csv
+import datetime
+import json
+import sqlite3
+import sys
+
+import database_operations
+import strategy_functions
+
+# --- 非互動式命令列介面 ---
+# 不經過 input() 選單，直接以子命令操作策略資料庫，方便批次處理與排程：
+#   python strategy_cli.py add --name 均線策略 --date 2024-01-01 --status 回測中
+#   python strategy_cli.py import strategies.csv            (CSV 或 JSONL，單一交易)
+#   python strategy_cli.py list --limit 50
+#   python strategy_cli.py search 突破 --status 運行中
+#   python strategy_cli.py export --format jsonl -o out.jsonl
+
+EXPORT_FIELDS = strategy_functions.STRATEGY_FIELDS
+VALID_STATUSES = set(strategy_functions.STATUSES.values())
+
+INSERT_SQL = "INSERT INTO strategies (name, description, created_date, status, win_rate, avg_profit_loss) VALUES (?, ?, ?, ?, ?, ?)"
+# 名稱重複時的處理方式
+CONFLICT_SQL = {
+    "abort": INSERT_SQL,
+    "skip": INSERT_SQL + " ON CONFLICT (name) DO NOTHING",
+    "update": INSERT_SQL + " ON CONFLICT (name) DO UPDATE SET description = excluded.description, created_date = excluded.created_date, status = excluded.status, win_rate = excluded.win_rate, avg_profit_loss = excluded.avg_profit_loss",
+}
+
+def _optional_float(value):
+    if value is None or str(value).strip() == "":
+        return None
+    return float(value)
+
+def validate_record(record):
+    """
+    驗證並轉換一筆策略資料 (dict，或 JSONL 的一行原始字串)，回傳可直接寫入的 tuple；格式錯誤時拋出 ValueError。
+    """
+    if isinstance(record, str):
+        record = json.loads(record) # JSON 格式錯誤時拋出 ValueError (JSONDecodeError)
+    if not isinstance(record, dict): # JSONL 的一行可能是合法 JSON 但不是物件，例如 [1, 2] 或 "x"
+        raise ValueError(f"資料應為 JSON 物件，實際為 {type(record).__name__}")
+    name = str(record.get("name") or "").strip()
+    if not name:
+        raise ValueError("策略名稱不能為空")
+    created_date = str(record.get("created_date") or "").strip()
+    # 格式錯誤會拋出 ValueError；2024-1-5 也統一存成 2024-01-05，依 created_date 排序與分頁才會正確
+    created_date = datetime.datetime.strptime(created_date, "%Y-%m-%d").date().isoformat()
+    status = str(record.get("status") or "開發中").strip()
+    if status not in VALID_STATUSES:
+        raise ValueError(f"未知的策略狀態：{status}")
+    win_rate = _optional_float(record.get("win_rate"))
+    if win_rate is not None and not 0 <= win_rate <= 1:
+        raise ValueError("盈利率應介於 0 到 1 之間")
+    avg_profit_loss = _optional_float(record.get("avg_profit_loss"))
+    description = str(record.get("description") or "").strip()
+    return (name, description, created_date, status, win_rate, avg_profit_loss)
+
+def read_records(path):
+    """
+    逐筆讀取 CSV (需有標題列) 或 JSONL 檔案，產生 (行號, dict)；
+    JSONL 產生該行的原始字串，由 validate_record 解析，格式錯誤時只算該行的錯誤。
+    """
+    is_jsonl = path.lower().endswith((".jsonl", ".ndjson"))
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if is_jsonl:
+            for line_no, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_no, line
+        else:
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+
+def import_strategies(conn, path, on_conflict="abort", skip_invalid=False):
+    """
+    匯入策略檔案：先驗證全部資料，再以 executemany 在單一交易中寫入。
+    回傳 (寫入筆數, 錯誤列表)；有錯誤且未指定 skip_invalid 時不寫入任何資料。
+    """
+    rows = []
+    errors = []
+    for line_no, record in read_records(path):
+        try:
+            rows.append(validate_record(record))
+        except (ValueError, TypeError) as e:
+            errors.append(f"第 {line_no} 行：{e}")
+
+    if errors and not skip_invalid:
+        return 0, errors
+
+    with conn:
+        cursor = conn.executemany(CONFLICT_SQL[on_conflict], rows)
+        written = cursor.rowcount # 不含觸發器 (全文檢索同步) 造成的異動
+    return written, errors
+
+def export_strategies(conn, out, fmt="csv", search_term="", status_filter=""):
+    """
+    以串流方式匯出策略 (csv / jsonl / json)，逐批讀取並寫出，回傳筆數。
+    """
+    records = strategy_functions.iter_strategies(conn, search_term, status_filter)
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_FIELDS)
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    elif fmt == "jsonl":
+        for record in records:
+            out.write(json.dumps(dict(zip(EXPORT_FIELDS, record)), ensure_ascii=False) + "\n")
+            count += 1
+    else:
+        # JSON 陣列也逐筆寫出，不在記憶體中組成完整列表
+        out.write("[")
+        for record in records:
+            out.write(("," if count else "") + "\n" + json.dumps(dict(zip(EXPORT_FIELDS, record)), ensure_ascii=False))
+            count += 1
+        out.write("\n]\n")
+    return count
+
+# --- 子命令 ---
+def cmd_add(conn, args):
+    row = validate_record(vars(args))
+    try:
+        with conn:
+            conn.execute(INSERT_SQL, row)
+    except sqlite3.IntegrityError:
+        print(f"⚠️ 錯誤：策略名稱 '{row[0]}' 已存在！", file=sys.stderr)
+        return 1
+    print(f"✅ 策略 '{row[0]}' 成功新增！")
+    return 0
+
+def cmd_import(conn, args):
+    try:
+        written, errors = import_strategies(conn, args.file, args.on_conflict, args.skip_invalid)
+    except sqlite3.IntegrityError as e:
+        print(f"⚠️ 匯入失敗 (已全部取消)：{e}", file=sys.stderr)
+        return 1
+    for error in errors:
+        print(f"⚠️ {error}", file=sys.stderr)
+    if errors and not args.skip_invalid:
+        print(f"⚠️ 共 {len(errors)} 筆資料格式錯誤，未匯入任何資料 (可加上 --skip-invalid 略過錯誤資料)。", file=sys.stderr)
+        return 1
+    print(f"✅ 已匯入 {written} 筆策略。")
+    return 0
+
+def cmd_list(conn, args):
+    strategy_functions.view_all_strategies(conn, limit=args.limit, interactive=False)
+    return 0
+
+def cmd_search(conn, args):
+    header = f"{'ID':<4} {'名稱':<15} {'狀態':<8} {'建立日期':<12} {'盈利率':<8} {'平均盈虧':<10}"
+    lines = [header]
+    for i, record in enumerate(strategy_functions.iter_strategies(conn, args.term, args.status or "")):
+        if args.limit is not None and i >= args.limit:
+            break
+        lines.append(strategy_functions.format_strategy_row(record))
+        if len(lines) >= strategy_functions.PAGE_SIZE:
+            strategy_functions.write_lines(lines)
+            lines = []
+    if lines:
+        strategy_functions.write_lines(lines)
+    return 0
+
+def cmd_export(conn, args):
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            count = export_strategies(conn, out, args.format, args.search or "", args.status or "")
+    else:
+        count = export_strategies(conn, sys.stdout, args.format, args.search or "", args.status or "")
+    print(f"已匯出 {count} 筆策略。", file=sys.stderr)
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="台股策略資料庫 (非互動模式)")
+    parser.add_argument("--db", default=None, help=f"資料庫路徑 (預設：{database_operations.DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("add", help="新增一筆策略")
+    p.add_argument("--name", required=True)
+    p.add_argument("--description", default="")
+    p.add_argument("--date", dest="created_date", default=datetime.date.today().isoformat(), help="建立日期 YYYY-MM-DD (預設今天)")
+    p.add_argument("--status", default="開發中", choices=sorted(VALID_STATUSES))
+    p.add_argument("--win-rate", dest="win_rate", default=None)
+    p.add_argument("--avg-profit-loss", dest="avg_profit_loss", default=None)
+    p.set_defaults(func=cmd_add)
+
+    p = sub.add_parser("import", help="從 CSV / JSONL 批次匯入策略 (單一交易)")
+    p.add_argument("file")
+    p.add_argument("--on-conflict", choices=sorted(CONFLICT_SQL), default="abort", help="策略名稱重複時：abort 全部取消、skip 略過、update 更新")
+    p.add_argument("--skip-invalid", action="store_true", help="略過格式錯誤的資料並匯入其餘資料")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("list", help="列出策略")
+    p.add_argument("--limit", type=int, default=None)
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("search", help="以關鍵字 (全文檢索) 與狀態搜尋策略")
+    p.add_argument("term", nargs="?", default="")
+    p.add_argument("--status", choices=sorted(VALID_STATUSES))
+    p.add_argument("--limit", type=int, default=None)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("export", help="匯出策略 (串流輸出)")
+    p.add_argument("--format", choices=["csv", "jsonl", "json"], default="csv")
+    p.add_argument("-o", "--output", help="輸出檔案 (預設為標準輸出)")
+    p.add_argument("--search", help="關鍵字篩選")
+    p.add_argument("--status", choices=sorted(VALID_STATUSES))
+    p.set_defaults(func=cmd_export)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # 初始化訊息改印到 stderr，讓 export 的標準輸出只有資料
+    with contextlib.redirect_stdout(sys.stderr):
+        conn = database_operations.initialize_database(args.db)
+    if conn is None:
+        return 1
+    try:
+        return args.func(conn, args)
+    except ValueError as e:
+        print(f"⚠️ 輸入錯誤：{e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
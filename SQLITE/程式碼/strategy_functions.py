@@ -1,5 +1,9 @@
 import sqlite3
 import datetime
+import os
+import sys
+
+import database_operations # 全文檢索表名稱與檢查函式
 
 # --- BBS 風格相關定義 (保持不變) ---
 COLOR_RESET = "\033[0m"
@@ -34,20 +38,100 @@ def print_bbs_box(title, content_lines, width=60, title_color=COLOR_YELLOW, cont
 
     print(title_color + BORDER_BOTTOM_LEFT + BORDER_HORIZONTAL * (width - 2) + BORDER_BOTTOM_RIGHT + COLOR_RESET)
 
-# 驗證日期格式 (保持不變)
+# --- 策略查詢共用設定 ---
+STRATEGY_COLUMNS = "s.strategy_id, s.name, s.description, s.created_date, s.status, s.win_rate, s.avg_profit_loss"
+STRATEGY_FIELDS = ["strategy_id", "name", "description", "created_date", "status", "win_rate", "avg_profit_loss"] # 與 STRATEGY_COLUMNS 順序相同
+PAGE_SIZE = 20 # 每頁顯示的策略筆數
+FTS_MIN_TERM_LENGTH = 3 # trigram 全文檢索至少需要 3 個字元，較短的關鍵字改用 LIKE
+
+# 策略狀態 (選單數字 -> 狀態名稱)
+STATUSES = {"1": "開發中", "2": "回測中", "3": "運行中", "4": "已停用"}
+
+# 狀態對應的顯示顏色 (未列出的狀態顯示為紅色)
+STATUS_COLORS = {"運行中": COLOR_GREEN, "回測中": COLOR_YELLOW, "開發中": COLOR_CYAN}
+
+def format_strategy_row(record):
+    """
+    將一筆策略紀錄格式化為列表中的一行 (含狀態顏色)。
+    """
+    win_rate_str = f"{record[5]*100:.2f}%" if record[5] is not None else "N/A"
+    avg_profit_loss_str = f"{record[6]:.2f}" if record[6] is not None else "N/A"
+    status_color = STATUS_COLORS.get(record[4], COLOR_RED)
+    return f"{record[0]:<4} {record[1]:<15} {status_color}{record[4]:<8}{COLOR_RESET} {record[3]:<12} {win_rate_str:<8} {avg_profit_loss_str:<10}"
+
+def write_lines(lines, stream=None):
+    """
+    將多行文字合併後一次寫出並 flush，避免逐行 print 的系統呼叫開銷。
+    """
+    stream = stream or sys.stdout
+    stream.write("\n".join(lines) + "\n")
+    stream.flush()
+
+def search_strategies(conn, search_term="", status_filter="", after=None, page_size=PAGE_SIZE):
+    """
+    依關鍵字與狀態搜尋策略，回傳一頁結果。
+    關鍵字使用 FTS5 全文檢索 (無法使用時退回 LIKE)；
+    分頁採 keyset 方式：after 為上一頁最後一筆的 (created_date, name)，
+    不需要 OFFSET 掃過前面所有資料。
+    """
+    query = f"SELECT {STRATEGY_COLUMNS} FROM strategies AS s WHERE 1=1"
+    params = []
+
+    if search_term:
+        if len(search_term) >= FTS_MIN_TERM_LENGTH and database_operations.has_fts(conn):
+            fts_table = database_operations.FTS_TABLE
+            query += f" AND s.strategy_id IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)"
+            params.append('"' + search_term.replace('"', '""') + '"') # 以片語方式比對，避免特殊字元被當成語法
+        else:
+            query += " AND (s.name LIKE ? OR s.description LIKE ?)"
+            params.extend([f"%{search_term}%", f"%{search_term}%"])
+
+    if status_filter:
+        query += " AND s.status = ?"
+        params.append(status_filter)
+
+    if after is not None:
+        last_date, last_name = after
+        query += " AND (s.created_date < ? OR (s.created_date = ? AND s.name > ?))"
+        params.extend([last_date, last_date, last_name])
+
+    query += " ORDER BY s.created_date DESC, s.name ASC LIMIT ?"
+    params.append(page_size)
+
+    cursor = conn.cursor()
+    cursor.execute(query, tuple(params))
+    return cursor.fetchall()
+
+def iter_strategies(conn, search_term="", status_filter="", batch_size=1000):
+    """
+    依序產生所有符合條件的策略紀錄 (以 keyset 分頁逐批讀取，記憶體用量固定)。
+    """
+    after = None
+    while True:
+        records = search_strategies(conn, search_term, status_filter, after, batch_size)
+        yield from records
+        if len(records) < batch_size:
+            return
+        after = (records[-1][3], records[-1][1])
+
+# 驗證日期格式，回傳補零後的 YYYY-MM-DD (strptime 也接受 2024-1-5，依 created_date 排序需要統一格式)
 def validate_date():
     while True:
         date = input(COLOR_BLUE + "   輸入日期 (YYYY-MM-DD): " + COLOR_RESET)
         try:
-            datetime.datetime.strptime(date, "%Y-%m-%d")
-            return date
+            return datetime.datetime.strptime(date.strip(), "%Y-%m-%d").date().isoformat()
         except ValueError:
             print(COLOR_RED + "⚠️ 日期格式錯誤，請重新輸入！" + COLOR_RESET)
 
 # --- 功能實作 ---
 
 # 1. 查看所有策略 (view_all_strategies)
-def view_all_strategies(conn):
+def view_all_strategies(conn, limit=None, page_size=PAGE_SIZE, interactive=True):
+    """
+    以串流方式列出策略：游標每次 fetchmany 一頁，整頁組好後一次寫出，
+    記憶體用量只與 page_size 有關，不會因資料表變大而增加。
+    limit 可限制總筆數；interactive 為 False 時不詢問翻頁，直接輸出全部。
+    """
     print(COLOR_YELLOW + "\n╔══════════════════════════════════════╗" + COLOR_RESET)
     print(COLOR_YELLOW + "║" + COLOR_BOLD + f" {'[ 所有台股策略 ]'.center(36)} " + COLOR_RESET + COLOR_YELLOW + "║" + COLOR_RESET)
     print(COLOR_YELLOW + "╚══════════════════════════════════════╝" + COLOR_RESET)
@@ -58,31 +142,45 @@ def view_all_strategies(conn):
 
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT strategy_id, name, description, created_date, status, win_rate, avg_profit_loss FROM strategies ORDER BY created_date DESC, name ASC")
-        records = cursor.fetchall()
-
-        if not records:
-            print(COLOR_CYAN + "   目前沒有任何策略記錄。\n" + COLOR_RESET)
-            return
+        query = f"SELECT {STRATEGY_COLUMNS} FROM strategies AS s ORDER BY s.created_date DESC, s.name ASC"
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (limit,)
+        cursor.execute(query, params)
 
         header_format = f"{COLOR_BOLD}{COLOR_BLUE}{'ID':<4} {'名稱':<15} {'狀態':<8} {'建立日期':<12} {'盈利率':<8} {'平均盈虧':<10}{COLOR_RESET}"
-        print(header_format)
-        print(COLOR_BLUE + "═" * 70 + COLOR_RESET)
-
-        for record in records:
-            win_rate_str = f"{record[5]*100:.2f}%" if record[5] is not None else "N/A"
-            avg_profit_loss_str = f"{record[6]:.2f}" if record[6] is not None else "N/A"
-            
-            status_color = COLOR_GREEN if record[4] == '運行中' else \
-                           (COLOR_YELLOW if record[4] == '回測中' else \
-                           (COLOR_CYAN if record[4] == '開發中' else COLOR_RED))
-
-            print(f"{record[0]:<4} {record[1]:<15} {status_color}{record[4]:<8}{COLOR_RESET} {record[3]:<12} {win_rate_str:<8} {avg_profit_loss_str:<10}")
-        print(COLOR_BLUE + "═" * 70 + COLOR_RESET)
+        separator = COLOR_BLUE + "═" * 70 + COLOR_RESET
+        page = 1
+        while True:
+            records = cursor.fetchmany(page_size)
+
+            if not records:
+                if page == 1:
+                    print(COLOR_CYAN + "   目前沒有任何策略記錄。\n" + COLOR_RESET)
+                else:
+                    print(separator)
+                return
+
+            lines = [header_format, separator] if page == 1 else []
+            lines.extend(format_strategy_row(record) for record in records)
+            if len(records) < page_size:
+                lines.append(separator)
+                write_lines(lines)
+                return
+            write_lines(lines)
+
+            if interactive:
+                next_page = input(COLOR_BLUE + f"   第 {page} 頁，按 Enter 顯示下一頁，輸入 q 返回選單: " + COLOR_RESET).strip().lower()
+                if next_page == "q":
+                    return
+            page += 1
     except sqlite3.Error as e:
         print(f"{COLOR_RED}查詢策略失敗：{e}{COLOR_RESET}")
     except Exception as e:
         print(f"{COLOR_RED}發生未知錯誤：{e}{COLOR_RESET}")
+    finally:
+        cursor.close()
 
 
 # 2. 新增策略 (add_new_strategy)
@@ -116,8 +214,7 @@ def add_new_strategy(conn):
     print(COLOR_BLUE + "   選擇策略狀態:" + COLOR_RESET)
     print(COLOR_CYAN + "   1. 開發中\n   2. 回測中\n   3. 運行中\n   4. 已停用" + COLOR_RESET)
     status_choice = input(COLOR_BLUE + "   請輸入數字選擇狀態 (預設: 1): " + COLOR_RESET).strip()
-    statuses = {"1": "開發中", "2": "回測中", "3": "運行中", "4": "已停用"}
-    status = statuses.get(status_choice, "開發中")
+    status = STATUSES.get(status_choice, "開發中")
 
     win_rate = None
     while True:
@@ -136,7 +233,7 @@ def add_new_strategy(conn):
 
     avg_profit_loss = None
     while True:
-        profit_loss_input = input(COLOR_BLUE + "   平均單筆盈虧 (數字, 可留空): " + COLOR_RESET).strip()
+        profit_loss_input = input(COLOR_BLUE + "   平均單筆盈虧 (%, 例如 1.5 代表 1.5%, 可留空): " + COLOR_RESET).strip()
         if not profit_loss_input:
             break
         try:
@@ -196,15 +293,58 @@ def stock_individual_query(conn):
         print(COLOR_RED + "錯誤：資料庫連線無效，無法執行此功能。請檢查資料庫連線設定。" + COLOR_RESET)
         return
 
-    stock_code = input(COLOR_BLUE + "   請輸入欲查詢的股票代碼 (例如 2330): " + COLOR_RESET).strip()
-    if not stock_code:
+    import stock_index # 第一次查詢時才建立記憶體索引
+
+    query = input(COLOR_BLUE + "   請輸入股票代碼或名稱 (例如 2330 或 台積): " + COLOR_RESET).strip()
+    if not query:
         print(COLOR_RED + "⚠️ 股票代碼不能為空！" + COLOR_RESET)
         return
-    
-    print(COLOR_CYAN + f"   正在查詢股票代碼 {stock_code} 的資訊...\n" + COLOR_RESET)
-    print(COLOR_CYAN + "   此功能通常需要連接外部股票資料 API。\n" + COLOR_RESET)
-    print(COLOR_CYAN + "   例如，使用 'yfinance' 或台灣證券交易所提供的資料介面。\n" + COLOR_RESET)
-    print(COLOR_CYAN + "   目前僅為示範，無實際數據。\n" + COLOR_RESET)
+
+    try:
+        index = stock_index.get_index(conn)
+        if len(index) == 0:
+            print(COLOR_CYAN + "   尚無股票清單，請先執行 python stock_index.py --update 或 --import stocks.csv。\n" + COLOR_RESET)
+            return
+
+        matches = index.search(query)
+        if not matches:
+            print(COLOR_RED + f"⚠️ 找不到符合 '{query}' 的股票。" + COLOR_RESET)
+            return
+        if len(matches) > 1 and matches[0][0] != query and matches[0][1] != query:
+            print(COLOR_BLUE + "   符合的股票:" + COLOR_RESET)
+            for i, (stock_id, name) in enumerate(matches, start=1):
+                print(COLOR_CYAN + f"   {i}. {stock_id} {name}" + COLOR_RESET)
+            choice = input(COLOR_BLUE + "   請輸入編號 (預設 1): " + COLOR_RESET).strip() or "1"
+            if not choice.isdigit() or not 1 <= int(choice) <= len(matches):
+                print(COLOR_RED + "⚠️ 無效的選擇。" + COLOR_RESET)
+                return
+            stock_id, name = matches[int(choice) - 1]
+        else:
+            stock_id, name = matches[0]
+
+        snapshot = stock_index.get_snapshot(conn, stock_id, refresh=True) # 指標快取只補算新的 K 棒
+    except sqlite3.Error as e:
+        print(f"{COLOR_RED}個股查詢失敗：{e}{COLOR_RESET}")
+        return
+
+    title = f"{stock_id} {name}".strip()
+    if snapshot is None:
+        print_bbs_box(title, ["尚無價格資料。"])
+        return
+
+    def fmt(value, digits=2):
+        return "-" if value is None else f"{value:,.{digits}f}"
+
+    lines = [f"日期：{snapshot['trade_date']}"]
+    change_line = f"收盤：{fmt(snapshot['close'])}"
+    if snapshot["prev_close"]:
+        change = snapshot["close"] - snapshot["prev_close"]
+        change_line += f"  漲跌：{change:+.2f} ({change / snapshot['prev_close']:+.2%})"
+    lines.append(change_line)
+    lines.append(f"開：{fmt(snapshot['open'])}  高：{fmt(snapshot['high'])}  低：{fmt(snapshot['low'])}")
+    lines.append(f"成交量：{fmt(snapshot['volume'], 0)}")
+    lines.append("  ".join(f"{name}：{fmt(snapshot[name])}" for name in stock_index.SNAPSHOT_INDICATORS))
+    print_bbs_box(title, lines)
 
 
 # 5. 資料查詢 (query_data) - 這是策略的篩選查詢
@@ -222,43 +362,38 @@ def query_data(conn):
     print(COLOR_CYAN + "   1. 開發中\n   2. 回測中\n   3. 運行中\n   4. 已停用\n   (留空則不篩選)" + COLOR_RESET)
     status_filter_choice = input(COLOR_BLUE + "   請輸入數字選擇狀態: " + COLOR_RESET).strip()
     
-    statuses_map = {"1": "開發中", "2": "回測中", "3": "運行中", "4": "已停用"}
-    status_filter = statuses_map.get(status_filter_choice, "")
-
-    cursor = conn.cursor()
-    query = "SELECT strategy_id, name, description, created_date, status, win_rate, avg_profit_loss FROM strategies WHERE 1=1"
-    params = []
-
-    if search_term:
-        query += " AND (name LIKE ? OR description LIKE ?)"
-        params.extend([f"%{search_term}%", f"%{search_term}%"])
-    
-    if status_filter:
-        query += " AND status = ?"
-        params.append(status_filter)
-
-    query += " ORDER BY created_date DESC, name ASC"
+    status_filter = STATUSES.get(status_filter_choice, "")
 
     try:
-        cursor.execute(query, tuple(params))
-        filtered_records = cursor.fetchall()
-
-        if not filtered_records:
-            print(COLOR_RED + "⚠️ 找不到符合條件的策略紀錄！" + COLOR_RESET)
-            return
-        
-        print(COLOR_YELLOW + f"\n📜 搜尋結果：" + COLOR_RESET)
-        header_format = f"{COLOR_BOLD}{COLOR_BLUE}{'ID':<4} {'名稱':<15} {'狀態':<8} {'建立日期':<12} {'盈利率':<8} {'平均盈虧':<10}{COLOR_RESET}"
-        print(header_format)
-        print(COLOR_BLUE + "═" * 70 + COLOR_RESET)
-
-        for record in filtered_records:
-            win_rate_str = f"{record[5]*100:.2f}%" if record[5] is not None else "N/A"
-            avg_profit_loss_str = f"{record[6]:.2f}" if record[6] is not None else "N/A"
-            status_color = COLOR_GREEN if record[4] == '運行中' else (COLOR_YELLOW if record[4] == '回測中' else (COLOR_CYAN if record[4] == '開發中' else COLOR_RED))
-            print(f"{record[0]:<4} {record[1]:<15} {status_color}{record[4]:<8}{COLOR_RESET} {record[3]:<12} {win_rate_str:<8} {avg_profit_loss_str:<10}")
-        
-        print(COLOR_BLUE + "═" * 70 + COLOR_RESET)
+        after = None
+        page = 1
+        while True:
+            filtered_records = search_strategies(conn, search_term, status_filter, after)
+
+            if not filtered_records:
+                if page == 1:
+                    print(COLOR_RED + "⚠️ 找不到符合條件的策略紀錄！" + COLOR_RESET)
+                else:
+                    print(COLOR_CYAN + "   已顯示全部搜尋結果。" + COLOR_RESET)
+                return
+
+            if page == 1:
+                print(COLOR_YELLOW + f"\n📜 搜尋結果：" + COLOR_RESET)
+            header_format = f"{COLOR_BOLD}{COLOR_BLUE}{'ID':<4} {'名稱':<15} {'狀態':<8} {'建立日期':<12} {'盈利率':<8} {'平均盈虧':<10}{COLOR_RESET}"
+            lines = [header_format, COLOR_BLUE + "═" * 70 + COLOR_RESET]
+            lines.extend(format_strategy_row(record) for record in filtered_records)
+            lines.append(COLOR_BLUE + "═" * 70 + COLOR_RESET)
+            write_lines(lines)
+
+            if len(filtered_records) < PAGE_SIZE:
+                return
+
+            next_page = input(COLOR_BLUE + f"   第 {page} 頁，按 Enter 顯示下一頁，輸入 q 返回選單: " + COLOR_RESET).strip().lower()
+            if next_page == "q":
+                return
+            last_record = filtered_records[-1]
+            after = (last_record[3], last_record[1])
+            page += 1
 
     except sqlite3.Error as e:
         print(f"{COLOR_RED}搜尋策略失敗：{e}{COLOR_RESET}")
@@ -266,7 +401,12 @@ def query_data(conn):
         print(f"{COLOR_RED}發生未知錯誤：{e}{COLOR_RESET}")
 
 # 6. 顯示圖表 (plot_strategy_results)
-def show_charts(conn):
+def show_charts(conn, output_dir=None, fmt="png", open_files=None):
+    """
+    以非互動方式 (Agg) 將策略圖表輸出成 PNG/SVG 檔案。
+    資料未變更時直接使用快取的圖檔；open_files 為 True 時以系統預設程式開啟
+    (預設僅在 Windows 桌面環境開啟，伺服器上只輸出檔案)。
+    """
     print(COLOR_YELLOW + "\n╔══════════════════════════════════════╗" + COLOR_RESET)
     print(COLOR_YELLOW + "║" + COLOR_BOLD + f" {'[ 策略盈利率分佈與單獨表現 ]'.center(36)} " + COLOR_RESET + COLOR_YELLOW + "║" + COLOR_RESET)
     print(COLOR_YELLOW + "╚══════════════════════════════════════╝" + COLOR_RESET)
@@ -275,63 +415,110 @@ def show_charts(conn):
         print(COLOR_RED + "錯誤：資料庫連線無效，無法繪製圖表。請檢查資料庫連線設定。" + COLOR_RESET)
         return
 
-    cursor = conn.cursor()
     try:
-        # 在函式內部匯入 matplotlib.pyplot 和 pandas
-        # 這是為了解決循環引用問題，確保它們在需要時才被載入
-        import pandas as pd
-        import matplotlib.pyplot as plt
-        import matplotlib # 雖然已在檔頭，但為了安全再次確保
-
-        matplotlib.use("TkAgg") # 確保繪圖後端在這裡設定
-
-        cursor.execute("SELECT name, win_rate, avg_profit_loss FROM strategies WHERE win_rate IS NOT NULL AND avg_profit_loss IS NOT NULL")
-        results = cursor.fetchall()
-
+        # 各狀態摘要直接讀取彙總表 (strategy_stats)，不掃描整個策略資料表
+        summary = database_operations.get_strategy_summary(conn)
+        if summary:
+            lines = [f"{COLOR_BOLD}{COLOR_BLUE}{'狀態':<8} {'策略數':<8} {'平均盈利率':<10} {'平均盈虧':<10}{COLOR_RESET}"]
+            for status, count, avg_win_rate, avg_profit_loss in summary:
+                win_rate_str = f"{avg_win_rate*100:.2f}%" if avg_win_rate is not None else "N/A"
+                avg_profit_loss_str = f"{avg_profit_loss:.2f}" if avg_profit_loss is not None else "N/A"
+                lines.append(f"{STATUS_COLORS.get(status, COLOR_RED)}{status:<8}{COLOR_RESET} {count:<8} {win_rate_str:<10} {avg_profit_loss_str:<10}")
+            write_lines(lines)
+
+        import chart_renderer
+
+        results = chart_renderer.render_charts(conn, output_dir or chart_renderer.CHART_FOLDER, fmt)
         if not results:
             print(COLOR_RED + "⚠️ 沒有可供繪製圖表的策略記錄 (需有盈利率和平均盈虧數據)！" + COLOR_RESET)
             return
-        
-        strategy_names = [row[0] for row in results]
-        win_rates = [row[1] for row in results]
-        avg_profit_losses = [row[2] for row in results]
-
-        # --- 繪製盈利率分佈直方圖 ---
-        plt.figure(figsize=(10, 6))
-        pd.Series(win_rates).hist(bins=5, edgecolor='black', color='lightgreen', alpha=0.7)
-        plt.xlabel("回測盈利率 (0-1之間)")
-        plt.ylabel("策略數量")
-        plt.title("策略回測盈利率分佈直方圖")
-        plt.grid(axis='y', alpha=0.75)
-        plt.xticks([i/10 for i in range(11)])
-        plt.tight_layout()
-        plt.show()
-
-        # --- 繪製各策略盈利率條形圖 ---
-        if strategy_names:
-            plt.figure(figsize=(12, 7))
-            plt.bar(strategy_names, win_rates, color='teal')
-            plt.xlabel("策略名稱")
-            plt.ylabel("回測盈利率")
-            plt.title("各策略回測盈利率")
-            plt.xticks(rotation=45, ha='right')
-            plt.tight_layout()
-            plt.show()
-
-        # --- 繪製各策略平均單筆盈虧條形圖 ---
-        if strategy_names:
-            plt.figure(figsize=(12, 7))
-            colors = ['green' if apl >= 0 else 'red' for apl in avg_profit_losses]
-            plt.bar(strategy_names, avg_profit_losses, color=colors)
-            plt.xlabel("策略名稱")
-            plt.ylabel("平均單筆盈虧")
-            plt.title("各策略平均單筆盈虧")
-            plt.xticks(rotation=45, ha='right')
-            plt.axhline(0, color='grey', linestyle='--', linewidth=0.8)
-            plt.tight_layout()
-            plt.show()
+
+        for chart_name, path, cached in results:
+            source = "快取" if cached else "新繪製"
+            print(COLOR_GREEN + f"   [{source}] {chart_name}: {path}" + COLOR_RESET)
+
+        if open_files is None:
+            open_files = hasattr(os, "startfile")
+        if open_files:
+            for _, path, _ in results:
+                os.startfile(path)
 
     except ImportError as ie:
-        print(f"{COLOR_RED}錯誤：繪圖所需模組未能匯入。請確認已安裝 pandas 和 matplotlib。詳細: {ie}{COLOR_RESET}")
+        print(f"{COLOR_RED}錯誤：繪圖所需模組未能匯入。請確認已安裝 matplotlib。詳細: {ie}{COLOR_RESET}")
     except Exception as e:
-        print(f"{COLOR_RED}繪製策略結果圖表失敗：{e}{COLOR_RESET}")
\ No newline at end of file
+        print(f"{COLOR_RED}繪製策略結果圖表失敗：{e}{COLOR_RESET}")
+
+# 7. 策略回測 (backtest_strategies)
+def backtest_strategies(conn):
+    print(COLOR_YELLOW + "\n╔══════════════════════════════════════╗" + COLOR_RESET)
+    print(COLOR_YELLOW + "║" + COLOR_BOLD + f" {'[ 策略回測 ]'.center(36)} " + COLOR_RESET + COLOR_YELLOW + "║" + COLOR_RESET)
+    print(COLOR_YELLOW + "╚══════════════════════════════════════╝" + COLOR_RESET)
+
+    if conn is None:
+        print(COLOR_RED + "錯誤：資料庫連線無效，無法執行回測。請檢查資料庫連線設定。" + COLOR_RESET)
+        return
+
+    try:
+        # 回測引擎依賴 numpy，需要時才載入
+        import backtest_engine
+    except ImportError as ie:
+        print(f"{COLOR_RED}錯誤：回測所需模組未能匯入。請確認已安裝 numpy。詳細: {ie}{COLOR_RESET}")
+        return
+
+    print(COLOR_CYAN + "   1. 設定策略回測規則\n   2. 執行所有已設定規則的回測\n   3. 參數掃描 (多核心網格搜尋)" + COLOR_RESET)
+    choice = input(COLOR_BLUE + "   請選擇 (1-3): " + COLOR_RESET).strip()
+
+    try:
+        if choice == "1":
+            strategy_id = int(input(COLOR_BLUE + "   策略 ID: " + COLOR_RESET).strip())
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM strategies WHERE strategy_id = ?", (strategy_id,))
+            if cursor.fetchone()[0] == 0:
+                print(COLOR_RED + "⚠️ 找不到此策略 ID！" + COLOR_RESET)
+                return
+            print(COLOR_CYAN + "   規則類型：1. 均線交叉 (ma_cross)  2. 通道突破 (breakout)" + COLOR_RESET)
+            rule_choice = input(COLOR_BLUE + "   請輸入數字選擇規則 (預設: 1): " + COLOR_RESET).strip()
+            if rule_choice == "2":
+                rule_type = "breakout"
+                lookback = int(input(COLOR_BLUE + "   突破天數 (預設 20): " + COLOR_RESET).strip() or 20)
+                exit_lookback = int(input(COLOR_BLUE + "   出場天數 (預設 10): " + COLOR_RESET).strip() or 10)
+                params = {"lookback": lookback, "exit_lookback": exit_lookback}
+            else:
+                rule_type = "ma_cross"
+                short = int(input(COLOR_BLUE + "   短均線天數 (預設 5): " + COLOR_RESET).strip() or 5)
+                long = int(input(COLOR_BLUE + "   長均線天數 (預設 20): " + COLOR_RESET).strip() or 20)
+                params = {"short": short, "long": long}
+            targets_input = input(COLOR_BLUE + "   標的股票代碼 (以逗號分隔, 留空則為全部股票): " + COLOR_RESET).strip()
+            targets = [t.strip() for t in targets_input.split(",") if t.strip()]
+            backtest_engine.save_strategy_rule(conn, strategy_id, rule_type, params, targets)
+            conn.commit()
+            print(COLOR_GREEN + f"✅ 策略 {strategy_id} 的回測規則已設定！{COLOR_RESET}")
+        elif choice == "2":
+            results = backtest_engine.run_strategy_backtests(conn)
+            if not results:
+                print(COLOR_RED + "⚠️ 沒有已設定回測規則的策略！" + COLOR_RESET)
+                return
+            for strategy_id, metrics in results.items():
+                win_rate_str = f"{metrics['win_rate']*100:.2f}%" if metrics["win_rate"] is not None else "N/A"
+                avg_profit_loss_str = f"{metrics['avg_profit_loss']:.2f}%" if metrics["avg_profit_loss"] is not None else "N/A"
+                print(f"   策略 {strategy_id}: 交易 {metrics['trades']} 筆, 盈利率 {win_rate_str}, 平均單筆報酬 {avg_profit_loss_str}")
+            print(COLOR_GREEN + "✅ 回測完成，結果已寫回策略資料表。" + COLOR_RESET)
+        elif choice == "3":
+            import parameter_sweep
+            strategy_id = int(input(COLOR_BLUE + "   策略 ID: " + COLOR_RESET).strip())
+            rule = backtest_engine.load_strategy_rule(conn, strategy_id)
+            rule_type = rule[0] if rule else "ma_cross"
+            param_list = parameter_sweep.grid_params(parameter_sweep.DEFAULT_GRIDS[rule_type], rule_type)
+            print(COLOR_CYAN + f"   以 {rule_type} 規則掃描 {len(param_list)} 組參數..." + COLOR_RESET)
+            sweep_id, results, throughput = parameter_sweep.run_parameter_sweep(conn, strategy_id, rule_type, param_list)
+            for params, metrics in results[:5]:
+                win_rate_str = f"{metrics['win_rate']*100:.2f}%" if metrics["win_rate"] is not None else "N/A"
+                avg_profit_loss_str = f"{metrics['avg_profit_loss']:.2f}%" if metrics["avg_profit_loss"] is not None else "N/A"
+                print(f"   {params}: 交易 {metrics['trades']} 筆, 盈利率 {win_rate_str}, 平均單筆報酬 {avg_profit_loss_str}")
+            print(COLOR_GREEN + f"✅ 掃描 {sweep_id} 完成 ({throughput:.1f} 次回測/秒)，全部結果已記錄於 strategy_runs。" + COLOR_RESET)
+        else:
+            print(COLOR_RED + "⚠️ 無效選擇。" + COLOR_RESET)
+    except ValueError as e:
+        print(f"{COLOR_RED}⚠️ 輸入錯誤：{e}{COLOR_RESET}")
+    except sqlite3.Error as e:
+        print(f"{COLOR_RED}回測失敗：{e}{COLOR_RESET}")
@@ -0,0 +1,299 @@
+import argparse
+import asyncio
+import datetime
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import connection_manager
+
+# --- 即時報價 (tick) 匯入流程 ---
+# 報價來源 (檔案重播或本機 socket) -> 有上限的佇列 -> 記憶體中彙整為 1 分鐘與日 K 棒
+# -> 每 N 秒批次寫入 stock_bars_1m 與 stock_prices。
+# 每行報價格式：時間,股票代碼,成交價,成交量
+#   時間可為 ISO 格式 (2024-05-02T09:00:01.250) 或 Unix 秒數。
+# 用法：
+#   python tick_ingestion.py --generate 1000000 ticks.csv      (產生測試資料)
+#   python tick_ingestion.py --replay ticks.csv                (檔案重播)
+#   python tick_ingestion.py --listen 127.0.0.1:9000           (以 socket 模擬交易所報價)
+
+DEFAULT_FLUSH_INTERVAL = 2.0 # 每幾秒寫入一次資料庫
+QUEUE_MAX_BATCHES = 64 # 佇列最多暫存的報價批次數，滿了會讓來源端等待 (背壓)
+READ_BATCH_LINES = 5000 # 檔案重播時每批讀取的行數
+SOCKET_READ_BYTES = 256 * 1024 # socket 每次讀取的位元組數
+
+MINUTE_UPSERT_SQL = (
+    "INSERT INTO stock_bars_1m (stock_id, bar_time, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (stock_id, bar_time) DO UPDATE SET high = MAX(high, excluded.high), low = MIN(low, excluded.low), "
+    "close = excluded.close, volume = volume + excluded.volume"
+)
+
+# 日 K 棒以增量方式合併：成交量寫入的是上次寫入後新增的量，程式重啟也不會重複計算
+DAILY_UPSERT_SQL = (
+    "INSERT INTO stock_prices (stock_id, trade_date, open, high, low, close, volume) VALUES (?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (stock_id, trade_date) DO UPDATE SET open = COALESCE(open, excluded.open), "
+    "high = MAX(COALESCE(high, excluded.high), excluded.high), low = MIN(COALESCE(low, excluded.low), excluded.low), "
+    "close = excluded.close, volume = COALESCE(volume, 0) + excluded.volume"
+)
+
+def parse_tick(line):
+    """
+    解析一行報價，回傳 (股票代碼, 分鐘鍵 'YYYY-MM-DD HH:MM', 成交價, 成交量)；格式錯誤時回傳 None。
+    """
+    parts = line.split(",")
+    if len(parts) < 4:
+        return None
+    ts = parts[0].strip()
+    try:
+        price = float(parts[2])
+        volume = int(parts[3])
+    except ValueError:
+        return None
+    if "-" in ts:
+        minute = ts[:16].replace("T", " ")
+    else:
+        try:
+            minute = datetime.datetime.fromtimestamp(float(ts)).strftime("%Y-%m-%d %H:%M")
+        except ValueError:
+            return None
+    return parts[1].strip(), minute, price, volume
+
+class BarAggregator:
+    """
+    在記憶體中把報價彙整為 1 分鐘與日 K 棒。
+    記憶體只保留「尚未完成的分鐘 K 棒」與「當日 K 棒」，數量與股票數成正比，與報價數無關。
+    """
+
+    def __init__(self):
+        self.open_minutes = {} # stock_id -> [minute, open, high, low, close, volume]
+        self.closed_minutes = [] # 已完成、待寫入的分鐘 K 棒
+        self.daily = {} # (stock_id, date) -> [open, high, low, close, 未寫入的成交量]
+        self.changed_days = {} # 上次寫入後有新報價的日 K 棒鍵 (當作保持順序的集合)
+        self.watermark = "" # 目前看到的最新分鐘
+        self.ticks = 0
+
+    def add(self, stock_id, minute, price, volume):
+        self.ticks += 1
+        if minute > self.watermark:
+            self.watermark = minute
+
+        bar = self.open_minutes.get(stock_id)
+        if bar is None or bar[0] != minute:
+            if bar is not None:
+                self.closed_minutes.append((stock_id, *bar))
+            self.open_minutes[stock_id] = [minute, price, price, price, price, volume]
+        else:
+            if price > bar[2]:
+                bar[2] = price
+            elif price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+            bar[5] += volume
+
+        key = (stock_id, minute[:10])
+        self.changed_days[key] = None
+        day = self.daily.get(key)
+        if day is None:
+            self.daily[key] = [price, price, price, price, volume]
+        else:
+            if price > day[1]:
+                day[1] = price
+            elif price < day[2]:
+                day[2] = price
+            day[3] = price
+            day[4] += volume
+
+    def drain(self, final=False):
+        """
+        取出待寫入的資料 (minute_rows, daily_rows)。
+        分鐘 K 棒：已完成的，以及早於最新分鐘的未完成 K 棒 (交易清淡的股票)；final 時全部取出。
+        日 K 棒：只回傳上次取出後有新報價的 K 棒 (目前狀態與新增成交量)，並把新增量歸零；
+        沒有變動的股票不會重新 UPSERT，也就不會觸發 stock_prices 上的指標快取失效觸發器。
+        非當日的日 K 棒寫入後即移除。
+        """
+        minute_rows = self.closed_minutes
+        self.closed_minutes = []
+        for stock_id in list(self.open_minutes):
+            bar = self.open_minutes[stock_id]
+            if final or bar[0] < self.watermark:
+                minute_rows.append((stock_id, *bar))
+                del self.open_minutes[stock_id]
+
+        today = self.watermark[:10]
+        daily_rows = []
+        for key in self.changed_days:
+            day = self.daily[key]
+            daily_rows.append((key[0], key[1], day[0], day[1], day[2], day[3], day[4]))
+            day[4] = 0
+        self.changed_days = {}
+        for key in list(self.daily):
+            if final or key[1] < today:
+                del self.daily[key]
+        return minute_rows, daily_rows
+
+def write_bars(manager, minute_rows, daily_rows):
+    """
+    在單一交易中批次寫入分鐘與日 K 棒 (於寫入執行緒中執行)。
+    """
+    with manager.write() as conn:
+        conn.executemany(MINUTE_UPSERT_SQL, minute_rows)
+        conn.executemany(DAILY_UPSERT_SQL, daily_rows)
+
+class TickIngestor:
+    """
+    串接報價來源、彙整器與資料庫寫入的匯入流程。
+    """
+
+    def __init__(self, manager, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.manager = manager
+        self.flush_interval = flush_interval
+        self.queue = asyncio.Queue(maxsize=QUEUE_MAX_BATCHES)
+        self.aggregator = BarAggregator()
+        self.executor = ThreadPoolExecutor(max_workers=1) # 單一寫入者
+        self.rejected = 0
+        self.bars_written = 0
+
+    async def submit(self, lines):
+        """
+        送入一批報價原始行；佇列已滿時等待 (背壓)。
+        """
+        await self.queue.put(lines)
+
+    async def _consume(self):
+        while True:
+            lines = await self.queue.get()
+            if lines is None:
+                return
+            add = self.aggregator.add
+            for line in lines:
+                tick = parse_tick(line)
+                if tick is None:
+                    self.rejected += 1
+                else:
+                    add(*tick)
+
+    async def _flush(self, final=False):
+        minute_rows, daily_rows = self.aggregator.drain(final)
+        if minute_rows or daily_rows:
+            await asyncio.get_running_loop().run_in_executor(self.executor, write_bars, self.manager, minute_rows, daily_rows)
+            self.bars_written += len(minute_rows)
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
+
+    async def run(self, source):
+        """
+        執行匯入流程直到來源結束，回傳 (報價數, 每秒報價數)。
+        """
+        started = time.perf_counter()
+        consumer = asyncio.create_task(self._consume())
+        flusher = asyncio.create_task(self._flush_periodically())
+        try:
+            await source(self)
+            await self.queue.put(None)
+            await consumer
+        finally:
+            flusher.cancel()
+            await self._flush(final=True)
+            self.executor.shutdown(wait=True)
+        elapsed = time.perf_counter() - started
+        return self.aggregator.ticks, self.aggregator.ticks / elapsed if elapsed > 0 else 0.0
+
+# --- 報價來源 ---
+def file_replay_source(path):
+    """
+    以最快速度重播報價檔 (每次送出 READ_BATCH_LINES 行)。
+    """
+    async def source(ingestor):
+        with open(path, encoding="utf-8") as f:
+            batch = []
+            for line in f:
+                batch.append(line)
+                if len(batch) >= READ_BATCH_LINES:
+                    await ingestor.submit(batch)
+                    batch = []
+            if batch:
+                await ingestor.submit(batch)
+    return source
+
+def socket_source(host, port):
+    """
+    在本機開啟 TCP 埠模擬交易所報價：每個連線逐行送入報價，按 Ctrl+C 結束。
+    """
+    async def source(ingestor):
+        async def handle(reader, writer):
+            # 一次讀取已到達的所有資料再切行送出，減少逐行 await 與佇列操作
+            remainder = ""
+            while True:
+                data = await reader.read(SOCKET_READ_BYTES)
+                if not data:
+                    break
+                lines = (remainder + data.decode("utf-8")).split("\n")
+                remainder = lines.pop()
+                if lines:
+                    await ingestor.submit(lines)
+            if remainder:
+                await ingestor.submit([remainder])
+            writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        print(f"等待報價連線：{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+    return source
+
+def generate_ticks(path, count, stocks=200, start="2024-05-02T09:00:00", ticks_per_second=2000):
+    """
+    產生隨機漫步的測試報價檔。
+    """
+    rng = random.Random(0)
+    prices = {str(1101 + i): 100.0 for i in range(stocks)}
+    ids = list(prices)
+    t0 = datetime.datetime.fromisoformat(start)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            stock_id = ids[rng.randrange(stocks)]
+            prices[stock_id] *= 1 + rng.gauss(0, 0.0005)
+            ts = t0 + datetime.timedelta(seconds=i / ticks_per_second)
+            f.write(f"{ts.isoformat(timespec='milliseconds')},{stock_id},{prices[stock_id]:.2f},{rng.randint(1, 50)}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="即時報價匯入 (彙整為 1 分鐘與日 K 棒)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--replay", metavar="FILE", help="重播報價檔")
+    group.add_argument("--listen", metavar="HOST:PORT", help="以本機 socket 接收報價")
+    group.add_argument("--generate", nargs=2, metavar=("COUNT", "FILE"), help="產生測試報價檔")
+    parser.add_argument("--db", default=None, help="資料庫路徑")
+    parser.add_argument("--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL, help="寫入資料庫的間隔秒數")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_ticks(args.generate[1], int(args.generate[0]))
+        print(f"已產生 {args.generate[0]} 筆報價：{args.generate[1]}")
+        return
+
+    if args.replay:
+        source = file_replay_source(args.replay)
+    else:
+        host, port = args.listen.rsplit(":", 1)
+        source = socket_source(host, int(port))
+
+    manager = connection_manager.ConnectionManager(args.db, pool_size=1)
+    try:
+        ingestor = TickIngestor(manager, args.flush_interval)
+        try:
+            ticks, rate = asyncio.run(ingestor.run(source))
+        except KeyboardInterrupt:
+            print("匯入已中斷。")
+            return
+        print(f"✅ 已處理 {ticks} 筆報價 ({rate:,.0f} 筆/秒)，寫入 {ingestor.bars_written} 根分鐘 K 棒，略過 {ingestor.rejected} 行格式錯誤資料。")
+    finally:
+        manager.close()
+
+if __name__ == "__main__":
+    main()
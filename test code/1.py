@@ -1,27 +1,27 @@
-import pandas as pd
 import matplotlib.pyplot as plt
-import os
-import datetime
+import sys
 from termcolor import colored
+from expense_store import ExpenseStore, parse_date
 
 # 記帳檔案名稱
 FILE_NAME = "expenses.csv"
+PAGE_SIZE = 20  # 顯示記錄時每頁的筆數
 
-# 檢查是否已有記錄文件
-if os.path.exists(FILE_NAME):
-    df = pd.read_csv(FILE_NAME)
-    if "ID" not in df.columns:
-        df.insert(0, "ID", range(1, len(df) + 1))  # 確保有 ID 欄位
-else:
-    df = pd.DataFrame(columns=["ID", "日期", "類別", "金額", "備註"])
+# 金額顏色的 ANSI 起始與結束碼 (由 termcolor 產生，設定 NO_COLOR 等環境變數時為空字串)
+RED_START, _, COLOR_END = colored("\0", "red").partition("\0")
+YELLOW_START = colored("\0", "yellow").partition("\0")[0]
 
-# 驗證日期格式
-def validate_date():
+# 讀取快照並重播之後的日誌 (新增 / 刪除只附加到日誌，不再重寫整個 CSV)
+store = ExpenseStore(FILE_NAME)
+
+# 驗證日期格式；allow_empty 為 True 時可留空 (回傳 None)
+def validate_date(prompt="輸入日期 (YYYY-MM-DD): ", allow_empty=False):
     while True:
-        date = input("輸入日期 (YYYY-MM-DD): ")
+        date = input(prompt).strip()
+        if not date and allow_empty:
+            return None
         try:
-            datetime.datetime.strptime(date, "%Y-%m-%d")
-            return date
+            return parse_date(date)
         except ValueError:
             print("⚠️ 日期格式錯誤，請重新輸入！")
 
@@ -43,53 +43,67 @@ def add_expense():
     
     note = input("備註 (可留空): ")
     
-    global df
-    new_id = int(df["ID"].max()) + 1 if not df.empty else 1
-    new_data = pd.DataFrame([[new_id, date, category, amount, note]], columns=df.columns)
-    df = pd.concat([df, new_data], ignore_index=True)
-    df.to_csv(FILE_NAME, index=False)
+    new_id = store.add(date, category, amount, note)
     print(f"✅ 記錄成功！編號: {new_id}")
 
 # 刪除記錄
 def delete_expense():
-    global df
     show_expenses()
     try:
         delete_id = int(input("輸入要刪除的記錄 ID: "))
-        if delete_id in df["ID"].values:
-            df = df[df["ID"] != delete_id]
-            df.to_csv(FILE_NAME, index=False)
+        if store.delete(delete_id):
             print(f"✅ 記錄 {delete_id} 已刪除！")
         else:
             print("⚠️ 無效的 ID，請確認後再試！")
     except ValueError:
         print("⚠️ 請輸入有效的數字 ID！")
 
-# 顯示記錄
-def show_expenses():
-    print("\n📜 所有記帳紀錄：")
-    for _, row in df.iterrows():
-        display_text = f"ID: {row['ID']} | 日期: {row['日期']} | 類別: {row['類別']} | 金額: {row['金額']} | 備註: {row['備註']}"
-        if row["金額"] > 1000:
-            print(colored(display_text, "red"))
-        elif row["金額"] > 500:
-            print(colored(display_text, "yellow"))
-        else:
-            print(display_text)
+# 一次格式化一整頁的記錄 (欄位字串相加)，金額 > 1000 紅色、> 500 黃色
+def format_page(page):
+    text = ("ID: " + page["ID"].astype(str) + " | 日期: " + page.index.to_series().astype(str)
+            + " | 類別: " + page["類別"].astype(str) + " | 金額: " + page["金額"].astype(str)
+            + " | 備註: " + page["備註"].astype(str))
+    red = page["金額"] > 1000
+    yellow = (page["金額"] > 500) & ~red
+    text = text.mask(red, RED_START + text + COLOR_END).mask(yellow, YELLOW_START + text + COLOR_END)
+    return "\n".join(text) + "\n"
+
+# 詢問顯示條件 (皆可留空)
+def ask_filters():
+    start = validate_date("起始日期 (YYYY-MM-DD，可留空): ", allow_empty=True)
+    end = validate_date("結束日期 (YYYY-MM-DD，可留空): ", allow_empty=True)
+    category = input("類別 (可留空): ").strip() or None
+    return start, end, category
+
+# 顯示記錄 (可依日期區間與類別篩選，分頁顯示)
+def show_expenses(start=None, end=None, category=None):
+    start = parse_date(start) if start else None
+    end = parse_date(end) if end else None
+    records = store.by_date().loc[start:end]  # 日期索引已排序，直接切出區間
+    if category:
+        records = records[records["類別"] == category]
+    print(f"\n📜 所有記帳紀錄：共 {len(records)} 筆")
+    pages = -(-len(records) // PAGE_SIZE)
+    for page in range(pages):
+        sys.stdout.write(format_page(records.iloc[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]))  # 每頁只寫出一次
+        sys.stdout.flush()
+        if page + 1 < pages:
+            if input(f"-- 第 {page + 1}/{pages} 頁，Enter 下一頁，q 結束 -- ").strip().lower() == "q":
+                break
 
 # 顯示每日總支出
 def daily_summary():
-    if df.empty:
+    if len(store) == 0:
         print("⚠️ 沒有記錄。"); return
-    summary = df.groupby("日期")["金額"].sum()
+    summary = store.daily_totals()  # 新增 / 刪除時已增量更新
     print("\n📊 每日總支出：")
     print(summary)
 
 # 分類支出圖表
 def category_analysis():
-    if df.empty:
+    if len(store) == 0:
         print("⚠️ 沒有記錄。"); return
-    df.groupby("類別")["金額"].sum().plot(kind="pie", autopct="%1.1f%%")
+    store.category_totals().plot(kind="pie", autopct="%1.1f%%")
     plt.title("📊 支出類別分析")
     plt.ylabel("")
     plt.show()
@@ -109,7 +123,7 @@ def main():
         if choice == "1":
             add_expense()
         elif choice == "2":
-            show_expenses()
+            show_expenses(*ask_filters())
         elif choice == "3":
             daily_summary()
         elif choice == "4":
@@ -117,6 +131,7 @@ def main():
         elif choice == "5":
             delete_expense()
         elif choice == "6":
+            store.close()
             print("👋 感謝使用記帳系統！"); break
         else:
             print("⚠️ 無效選擇，請輸入 1-6。")
@@ -0,0 +1,247 @@
+import csv
+import datetime
+import json
+import os
+import threading
+
+import pandas as pd
+
+# 記帳資料的儲存引擎 (只附加的日誌 + 快照)
+#   - 快照：expenses.csv (與原本的記錄文件格式相同，舊資料可直接沿用)
+#   - 日誌：expenses.csv.journal，每次新增 / 刪除只在檔尾附加一行 JSON (刪除為 tombstone)
+#   - 日誌累積 COMPACT_EVERY 行後，在背景執行緒把目前的記錄寫成新快照，並只保留快照之後的日誌
+#   - 啟動時讀取快照，再重播快照之後的日誌；重播是冪等的 (同 ID 新增會覆蓋、刪除不存在的 ID 忽略)，
+#     即使壓縮途中中斷，重播舊日誌也不會產生重複記錄
+#   - 每日與每類別的金額合計在新增 / 刪除時增量更新，並與快照一起存到 expenses.csv.totals.json；
+#     快照未變動時啟動直接讀取合計，不必重新加總所有記錄
+#   - 日期一律存成補零的 YYYY-MM-DD (舊版可能存了 2024-1-5)，依日期排序、切片與合計的鍵才會一致
+
+COLUMNS = ["ID", "日期", "類別", "金額", "備註"]
+COMPACT_EVERY = 500  # 日誌累積幾行後壓縮成快照
+
+# 檢查日期並統一成 YYYY-MM-DD (補零)，格式錯誤時拋出 ValueError
+# strptime 也接受 2024-1-5，補零後字串比較 (排序、.loc 區間) 才會與日期順序一致
+def parse_date(date):
+    return datetime.datetime.strptime(date.strip(), "%Y-%m-%d").date().isoformat()
+
+# 讀取既有資料時使用：無法解析的日期保留原樣，不讓一筆舊資料阻止啟動
+def _normalize_date(date):
+    try:
+        return parse_date(date)
+    except ValueError:
+        return date
+
+class ExpenseStore:
+    def __init__(self, file_name, compact_every=COMPACT_EVERY):
+        self.file_name = file_name
+        self.journal_name = file_name + ".journal"
+        self.totals_name = file_name + ".totals.json"
+        self.compact_every = compact_every
+        self.records = {}  # ID -> 記錄 (dict)，保持新增順序
+        self.next_id = 1
+        self.daily = {}  # 日期 -> [金額合計, 筆數]
+        self.category = {}  # 類別 -> [金額合計, 筆數]
+        self._frame = None
+        self._by_date = None
+        self._lock = threading.RLock()
+        self._compactor = None
+        self._load_snapshot()
+        self._pending = self._replay_journal()
+        self._journal = open(self.journal_name, "ab")
+
+    # 讀取快照 (相容原本以 pandas 寫出的 expenses.csv，沒有 ID 欄位時依序編號)
+    def _load_snapshot(self):
+        if not os.path.exists(self.file_name):
+            return
+        with open(self.file_name, newline="", encoding="utf-8") as f:
+            for i, row in enumerate(csv.DictReader(f), start=1):
+                self._apply({
+                    "op": "add",
+                    "ID": int(float(row["ID"])) if row.get("ID") else i,
+                    "日期": row["日期"],
+                    "類別": row["類別"],
+                    "金額": float(row["金額"]),
+                    "備註": row.get("備註") or "",
+                }, totals=False)
+        if not self._load_totals():
+            for record in self.records.values():
+                self._count(record, 1)
+
+    def _snapshot_fingerprint(self):
+        stat = os.stat(self.file_name)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    # 讀取與快照一起保存的合計；快照已被改動、沒有合計檔或合計檔損毀時回傳 False (改為重新加總)
+    def _load_totals(self):
+        if not os.path.exists(self.totals_name):
+            return False
+        try:
+            with open(self.totals_name, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("snapshot") != self._snapshot_fingerprint():
+                return False
+            daily, category = saved["daily"], saved["category"]
+            if any(_normalize_date(date) != date for date in daily):
+                return False # 舊版以未補零日期為鍵的合計，改為重新加總
+        except (ValueError, KeyError, AttributeError, TypeError):
+            return False
+        self.daily, self.category = daily, category
+        return True
+
+    # 以增量方式更新每日與每類別合計，sign 為 1 (新增) 或 -1 (刪除)
+    def _count(self, record, sign):
+        for totals, key in ((self.daily, record["日期"]), (self.category, record["類別"])):
+            entry = totals.setdefault(key, [0.0, 0])
+            entry[0] += sign * record["金額"]
+            entry[1] += sign
+            if entry[1] == 0:
+                del totals[key]
+
+    # 重播快照之後的日誌，回傳日誌行數
+    # 只有最後一行沒有換行 (寫到一半時程式中斷) 才截掉；其他損毀的行直接報錯，不刪除任何資料
+    def _replay_journal(self):
+        if not os.path.exists(self.journal_name):
+            return 0
+        count, good = 0, 0
+        with open(self.journal_name, "rb") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                    self._apply(entry)
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"日誌 {self.journal_name} 第 {line_no} 行損毀，請手動修復後再啟動：{e}") from None
+                good += len(line)
+                count += 1
+        if good != os.path.getsize(self.journal_name):
+            with open(self.journal_name, "r+b") as f:
+                f.truncate(good)
+        return count
+
+    def _apply(self, entry, totals=True):
+        record_id = int(entry["ID"])
+        old = self.records.pop(record_id, None)
+        if old is not None and totals:
+            self._count(old, -1)
+        if entry["op"] == "add":
+            record = self.records[record_id] = {column: entry[column] for column in COLUMNS}
+            record["日期"] = _normalize_date(record["日期"])
+            self.next_id = max(self.next_id, record_id + 1)
+            if totals:
+                self._count(record, 1)
+        self._frame = None
+        self._by_date = None
+
+    def _append(self, entry):
+        self._journal.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._apply(entry)
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            self.compact()
+
+    # 新增記錄，回傳新的 ID
+    def add(self, date, category, amount, note=""):
+        with self._lock:
+            record_id = self.next_id
+            self._append({"op": "add", "ID": record_id, "日期": date, "類別": category, "金額": float(amount), "備註": note})
+            return record_id
+
+    # 刪除記錄，ID 不存在時回傳 False
+    def delete(self, record_id):
+        with self._lock:
+            if record_id not in self.records:
+                return False
+            self._append({"op": "del", "ID": int(record_id)})
+            return True
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, record_id):
+        return record_id in self.records
+
+    # 每日總支出 (依日期排序)，只需處理日期的數量，與記錄筆數無關
+    def daily_totals(self):
+        with self._lock:
+            dates = sorted(self.daily)
+            return pd.Series([self.daily[d][0] for d in dates], index=pd.Index(dates, name="日期"), name="金額")
+
+    # 每類別總支出
+    def category_totals(self):
+        with self._lock:
+            return pd.Series({c: total for c, (total, _) in self.category.items()}, name="金額", dtype=float).rename_axis("類別")
+
+    # 目前所有記錄的 DataFrame (有變動時才重新建立)
+    def frame(self):
+        with self._lock:
+            if self._frame is None:
+                self._frame = pd.DataFrame(list(self.records.values()), columns=COLUMNS)
+            return self._frame
+
+    # 以日期為索引 (已排序) 的記錄，可用 .loc[起始:結束] 直接切出日期區間；同一天依新增順序
+    def by_date(self):
+        with self._lock:
+            if self._by_date is None:
+                self._by_date = self.frame().sort_values("日期", kind="stable").set_index("日期")
+            return self._by_date
+
+    # 在背景執行緒壓縮日誌；wait 為 True 時等待完成
+    def compact(self, wait=False):
+        with self._lock:
+            if self._compactor is None or not self._compactor.is_alive():
+                self._compactor = threading.Thread(target=self._compact, daemon=True)
+                self._compactor.start()
+            compactor = self._compactor
+        if wait:
+            compactor.join()
+
+    def _compact(self):
+        with self._lock:
+            rows = list(self.records.values())
+            totals = {
+                "daily": {key: list(value) for key, value in self.daily.items()},
+                "category": {key: list(value) for key, value in self.category.items()},
+            }
+            offset = self._journal.tell()
+
+        # 寫快照不持有鎖，期間的新增 / 刪除照常附加到日誌
+        tmp_name = self.file_name + ".tmp"
+        with open(tmp_name, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, self.file_name)
+        totals["snapshot"] = self._snapshot_fingerprint()
+        with open(self.totals_name + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(totals, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(self.totals_name + ".tmp", self.totals_name)
+
+        # 只保留快照之後附加的日誌
+        with self._lock:
+            self._journal.close()
+            try:
+                with open(self.journal_name, "rb") as f:
+                    f.seek(offset)
+                    tail = f.read()
+                with open(self.journal_name + ".tmp", "wb") as f:
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(self.journal_name + ".tmp", self.journal_name)
+                self._pending = tail.count(b"\n")
+            finally:
+                # 無論成功與否都重新開啟日誌，之後的新增 / 刪除才能繼續寫入
+                self._journal = open(self.journal_name, "ab")
+
+    def close(self):
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._journal.close()
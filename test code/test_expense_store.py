@@ -0,0 +1,159 @@
+import csv
+import json
+import os
+
+import pytest
+
+import expense_store
+from expense_store import ExpenseStore
+
+# ExpenseStore 的日誌重播、壓縮與損毀復原測試 (python -m pytest "test code")
+
+@pytest.fixture
+def file_name(tmp_path):
+    return str(tmp_path / "expenses.csv")
+
+def snapshot_ids(file_name):
+    with open(file_name, newline="", encoding="utf-8") as f:
+        return [int(row["ID"]) for row in csv.DictReader(f)]
+
+def test_replay_after_interrupted_compaction_is_idempotent(file_name):
+    store = ExpenseStore(file_name)
+    store.add("2024-01-01", "餐飲", 100)
+    store.add("2024-01-01", "交通", 50)
+    store.add("2024-01-02", "餐飲", 700)
+    store.delete(2)
+    with open(store.journal_name, "rb") as f:
+        journal = f.read()
+    store.compact(wait=True)
+    store.close()
+
+    # 模擬快照已寫入、但日誌尚未截短時程式中斷：舊日誌整份重播在新快照之上
+    with open(file_name + ".journal", "wb") as f:
+        f.write(journal)
+    store = ExpenseStore(file_name)
+    assert list(store.records) == [1, 3]
+    assert store.next_id == 4
+    assert store.daily_totals().to_dict() == {"2024-01-01": 100.0, "2024-01-02": 700.0}
+    assert store.category_totals().to_dict() == {"餐飲": 800.0}
+    store.close()
+
+def test_truncated_last_line_is_dropped(file_name):
+    store = ExpenseStore(file_name)
+    store.add("2024-01-01", "餐飲", 100)
+    store.add("2024-01-02", "交通", 200)
+    store.close()
+    size = os.path.getsize(file_name + ".journal")
+    with open(file_name + ".journal", "ab") as f:
+        f.write('{"op": "add", "ID": 3, "日期": "2024-'.encode("utf-8"))
+
+    store = ExpenseStore(file_name)
+    assert list(store.records) == [1, 2]
+    assert os.path.getsize(store.journal_name) == size
+    assert store.add("2024-01-03", "娛樂", 300) == 3
+    store.close()
+    assert list(ExpenseStore(file_name).records) == [1, 2, 3]
+
+def test_corrupted_line_before_the_end_is_not_truncated(file_name):
+    store = ExpenseStore(file_name)
+    store.add("2024-01-01", "餐飲", 100)
+    store.add("2024-01-02", "交通", 200)
+    store.close()
+    with open(file_name + ".journal", "rb") as f:
+        lines = f.readlines()
+    with open(file_name + ".journal", "wb") as f:
+        f.write(b"{broken\n" + lines[1])
+    size = os.path.getsize(file_name + ".journal")
+
+    with pytest.raises(ValueError, match="第 1 行"):
+        ExpenseStore(file_name)
+    assert os.path.getsize(file_name + ".journal") == size
+
+def test_tombstoned_record_is_gone_after_compaction(file_name):
+    store = ExpenseStore(file_name)
+    store.add("2024-01-01", "餐飲", 100)
+    store.add("2024-01-02", "交通", 200)
+    assert store.delete(1)
+    store.compact(wait=True)
+    store.close()
+
+    assert snapshot_ids(file_name) == [2]
+    assert os.path.getsize(file_name + ".journal") == 0
+    store = ExpenseStore(file_name)
+    assert 1 not in store and list(store.records) == [2]
+    assert store.daily_totals().to_dict() == {"2024-01-02": 200.0}
+    store.close()
+
+def test_legacy_csv_without_id_column(file_name):
+    with open(file_name, "w", encoding="utf-8") as f:
+        f.write("日期,類別,金額,備註\n2024-01-01,餐飲,120.0,\n2024-01-02,交通,800.0,bus\n")
+
+    store = ExpenseStore(file_name)
+    assert store.records == {
+        1: {"ID": 1, "日期": "2024-01-01", "類別": "餐飲", "金額": 120.0, "備註": ""},
+        2: {"ID": 2, "日期": "2024-01-02", "類別": "交通", "金額": 800.0, "備註": "bus"},
+    }
+    assert store.add("2024-01-03", "娛樂", 10) == 3
+    store.close()
+
+def test_failed_compaction_keeps_journal_writable(file_name, monkeypatch):
+    store = ExpenseStore(file_name)
+    store.add("2024-01-01", "餐飲", 100)
+    real_replace = os.replace
+
+    def failing_replace(src, dst):
+        if dst == store.journal_name:
+            raise OSError("disk full")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(expense_store.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        store._compact()
+    monkeypatch.undo()
+
+    assert store.add("2024-01-02", "交通", 200) == 2
+    store.close()
+    assert list(ExpenseStore(file_name).records) == [1, 2]
+
+@pytest.mark.parametrize("content", ["", "{not json", "[]", '{"snapshot": null}'])
+def test_corrupt_totals_file_is_recomputed(file_name, content):
+    store = ExpenseStore(file_name)
+    store.add("2024-01-01", "餐飲", 100)
+    store.add("2024-01-01", "交通", 50)
+    store.compact(wait=True)
+    store.close()
+    with open(file_name + ".totals.json", "w", encoding="utf-8") as f:
+        f.write(content)
+
+    store = ExpenseStore(file_name)
+    assert store.daily_totals().to_dict() == {"2024-01-01": 150.0}
+    assert store.category_totals().to_dict() == {"餐飲": 100.0, "交通": 50.0}
+    store.close()
+
+def test_legacy_unpadded_dates_are_normalized(file_name):
+    with open(file_name, "w", encoding="utf-8") as f:
+        f.write("日期,類別,金額,備註\n2024-01-10,餐飲,10.0,\n2024-1-5,交通,20.0,\n2024-2-1,餐飲,30.0,\n")
+    with open(file_name + ".journal", "w", encoding="utf-8") as f:
+        f.write('{"op": "add", "ID": 4, "日期": "2024-1-7", "類別": "娛樂", "金額": 5.0, "備註": ""}\n')
+
+    store = ExpenseStore(file_name)
+    assert list(store.by_date().index) == ["2024-01-05", "2024-01-07", "2024-01-10", "2024-02-01"]
+    assert list(store.by_date().loc["2024-01-01":"2024-01-31", "ID"]) == [2, 4, 1]
+    assert store.daily_totals().to_dict() == {"2024-01-05": 20.0, "2024-01-07": 5.0, "2024-01-10": 10.0, "2024-02-01": 30.0}
+    store.close()
+
+def test_totals_with_unpadded_keys_are_recomputed(file_name):
+    store = ExpenseStore(file_name)
+    store.add("2024-01-05", "交通", 20)
+    store.compact(wait=True)
+    store.close()
+    with open(file_name + ".totals.json", encoding="utf-8") as f:
+        saved = json.load(f)
+    saved["daily"] = {"2024-1-5": saved["daily"]["2024-01-05"]}
+    with open(file_name + ".totals.json", "w", encoding="utf-8") as f:
+        json.dump(saved, f)
+
+    store = ExpenseStore(file_name)
+    assert store.delete(1)
+    assert store.daily_totals().to_dict() == {}
+    store.close()